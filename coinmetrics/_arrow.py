@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from coinmetrics._dataframe_builder import is_datetime_column
+from coinmetrics.schema_resolver import find_schema_for_endpoint, get_schema_fields
+
+try:
+    import orjson as _orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return _orjson.dumps(obj).decode()
+
+except ModuleNotFoundError:
+    import json as _json
+
+    def _json_dumps(obj: Any) -> str:
+        return _json.dumps(obj)
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+    if TYPE_CHECKING:
+        import pyarrow as pa
+
+
+# rows of a Parquet row group; pages are usually much smaller and are buffered up to this size
+DEFAULT_ROW_GROUP_ROWS = 100_000
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Arrow output requires pyarrow. Install it with `pip install pyarrow`.")
+
+
+def _schema_arrow_type(field_type: Any) -> Optional["pa.DataType"]:
+    return {
+        "string": pa.string(),
+        "boolean": pa.bool_(),
+        "integer": pa.int64(),
+        "number": pa.float64(),
+        # nested values are stored as JSON
+        "object": pa.string(),
+    }.get(field_type) if isinstance(field_type, str) else None
+
+
+class RecordBatchBuilder:
+    """
+    Converts pages of rows to Arrow record batches of one schema. Field types come from the OpenAPI schema of the
+    endpoint (see `schema_resolver.get_schema_fields`), timestamps are converted to timestamp[ns, UTC], and columns
+    the schema does not describe are strings, or booleans if the first page holds booleans. Numbers stay decimal
+    strings, as they are typed in the API specification, so that no precision is lost.
+    """
+
+    def __init__(self, endpoint: str, columns: List[str], first_page: List[Dict[str, Any]]) -> None:
+        require_pyarrow()
+        schema_name = find_schema_for_endpoint(endpoint)
+        schema_fields: Dict[str, Any] = get_schema_fields(schema_name) if schema_name is not None else {}
+        fields = []
+        for column in columns:
+            arrow_type = _schema_arrow_type(schema_fields.get(column))
+            values = [row.get(column) for row in first_page]
+            if arrow_type is None:
+                first = next((value for value in values if value is not None), None)
+                arrow_type = pa.bool_() if isinstance(first, bool) else pa.string()
+            if arrow_type == pa.string() and is_datetime_column(column) and _parses_as_timestamp(values):
+                arrow_type = pa.timestamp("ns", tz="UTC")
+            fields.append(pa.field(column, arrow_type))
+        self.schema = pa.schema(fields)
+
+    def to_record_batch(self, rows: List[Dict[str, Any]]) -> "pa.RecordBatch":
+        arrays = []
+        for field in self.schema:
+            values = [row.get(field.name) for row in rows]
+            if pa.types.is_timestamp(field.type):
+                arrays.append(pa.array(values, pa.string()).cast(field.type))
+            elif pa.types.is_string(field.type):
+                arrays.append(_to_string_array(values))
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def _to_string_array(values: List[Any]) -> "pa.Array":
+    try:
+        return pa.array(values, pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array(
+            [
+                value if value is None or isinstance(value, str)
+                else _json_dumps(value) if isinstance(value, (dict, list))
+                else str(value)
+                for value in values
+            ],
+            pa.string(),
+        )
+
+
+def _parses_as_timestamp(values: List[Any]) -> bool:
+    try:
+        pa.array(values, pa.string()).cast(pa.timestamp("ns", tz="UTC"))
+        return True
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return False
+
+
+def write_parquet(
+    batches: Iterator["pa.RecordBatch"],
+    path_or_buf: Any,
+    compression: str = "snappy",
+    row_group_size: int = DEFAULT_ROW_GROUP_ROWS,
+) -> int:
+    """
+    Writes record batches to a Parquet file as they arrive, buffering at most `row_group_size` rows before they are
+    written as a row group. Nothing is written if there are no batches.
+    :return: number of rows written
+    """
+    import pyarrow.parquet as pq
+
+    writer: Any = None
+    buffered: List["pa.RecordBatch"] = []
+    buffered_rows = 0
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(path_or_buf, batch.schema, compression=compression)
+            buffered.append(batch)
+            buffered_rows += batch.num_rows
+            if buffered_rows >= row_group_size:
+                writer.write_table(pa.Table.from_batches(buffered), row_group_size=row_group_size)
+                rows += buffered_rows
+                buffered, buffered_rows = [], 0
+        if buffered:
+            writer.write_table(pa.Table.from_batches(buffered), row_group_size=row_group_size)
+            rows += buffered_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from logging import getLogger
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, cast
+
+from coinmetrics._data_collection import STREAM_PAGE_ROWS, DataCollection
+from coinmetrics._typing import AsyncDataRetrievalFuncType, DataFrameType
+
+logger = getLogger("cm_client_data_collection")
+
+
+class AsyncDataCollection:
+    """
+    The AsyncDataCollection class is the asyncio counterpart of DataCollection, returned by AsyncCoinMetricsClient.
+    Pages are requested on the event loop instead of a thread, for example:
+    `async for row in AsyncDataCollection` -> Dict[str, Any].
+    `await AsyncDataCollection.first_page()` -> List[Dict[str, Any]].
+    `await AsyncDataCollection.to_list()` -> List[Dict[str, Any]].
+    `await AsyncDataCollection.to_dataframe()` -> pd.DataFrame or pl.DataFrame.
+    """
+
+    def __init__(
+        self,
+        data_collection: DataCollection,
+        data_retrieval_function: AsyncDataRetrievalFuncType,
+    ) -> None:
+        """
+        :param data_collection: The DataCollection describing the request: endpoint, URL parameters and export settings.
+        :type data_collection: DataCollection
+        :param data_retrieval_function: The coroutine function to use to retrieve data from the CoinMetrics API.
+        :type data_retrieval_function: AsyncDataRetrievalFuncType
+        """
+        self._data_collection = data_collection
+        self._data_retrieval_function = data_retrieval_function
+        self._endpoint = data_collection._endpoint
+        self._url_params = data_collection._url_params
+        self._is_stream = data_collection._is_stream
+        self._next_page_token: Optional[str] = ""
+        self._last_page_token: Optional[str] = None
+        self._current_data_iterator: Optional[Iterator[Any]] = None
+        self._stream_iterator: Optional[AsyncIterator[Dict[str, Any]]] = None
+
+    async def first_page(self) -> List[Dict[str, Any]]:
+        api_response = await self._data_retrieval_function(self._endpoint, dict(self._url_params))
+        if isinstance(api_response, dict):
+            return cast(List[Dict[str, Any]], api_response["data"])
+        # json_stream responses are not paginated, the whole stream is the first page
+        return [row async for row in api_response]
+
+    async def to_list(self) -> List[Dict[str, Any]]:
+        return [row async for row in self]
+
+    async def iter_pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Iterates over the data page by page, like `DataCollection.iter_pages()`: the `data` list of every API response,
+        or the rows of a `json_stream` response in lists of `STREAM_PAGE_ROWS` rows. Rows already returned by
+        `__anext__` are not repeated, and empty pages are skipped.
+        :return: async iterator of lists of rows
+        """
+        if self._is_stream:
+            page: List[Dict[str, Any]] = []
+            async for row in self:
+                page.append(row)
+                if len(page) == STREAM_PAGE_ROWS:
+                    yield page
+                    page = []
+            if page:
+                yield page
+            return
+        while True:
+            if self._current_data_iterator is not None:
+                data = list(self._current_data_iterator)
+                self._current_data_iterator = None
+                if data:
+                    yield data
+            if not await self._load_next_page():
+                return
+
+    async def to_dataframe(
+        self,
+        header: Optional[List[str]] = None,
+        dtype_mapper: Optional[Dict[str, Any]] = None,
+        optimize_dtypes: Optional[bool] = None,
+        dataframe_type: str = "pandas"
+    ) -> DataFrameType:
+        """
+        Outputs a pandas or polars dataframe. Accepts the same arguments as `DataCollection.to_dataframe()`.
+        With optimize_dtypes, every page is appended to the dataframe builder of `DataCollection.to_dataframe()` as
+        soon as it arrives, so the rows of a page are released before the next one is requested.
+        """
+        data_collection = self._data_collection
+        if optimize_dtypes is None:
+            optimize_dtypes = data_collection._optimize_dtypes
+        if dtype_mapper is None:
+            dtype_mapper = data_collection._dtype_mapper
+        kwargs = dict(header=header, dtype_mapper=dtype_mapper, optimize_dtypes=optimize_dtypes, dataframe_type=dataframe_type)
+        if not optimize_dtypes or type(data_collection).to_dataframe is not DataCollection.to_dataframe:
+            # catalogs and asset chains post-process the whole result in their own to_dataframe()
+            rows = await self.to_list()
+            return data_collection._from_rows(rows).to_dataframe(**kwargs)
+        if dataframe_type not in ("pandas", "polars"):
+            raise ValueError("Invalid dataframe_type. Choose one of 'polars' or 'pandas'")
+        builder = None
+        async for data in self.iter_pages():
+            if builder is None:
+                builder = data_collection._new_frame_builder(data[0], dtype_mapper, dataframe_type)
+            builder.append_page(data)
+        if builder is None:
+            return data_collection._from_rows([]).to_dataframe(**kwargs)
+        return data_collection._build_dataframe(builder, header, dtype_mapper)
+
+    def __aiter__(self) -> "AsyncDataCollection":
+        return self
+
+    async def __anext__(self) -> Any:
+        while True:
+            if self._current_data_iterator is not None:
+                try:
+                    return next(self._current_data_iterator)
+                except StopIteration:
+                    self._current_data_iterator = None
+
+            # --- STREAM MODE (json_stream): fetch exactly once, never paginate ---
+            if self._is_stream:
+                if self._stream_iterator is None:
+                    self._stream_iterator = cast(
+                        AsyncIterator[Dict[str, Any]],
+                        await self._data_retrieval_function(self._endpoint, dict(self._url_params)),
+                    )
+                return await self._stream_iterator.__anext__()
+
+            # --- PAGED MODE (normal JSON): keep following next_page_token ---
+            if not await self._load_next_page():
+                raise StopAsyncIteration
+
+    async def _load_next_page(self) -> bool:
+        """
+        Requests the next page and points `_current_data_iterator` at its rows.
+        :return: False if all pages have been requested
+        """
+        url_params = dict(self._url_params)
+        if self._next_page_token:
+            url_params["next_page_token"] = self._next_page_token
+        elif self._last_page_token is not None:
+            return False
+
+        api_response = await self._data_retrieval_function(self._endpoint, url_params)
+        if not isinstance(api_response, dict):
+            raise TypeError(f"Unexpected response type for paginated endpoint {self._endpoint}: {type(api_response)}")
+
+        if "data" in api_response:
+            self._last_page_token = self._next_page_token
+            self._next_page_token = cast(Optional[str], api_response.get("next_page_token"))
+            self._current_data_iterator = iter(api_response.get("data") or [])
+        else:
+            # single object responses like {"txid": "123x", "height": "1", ...}
+            self._next_page_token = None
+            self._last_page_token = " "
+            self._current_data_iterator = iter([api_response])
+        return True
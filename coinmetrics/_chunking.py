@@ -0,0 +1,66 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from dateutil.parser import isoparse
+
+# pages of a chunk of chunking="auto"; a chunk that turns out to need more is split again while it runs
+DEFAULT_CHUNK_PAGES = 20
+# rows requested per data collection to estimate how dense its data is
+SAMPLE_ROWS = 1000
+# page size of the API if a request has none
+DEFAULT_PAGE_SIZE = 100
+
+
+def parse_row_time(value: str) -> datetime:
+    """
+    Parses the `time` of a row (e.g. "2024-01-01T00:00:00.000000000Z") to a naive UTC datetime, like
+    `ParallelDataCollection.parse_date`. Nanoseconds are truncated.
+    """
+    parsed = isoparse(value)
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo is not None else parsed
+
+
+def split_time_range(start: datetime, end: datetime, pieces: int) -> List[datetime]:
+    """
+    :return: the bounds of `pieces` intervals of equal length from start to end, from start to end, at least a second
+    long each
+    """
+    pieces = max(1, min(pieces, int((end - start).total_seconds())))
+    step = (end - start) / pieces
+    return [start + step * piece for piece in range(pieces)] + [end]
+
+
+def estimate_chunks(
+    start: datetime,
+    end: datetime,
+    sample: List[Dict[str, Any]],
+    has_more: bool,
+    paging_from_start: bool,
+    rows_per_chunk: int,
+) -> int:
+    """
+    Estimates the number of chunks of about `rows_per_chunk` rows of the time range from the first page of the range:
+    the rows of the page over the time the page covers, from the start or the end of the range depending on where
+    the pages start. The data is assumed to be evenly dense; chunks that are not are split again while they run.
+    """
+    if not has_more:
+        return max(1, math.ceil(len(sample) / rows_per_chunk))
+    times = [parse_row_time(row["time"]) for row in sample if row.get("time")]
+    if not times:
+        return 1
+    covered = max(times) - start if paging_from_start else end - min(times)
+    return estimate_pieces(len(sample), covered, end - start, rows_per_chunk)
+
+
+def estimate_pieces(done: int, covered: timedelta, remaining: timedelta, budget: int) -> int:
+    """
+    :return: number of pieces of at most `budget` rows or pages for the `remaining` time, if `done` rows or pages took
+    the `covered` time
+    """
+    if remaining <= timedelta(0):
+        return 1
+    if covered <= timedelta(0):
+        # all rows so far have the same time, there is no telling how dense the rest is
+        return math.ceil(remaining.total_seconds())
+    return max(1, math.ceil(done * (remaining / covered) / budget))
@@ -0,0 +1,359 @@
+import gzip
+import json
+import threading
+import zlib
+from collections import deque
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Union
+
+import orjson
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# large reads keep the per chunk overhead of splitting and parsing low
+STREAM_CHUNK_SIZE = 1 << 18
+MAX_RECENT_REQUESTS = 100
+
+
+def supported_encodings() -> List[str]:
+    """
+    Content encodings the client can decode, in order of preference. zstd and br require the optional `zstandard`
+    and `brotli` packages.
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.extend(["gzip", "deflate"])
+    return encodings
+
+
+def accept_encoding_header(compress_responses: bool = True) -> str:
+    if not compress_responses:
+        return "identity"
+    return ", ".join(supported_encodings())
+
+
+class _IdentityDecompressor:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZlibDecompressor:
+    def __init__(self, wbits: int) -> None:
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class _DeflateDecompressor:
+    # servers disagree on whether "deflate" is zlib wrapped or raw, the first chunk tells
+    def __init__(self) -> None:
+        self._decompressor: Optional[Any] = None
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj()
+            try:
+                return self._decompressor.decompress(data)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush() if self._decompressor is not None else b""
+
+
+class _ZstdDecompressor:
+    # a zstd stream may hold several frames, and a decompressobj() only reads one
+    def __init__(self) -> None:
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        decompressed = []
+        while data:
+            if self._decompressor.eof:
+                self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+            decompressed.append(self._decompressor.decompress(data))
+            data = self._decompressor.unused_data if self._decompressor.eof else b""
+        return b"".join(decompressed)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _BrotliDecompressor:
+    def __init__(self) -> None:
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.process(data)  # type: ignore
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def get_decompressor(content_encoding: Optional[str]) -> Any:
+    """
+    Returns an incremental decompressor with `decompress(chunk)` and `flush()` for the Content-Encoding of a response.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return _IdentityDecompressor()
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibDecompressor(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecompressor()
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdDecompressor()
+    if encoding == "br" and brotli is not None:
+        return _BrotliDecompressor()
+    raise ValueError(f"Unsupported response content encoding: {content_encoding}")
+
+
+def get_compressed_writer(fileobj: IO[bytes], compress: Union[bool, str]) -> Optional[IO[bytes]]:
+    """
+    Returns a writer that compresses everything written to it into one stream in `fileobj`, or None if `compress` is
+    False. `compress` is True or "gzip" for gzip, or "zstd" (requires the optional `zstandard` package). Closing the
+    writer finishes the stream and leaves `fileobj` open.
+    """
+    if compress is False:
+        return None
+    if compress is True or compress == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb")  # type: ignore
+    if compress == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires zstandard. Install it with `pip install zstandard`.")
+        return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+    raise ValueError(f"Unsupported compression: {compress}, use True, 'gzip' or 'zstd'")
+
+
+class RequestTransferStatistics:
+    """
+    Bytes transferred by a single request: `bytes_received` over the wire and `bytes_decoded` after decompression.
+    """
+
+    def __init__(self, url: str, content_encoding: Optional[str]) -> None:
+        self.url = url
+        self.content_encoding = content_encoding or "identity"
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.bytes_decoded / self.bytes_received if self.bytes_received else 1.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "content_encoding": self.content_encoding,
+            "bytes_received": self.bytes_received,
+            "bytes_decoded": self.bytes_decoded,
+        }
+
+    def __repr__(self) -> str:
+        return f"RequestTransferStatistics({self.to_dict()})"
+
+
+class TransferStatistics:
+    """
+    Thread safe byte counters of the responses read by a client:
+    `requests` - number of response bodies read.
+    `bytes_received` - bytes received over the wire, compressed if the server applied a content encoding.
+    `bytes_decoded` - bytes of the decompressed response bodies.
+    The counters of the last 100 requests are kept in `recent_requests`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "requests": 0,
+            "bytes_received": 0,
+            "bytes_decoded": 0,
+        }
+        self._recent_requests: Deque[RequestTransferStatistics] = deque(maxlen=MAX_RECENT_REQUESTS)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "TransferStatistics":
+        # a deepcopy of a client adds to the counters of the original client
+        return self
+
+    def record(self, request_statistics: RequestTransferStatistics) -> None:
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["bytes_received"] += request_statistics.bytes_received
+            self._counters["bytes_decoded"] += request_statistics.bytes_decoded
+            self._recent_requests.append(request_statistics)
+
+    def reset(self) -> None:
+        with self._lock:
+            for counter in self._counters:
+                self._counters[counter] = 0
+            self._recent_requests.clear()
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    @property
+    def requests(self) -> int:
+        return self._counters["requests"]
+
+    @property
+    def bytes_received(self) -> int:
+        return self._counters["bytes_received"]
+
+    @property
+    def bytes_decoded(self) -> int:
+        return self._counters["bytes_decoded"]
+
+    @property
+    def compression_ratio(self) -> float:
+        with self._lock:
+            received = self._counters["bytes_received"]
+            return self._counters["bytes_decoded"] / received if received else 1.0
+
+    @property
+    def recent_requests(self) -> List[RequestTransferStatistics]:
+        with self._lock:
+            return list(self._recent_requests)
+
+    def __repr__(self) -> str:
+        return f"TransferStatistics({self.to_dict()})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"_counters": dict(self._counters), "_recent_requests": list(self._recent_requests)}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._lock = threading.Lock()
+        self._counters = state["_counters"]
+        self._recent_requests = deque(state["_recent_requests"], maxlen=MAX_RECENT_REQUESTS)
+
+
+def iter_decompressed(
+    chunks: Iterable[bytes], content_encoding: Optional[str], request_statistics: RequestTransferStatistics
+) -> Iterator[bytes]:
+    """
+    Decompresses raw response chunks as they arrive, counting the bytes before and after decompression.
+    """
+    decompressor = get_decompressor(content_encoding)
+    for chunk in chunks:
+        request_statistics.bytes_received += len(chunk)
+        data = decompressor.decompress(chunk)
+        if data:
+            request_statistics.bytes_decoded += len(data)
+            yield data
+    data = decompressor.flush()
+    if data:
+        request_statistics.bytes_decoded += len(data)
+        yield data
+
+
+class NdjsonLineSplitter:
+    """
+    Splits decompressed chunks into NDJSON lines, keeping the incomplete last line until the next chunk arrives.
+    Empty keep-alive lines are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._remainder = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        lines = (self._remainder + chunk).split(b"\n") if self._remainder else chunk.split(b"\n")
+        self._remainder = lines.pop()
+        return [line for line in lines if line]
+
+    def close(self) -> List[bytes]:
+        remainder, self._remainder = self._remainder, b""
+        return [remainder] if remainder.strip() else []
+
+
+def parse_ndjson_lines(lines: List[bytes]) -> List[Dict[str, Any]]:
+    """
+    Parses raw NDJSON lines with orjson, without decoding them to str first.
+    """
+    try:
+        return [orjson.loads(line) for line in lines]
+    except orjson.JSONDecodeError:
+        # whitespace only keep-alive lines or integers beyond 64 bits, which orjson rejects
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def iter_ndjson_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    splitter = NdjsonLineSplitter()
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+
+def iter_ndjson_line_batches(chunks: Iterable[bytes]) -> Iterator[List[bytes]]:
+    """
+    Yields the complete, non empty NDJSON lines of every chunk as one batch of raw lines.
+    """
+    splitter = NdjsonLineSplitter()
+    for chunk in chunks:
+        lines = splitter.feed(chunk)
+        if lines:
+            yield lines
+    lines = splitter.close()
+    if lines:
+        yield lines
+
+
+def iter_ndjson_batches(chunks: Iterable[bytes]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields the rows of the complete NDJSON lines of every chunk as one batch.
+    """
+    for lines in iter_ndjson_line_batches(chunks):
+        yield parse_ndjson_lines(lines)
+
+
+def validate_ndjson_lines(lines: List[bytes]) -> None:
+    """
+    Checks that raw lines hold JSON objects without parsing them: every line has to start with "{" and end with "}",
+    which catches truncated lines and error pages.
+    """
+    for line in lines:
+        if line[:1] != b"{" or line.rstrip()[-1:] != b"}":
+            raise ValueError(f"json_stream line is not a JSON object: {line[:100]!r}")
+
+
+class NdjsonStream:
+    """
+    Rows of a json_stream response. Iterating yields rows one by one, `iter_batches()` yields the rest of the response
+    as lists of the rows of every chunk read; both can be mixed.
+    """
+
+    def __init__(self, batches: Iterator[List[Dict[str, Any]]]) -> None:
+        self._batches = batches
+        self._batch: Iterator[Dict[str, Any]] = iter(())
+        self._rows = self._iter_rows()
+
+    def _iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for batch in self._batches:
+            self._batch = iter(batch)
+            yield from self._batch
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self._rows
+
+    def iter_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        remaining = list(self._batch)
+        if remaining:
+            yield remaining
+        yield from self._batches
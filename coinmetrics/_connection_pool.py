@@ -0,0 +1,127 @@
+import threading
+from typing import Any, Dict, Optional, Type, Union
+
+from requests.adapters import HTTPAdapter
+from urllib3 import PoolManager, Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class ConnectionPoolStatistics:
+    """
+    Thread safe counters of the HTTP connections used by a CoinMetricsClient session:
+    `connections_created` - new TCP (and TLS) connections opened, including reconnects of dropped keep-alive connections.
+    `connections_reused` - requests sent over an already open keep-alive connection.
+    `connections_discarded` - connections closed after a response because the pool was already full or closed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "connections_created": 0,
+            "connections_reused": 0,
+            "connections_discarded": 0,
+        }
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    @property
+    def connections_created(self) -> int:
+        return self._counters["connections_created"]
+
+    @property
+    def connections_reused(self) -> int:
+        return self._counters["connections_reused"]
+
+    @property
+    def connections_discarded(self) -> int:
+        return self._counters["connections_discarded"]
+
+    def __repr__(self) -> str:
+        return f"ConnectionPoolStatistics({self.to_dict()})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"_counters": self.to_dict()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._lock = threading.Lock()
+        self._counters = state["_counters"]
+
+
+class _CountingConnectionPoolMixin:
+    _statistics: ConnectionPoolStatistics
+
+    def _get_conn(self, timeout: Optional[float] = None) -> Any:
+        conn = super()._get_conn(timeout)  # type: ignore
+        # pooled connections keep their socket open, new and reset ones connect on first use
+        if getattr(conn, "sock", None) is not None:
+            self._statistics.increment("connections_reused")
+        else:
+            self._statistics.increment("connections_created")
+        return conn
+
+    def _put_conn(self, conn: Any) -> None:
+        pool = getattr(self, "pool", None)
+        if conn is not None and (pool is None or pool.full()):
+            self._statistics.increment("connections_discarded")
+        super()._put_conn(conn)  # type: ignore
+
+
+class CoinMetricsHTTPAdapter(HTTPAdapter):
+    """
+    requests HTTPAdapter that records connection pool usage in a ConnectionPoolStatistics instance.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["statistics", "pool_maxsize"]
+
+    def __init__(
+        self,
+        statistics: Optional[ConnectionPoolStatistics] = None,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        max_retries: Union[int, Retry] = 0,
+        pool_block: bool = False,
+    ) -> None:
+        self.statistics = statistics if statistics is not None else ConnectionPoolStatistics()
+        self.pool_maxsize = pool_maxsize
+        super().__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=pool_block,
+        )
+
+    def init_poolmanager(self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any) -> None:
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self._use_counting_pools(self.poolmanager)
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) -> Any:
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        self._use_counting_pools(manager)
+        return manager
+
+    def _use_counting_pools(self, manager: PoolManager) -> None:
+        manager.pool_classes_by_scheme = {
+            "http": self._counting_pool_cls(HTTPConnectionPool),
+            "https": self._counting_pool_cls(HTTPSConnectionPool),
+        }
+
+    def _counting_pool_cls(self, pool_cls: Type[HTTPConnectionPool]) -> Type[HTTPConnectionPool]:
+        return type(
+            f"Counting{pool_cls.__name__}",
+            (_CountingConnectionPoolMixin, pool_cls),
+            {"_statistics": self.statistics},
+        )
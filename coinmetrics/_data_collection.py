@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import os
+import queue
+import sys
+import threading
 import warnings
+import weakref
 import requests
 import itertools
+import functools
+import heapq
+import urllib3
 from dateutil.relativedelta import relativedelta
-from copy import deepcopy
-from gzip import GzipFile
+from copy import copy
 from io import BytesIO
 from logging import getLogger
 from time import sleep
 from datetime import datetime, timedelta, date, timezone
-from typing import Any, Dict, Iterable, Iterator, List, Optional, cast, Type, Callable, Union, Generator, Tuple, TYPE_CHECKING
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, cast, Type, Callable, Union, Generator, Tuple, TypeVar, TYPE_CHECKING
 from dateutil.parser import isoparse
 from coinmetrics._typing import (
     DataRetrievalFuncType,
@@ -24,10 +30,19 @@ from coinmetrics._utils import (
     convert_pandas_dtype_to_polars,
     deprecated_optimize_pandas_types,
     get_file_path_or_buffer,
+    transform_url_params_values_to_str,
+)
+from coinmetrics._arrow import DEFAULT_ROW_GROUP_ROWS, RecordBatchBuilder, pa, require_pyarrow, write_parquet
+from coinmetrics._compression import get_compressed_writer, iter_ndjson_line_batches, validate_ndjson_lines
+from coinmetrics._dataframe_builder import ColumnarFrameBuilder, PolarsFrameBuilder, is_datetime_column, polars_schema
+from coinmetrics._lazy_frame import cast_series, pushdown_url_params
+from coinmetrics._query_spec import QuerySpec
+from coinmetrics._chunking import (
+    DEFAULT_CHUNK_PAGES, DEFAULT_PAGE_SIZE, SAMPLE_ROWS, estimate_chunks, estimate_pieces, parse_row_time, split_time_range
 )
 from coinmetrics._models import AssetChainsData, CoinMetricsAPIModel, TransactionTrackerData
 from coinmetrics._catalogs import convert_catalog_dtypes, _expand_df
-from concurrent.futures import ThreadPoolExecutor, Executor
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, Executor, as_completed
 from tqdm import tqdm
 from collections import defaultdict
 from coinmetrics._exceptions import CoinMetricsClientNotFoundError
@@ -35,6 +50,7 @@ if TYPE_CHECKING:
     from coinmetrics.api_client import CoinMetricsClient
 import numpy as np
 import polars as pl
+from polars.io.plugins import register_io_source
 
 try:
     import orjson as _orjson
@@ -53,6 +69,8 @@ isoparse_typed: Callable[[Union[str, bytes]], datetime] = isoparse
 
 logger = getLogger("cm_client_data_collection")
 
+T = TypeVar("T")
+
 try:
     import pandas as pd
     from pandas import DateOffset
@@ -74,6 +92,49 @@ class DataFetchError(Exception):
 
 
 NUMBER_OF_RETRIES = 3
+# rows per page of iter_pages() for json_stream responses that are not read in batches
+STREAM_PAGE_ROWS = 10000
+# rows per block of CSV converted from a merged dataframe, see ParallelDataCollection.export_to_csv()
+MERGED_CSV_SLICE_ROWS = 10000
+# errors after which a page is requested again, with the same next_page_token
+_TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+)
+_END_OF_PAGES = object()
+# url params that select the entities of a time series, e.g. the markets of market trades, see bidirectional()
+_ENTITY_PARAMS = ("assets", "defi_protocols", "exchange_assets", "exchanges", "indexes", "institutions", "markets", "pairs")
+# endpoints that return CSV with format=csv, see export_to_csv(passthrough=True)
+CSV_FORMAT_ENDPOINTS = frozenset({
+    "constituent-snapshots/asset-metrics",
+    "constituent-timeframes/asset-metrics",
+    "timeseries/asset-metrics",
+    "timeseries/exchange-metrics",
+    "timeseries/exchange-asset-metrics",
+    "timeseries/market-metrics",
+    "timeseries/pair-metrics",
+    "timeseries/pair-candles",
+    "timeseries/institution-metrics",
+    "timeseries/market-trades",
+    "timeseries/market-openinterest",
+    "timeseries/market-liquidations",
+    "timeseries/market-funding-rates",
+    "timeseries/market-funding-rates-predicted",
+    "timeseries/market-candles",
+    "timeseries/market-contract-prices",
+    "timeseries/market-implied-volatility",
+    "timeseries/market-greeks",
+    "timeseries/index-candles",
+    "timeseries/index-levels",
+    "timeseries/index-constituents",
+    "timeseries/mining-pool-tips-summary",
+    "timeseries/mempool-feerates",
+    "timeseries/asset-alerts",
+    "timeseries/defi-balance-sheets",
+})
 
 
 class DataCollection:
@@ -98,7 +159,9 @@ class DataCollection:
         client: Optional[CoinMetricsClient] = None,
         optimize_dtypes: Optional[bool] = True,
         dtype_mapper: Optional[Dict[str, Any]] = None,
-        paginated: bool = True
+        paginated: bool = True,
+        prefetch_pages: int = 0,
+        bidirectional: bool = False,
     ) -> None:
         """
         :param data_retrieval_function: The function to use to retrieve data from the CoinMetrics API.
@@ -117,6 +180,10 @@ class DataCollection:
         :type optimize_dtypes: bool
         :param dtype_mapper: The dtype mapper to use to convert the data types for the data collection.
         :type dtype_mapper: Dict[str, Any]
+        :param prefetch_pages: Number of pages to request in a background thread ahead of the page being consumed. 0 disables prefetching.
+        :type prefetch_pages: int
+        :param bidirectional: Whether to page through the time range from both ends at once, see `bidirectional()`.
+        :type bidirectional: bool
         """
         self._csv_export_supported = csv_export_supported
         self._data_retrieval_function = data_retrieval_function
@@ -134,6 +201,18 @@ class DataCollection:
         self._is_stream = str(self._url_params.get("format", "")).lower() == "json_stream"
         self._last_page_token: Optional[str] = None
         self._current_data_iterator = None
+        self._prefetch_pages = prefetch_pages
+        self._bidirectional = bidirectional
+        self._bidirectional_pages: Optional[Iterator[List[Dict[str, Any]]]] = None
+        self._prefetch_queue: Optional["queue.Queue[Any]"] = None
+        self._prefetch_finished = False
+        # iteration position, see checkpoint()
+        self._rows_emitted_before_page = 0
+        self._page_rows_emitted = 0
+        self._page_length: Optional[int] = None
+        self._page_rows_to_skip = 0
+        self._resumed = False
+        self._stream_rows: Any = None
 
     def first_page(self) -> List[Dict[str, Any]]:
         return cast(
@@ -142,97 +221,518 @@ class DataCollection:
         )
 
     def to_list(self) -> List[Dict[str, Any]]:
-        return list(self)
+        rows: List[Dict[str, Any]] = []
+        for data in self.iter_pages():
+            rows.extend(data)
+        return rows
+
+    def _from_rows(self, rows: Iterable[Any]) -> "DataCollection":
+        """
+        Returns a shallow copy of this DataCollection that yields already retrieved rows instead of calling the API,
+        so export and dataframe conversions can be reused for data fetched elsewhere (e.g. by the async client).
+        :param rows: rows to yield, in order
+        :return: DataCollection with the same endpoint, params and column settings
+        """
+        data_collection = copy(self)
+        data_collection._prefetch_pages = 0
+        data_collection._current_data_iterator = iter(rows)
+        data_collection._next_page_token = None
+        data_collection._last_page_token = ""
+        data_collection._page_length = None
+        data_collection._resumed = False
+        data_collection._stream_rows = None
+        data_collection._is_stream = False
+        data_collection._bidirectional_pages = None
+        return data_collection
 
     def __next__(self) -> Any:
         # Fast path: if we already have an iterator, try to yield from it
         if self._current_data_iterator is not None:
             try:
-                return next(self._current_data_iterator)
+                data_el = next(self._current_data_iterator)
+                self._page_rows_emitted += 1
+                return data_el
             except StopIteration:
                 if self._is_stream:
                     # The stream is consumed.
+                    self._page_length = self._page_rows_emitted
                     raise
                 self._current_data_iterator = None
                 # Continue, to see if we have more pages.
+            except Exception as e:
+                if not self._is_stream or not _is_transient_error(e):
+                    raise
+                # the connection broke in the middle of the stream, request it again and skip what was emitted
+                logger.warning("json_stream interrupted with error: %s, resuming after %s rows", e, self._page_rows_emitted)
+                self._current_data_iterator = None
+                self._page_length = None
 
         # --- STREAM MODE (json_stream): fetch exactly once, never paginate ---
         if self._is_stream:
-            # one-shot retrieval: should return an iterator/generator over rows
-            api_response = self._data_retrieval_function(self._endpoint, dict(self._url_params))
-            # assume iterable/generator; do NOT wrap in list()
-            self._current_data_iterator = iter(api_response)
-            return next(self._current_data_iterator)
+            self._open_stream()
+            return self.__next__()
 
         # --- PAGED MODE (normal JSON): keep following next_page_token safely ---
-        # Build params; add token if present
-        url_params = dict(self._url_params)
-        if self._next_page_token:
-            url_params["next_page_token"] = self._next_page_token
-
-        # If there is no current token and we've already fetched at least one page, we're done
-        elif self._last_page_token is not None:
-            raise StopIteration
+        while self._load_next_page():
+            try:
+                data_el = next(self._current_data_iterator)  # type: ignore
+            except StopIteration:
+                # empty page (or a page skipped entirely on resume), continue with the next one
+                continue
+            self._page_rows_emitted += 1
+            return data_el
+        raise StopIteration
+
+    def _open_stream(self) -> None:
+        # one-shot retrieval: should return an iterator/generator over rows
+        api_response = self._fetch_data_with_retries(dict(self._url_params))
+        # assume iterable/generator; do NOT wrap in list()
+        self._stream_rows = api_response
+        self._current_data_iterator = iter(api_response)
+        # rows emitted before a resume are skipped
+        for _ in range(self._page_rows_emitted):
+            next(self._current_data_iterator)
+
+    def _load_next_page(self) -> bool:
+        """
+        Requests the next page (or takes it from the prefetch queue) and makes it the current page.
+        :return: False if there are no more pages
+        """
+        if self._bidirectional_pages is None and self._bidirectional and self._supports_bidirectional_paging():
+            self._bidirectional_pages = self._iter_bidirectional_pages()
+        if self._bidirectional_pages is not None:
+            data = next(self._bidirectional_pages, None)
+            if data is None:
+                return False
+            self._start_page(data, None)
+            return True
+        if self._prefetch_pages > 0:
+            api_response = self._get_prefetched_page()
+            if api_response is _END_OF_PAGES:
+                return False
+        else:
+            # Build params; add token if present
+            url_params = dict(self._url_params)
+            if self._next_page_token:
+                url_params["next_page_token"] = self._next_page_token
+            # If there is no current token and we've already fetched at least one page, we're done
+            elif self._last_page_token is not None:
+                return False
+            # Fetch next page (or the first page, if no token yet); transient errors retry the same token
+            api_response = self._fetch_data_with_retries(url_params)
+
+        if isinstance(api_response, dict) and "data" in api_response:
+            # API returns JSON pages like {"data": [...], "next_page_token": "..."}
+            self._start_page(api_response.get("data") or [], api_response.get("next_page_token"))
+        elif isinstance(api_response, list):
+            self._start_page(api_response, None)
+        else:
+            # API returns JSON pages like {"txid": "123x", "height": "1", ...}
+            self._start_page([api_response], None)
+        return True
 
-        # Fetch next page (or the first page, if no token yet)
-        api_response = self._data_retrieval_function(self._endpoint, url_params)
+    def iter_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterates over the data page by page: the `data` list of every API response, or the rows of every chunk read
+        from a `json_stream` response. Useful for sinks that process many rows at once, e.g. dataframe builders or
+        database loaders. Rows already returned by `next()` are not repeated, and empty pages are skipped.
+        :return: iterator of lists of rows
+        """
+        if self._is_stream:
+            yield from self._iter_stream_pages()
+            return
+        while True:
+            if self._current_data_iterator is not None:
+                data = list(self._current_data_iterator)
+                self._current_data_iterator = None
+                self._page_rows_emitted += len(data)
+                if data:
+                    yield data
+            if not self._load_next_page():
+                return
 
-        if isinstance(api_response, dict):
-            # API returns JSON pages like {"data": [...], "next_page_token": "..."}
-            if "data" in api_response:
-                data = api_response.get("data") or []
-                self._last_page_token = self._next_page_token
-                self._next_page_token = api_response.get("next_page_token")  # type: ignore
-                if not data and not self._next_page_token:
-                    # empty terminal page
-                    raise StopIteration
-                self._current_data_iterator = iter(data)
-                return next(self._current_data_iterator)
-            else:
-                # API returns JSON pages like {"txid": "123x", "height": "1", ...}
-                self._next_page_token = None
+    def _iter_stream_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        while True:
+            try:
+                if self._current_data_iterator is None:
+                    self._open_stream()
+                iter_batches = getattr(self._stream_rows, "iter_batches", None)
+                if iter_batches is not None:
+                    batches = iter_batches()
+                else:
+                    batches = iter(lambda: list(itertools.islice(self._current_data_iterator, STREAM_PAGE_ROWS)), [])  # type: ignore
+                for data in batches:
+                    self._page_rows_emitted += len(data)
+                    yield data
+                # The stream is consumed.
+                self._page_length = self._page_rows_emitted
+                return
+            except Exception as e:
+                if not _is_transient_error(e):
+                    raise
+                logger.warning("json_stream interrupted with error: %s, resuming after %s rows", e, self._page_rows_emitted)
                 self._current_data_iterator = None
-                # break iteration
-                self._last_page_token = " "
-                return api_response
+
+    def iter_batches(self, rows: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterates over the data in lists of `rows` rows (the last one may be shorter), regardless of the page size
+        of the API responses.
+        :param rows: number of rows per batch
+        :type rows: int
+        :return: iterator of lists of rows
+        """
+        if rows <= 0:
+            raise ValueError(f"rows must be a positive integer, instead: {rows}")
+        batch: List[Dict[str, Any]] = []
+        for data in self.iter_pages():
+            if not batch and len(data) == rows:
+                yield data
+                continue
+            start = 0
+            while start < len(data):
+                end = start + rows - len(batch)
+                batch.extend(data[start:end])
+                start = end
+                if len(batch) == rows:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _start_page(self, data: List[Any], next_page_token: Optional[str]) -> None:
+        self._last_page_token = self._next_page_token
+        self._next_page_token = next_page_token
+        self._rows_emitted_before_page += self._page_rows_emitted
+        self._page_length = len(data)
+        self._current_data_iterator = iter(data)
+        # a page requested again after a resume starts with the rows that were already emitted
+        if self._page_rows_to_skip:
+            self._current_data_iterator = itertools.islice(self._current_data_iterator, self._page_rows_to_skip, None)
+            self._page_rows_emitted, self._page_rows_to_skip = self._page_rows_to_skip, 0
+        else:
+            self._page_rows_emitted = 0
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Returns the position of the iteration as JSON serializable dict, e.g. to continue an export that failed on page
+        3,000 with `DataCollection.from_checkpoint(checkpoint, client)` instead of starting over:
+
+        ```
+        data_collection = client.get_market_trades("coinbase-btc-usd-spot", start_time="2020-01-01")
+        try:
+            data_collection.export_to_csv("trades.csv")
+        except Exception:
+            json.dump(data_collection.checkpoint(), open("trades.checkpoint.json", "w"))
+        ...
+        DataCollection.from_checkpoint(json.load(open("trades.checkpoint.json")), client).export_to_csv("trades.csv")
+        ```
+
+        The page being consumed is requested again on resume and its rows that were already emitted are skipped.
+        `json_stream` responses are requested again from the start and skip all emitted rows.
+        :return: Dict with keys endpoint, url_params, next_page_token, page_rows_emitted, rows_emitted, finished and columns_to_store
+        :rtype: dict
+        """
+        page_rows_emitted = self._page_rows_emitted
+        if self._is_stream:
+            next_page_token: Optional[str] = None
+        elif self._page_length is not None and page_rows_emitted < self._page_length:
+            # the current page is not fully consumed yet
+            next_page_token = self._last_page_token
+        else:
+            next_page_token = self._next_page_token
+            page_rows_emitted = 0
+        if self._is_stream:
+            finished = self._page_length is not None
+        else:
+            finished = not next_page_token and self._last_page_token is not None and page_rows_emitted == 0
+        return {
+            "endpoint": self._endpoint,
+            "url_params": transform_url_params_values_to_str(self._url_params),
+            "next_page_token": next_page_token or "",
+            "page_rows_emitted": page_rows_emitted,
+            "rows_emitted": self._rows_emitted_before_page + self._page_rows_emitted,
+            "finished": finished,
+            "columns_to_store": list(self._columns_to_store),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Dict[str, Any], client: CoinMetricsClient, **kwargs: Any) -> "DataCollection":
+        """
+        Creates a DataCollection that continues the iteration saved by `checkpoint()`. Exports of a resumed
+        collection append to an existing file and CSV exports do not repeat the header.
+        :param checkpoint: checkpoint returned by `DataCollection.checkpoint()`
+        :type checkpoint: dict
+        :param client: The CoinMetricsClient to use to retrieve the rest of the data.
+        :type client: CoinMetricsClient
+        :param kwargs: other arguments of the DataCollection, e.g. dtype_mapper
+        :return: DataCollection positioned at the checkpoint
+        """
+        kwargs.setdefault("columns_to_store", checkpoint.get("columns_to_store") or [])
+        data_collection = cls(client._get_data, checkpoint["endpoint"], dict(checkpoint["url_params"]), client=client, **kwargs)
+        data_collection._rows_emitted_before_page = checkpoint["rows_emitted"] - checkpoint["page_rows_emitted"]
+        data_collection._resumed = checkpoint["rows_emitted"] > 0
+        if checkpoint["finished"]:
+            data_collection._current_data_iterator = iter([])
+            data_collection._page_length = 0
+            data_collection._next_page_token = None
+            data_collection._last_page_token = " "
+        elif data_collection._is_stream:
+            data_collection._page_rows_emitted = checkpoint["rows_emitted"]
+            data_collection._rows_emitted_before_page = 0
+        else:
+            data_collection._next_page_token = checkpoint["next_page_token"]
+            data_collection._page_rows_to_skip = checkpoint["page_rows_emitted"]
+        return data_collection
 
     def __iter__(self) -> "DataCollection":
         return self
 
+    def prefetch(self, prefetch_pages: int = 2) -> "DataCollection":
+        """
+        Enables background prefetching: a worker thread follows `next_page_token` and keeps up to `prefetch_pages`
+        pages ready while the current page is being consumed, so network latency overlaps with row processing.
+        Has no effect on `json_stream` responses, which are already streamed.
+        :param prefetch_pages: maximum number of pages held in memory ahead of the consumer
+        :type prefetch_pages: int
+        :return: this DataCollection
+        """
+        if prefetch_pages < 0:
+            raise ValueError(f"prefetch_pages must be a non negative integer, instead: {prefetch_pages}")
+        self._prefetch_pages = prefetch_pages
+        return self
+
+    def bidirectional(self, bidirectional: bool = True) -> "DataCollection":
+        """
+        Enables bidirectional paging for time series of a single entity (e.g. one market): one thread follows the
+        pages from the start of the time range (`paging_from="start"`) and another one from the end
+        (`paging_from="end"`) until they meet, which takes about half the time of following the pages of a long range
+        one by one. Rows are returned in time order: the pages from the start as they arrive, then the pages from the
+        end, which are held in memory until the two meet. Rows where they overlap are returned once, by
+        (time, coin_metrics_id). Applies to iteration, `iter_pages()`, dataframes and exports, except
+        `export_to_csv(passthrough=True)`. Requests of several entities or of wildcards (e.g. `markets="a,b"`, whose
+        rows are ordered by entity first; use `.parallel()` to page each one from both ends), requests with
+        `limit_per_*`, `json_stream` responses and resumed collections are paged as usual.
+        :param bidirectional: whether to page from both ends
+        :type bidirectional: bool
+        :return: this DataCollection
+        """
+        self._bidirectional = bidirectional
+        return self
+
+    def _supports_bidirectional_paging(self) -> bool:
+        # rows of several entities are ordered by entity and then by time, so the two ends would not meet
+        entities = [
+            list(value) if isinstance(value, (list, tuple)) else str(value).split(",")
+            for value in (self._url_params.get(param) for param in _ENTITY_PARAMS)
+            if value is not None
+        ]
+        return (
+            len(entities) == 1
+            and len(entities[0]) == 1
+            and "*" not in str(entities[0][0])
+            and self._endpoint.startswith("timeseries/")
+            and self._paginated
+            and not any(param.startswith("limit_per_") for param in self._url_params)
+            # the iteration has not started
+            and self._current_data_iterator is None
+            and self._last_page_token is None
+            and not self._resumed
+        )
+
+    def _iter_bidirectional_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        page_queue: "queue.Queue[Any]" = queue.Queue(maxsize=2 * max(self._prefetch_pages, 1))
+        stop_event = threading.Event()
+        for paging_from in ("start", "end"):
+            threading.Thread(
+                target=_prefetch_pages_worker,
+                args=(
+                    self._data_retrieval_function,
+                    self._endpoint,
+                    {**self._url_params, "paging_from": paging_from},
+                    page_queue,
+                    stop_event,
+                ),
+                kwargs={"tag": paging_from},
+                name=f"cm-{paging_from}-pages-{self._endpoint}",
+                daemon=True,
+            ).start()
+        # the time of the last row returned from the start, and the keys of the rows returned at that time
+        last_time: Optional[str] = None
+        last_keys: Set[Any] = set()
+        # pages from the end, latest first; they only cover complete times above their earliest one
+        end_pages: List[List[Dict[str, Any]]] = []
+        end_time: Optional[str] = None
+        try:
+            while True:
+                paging_from, api_response = page_queue.get()
+                if isinstance(api_response, BaseException):
+                    raise api_response
+                if api_response is _END_OF_PAGES:
+                    if paging_from == "start":
+                        # all rows were returned from the start
+                        return
+                    break
+                data = _response_rows(api_response)
+                times = [row["time"] for row in data]
+                if not times:
+                    continue
+                if paging_from == "end":
+                    end_pages.append(data)
+                    end_time = min(times) if end_time is None else min(end_time, min(times))
+                    if last_time is not None and end_time < last_time:
+                        # the pages from the end cover everything after last_time
+                        break
+                    continue
+                crossed = end_time is not None and max(times) > end_time
+                if crossed:
+                    # the page covers all rows up to end_time, the pages from the end the ones after it
+                    data = [row for row in data if row["time"] <= cast(str, end_time)]
+                if data:
+                    page_last_time = max(row["time"] for row in data)
+                    if page_last_time != last_time:
+                        last_time, last_keys = page_last_time, set()
+                    last_keys.update(_row_key(row) for row in data if row["time"] == last_time)
+                    yield data
+                if crossed:
+                    break
+        finally:
+            stop_event.set()
+        for data in reversed(end_pages):
+            if last_time is not None:
+                data = [
+                    row for row in data
+                    if row["time"] > last_time or row["time"] == last_time and _row_key(row) not in last_keys
+                ]
+            if data:
+                yield data
+
+    def _get_prefetched_page(self) -> Any:
+        if self._prefetch_finished or (not self._next_page_token and self._last_page_token is not None):
+            return _END_OF_PAGES
+        if self._prefetch_queue is None:
+            self._prefetch_queue = queue.Queue(maxsize=self._prefetch_pages)
+            stop_event = threading.Event()
+            threading.Thread(
+                target=_prefetch_pages_worker,
+                args=(
+                    self._data_retrieval_function,
+                    self._endpoint,
+                    dict(self._url_params),
+                    self._prefetch_queue,
+                    stop_event,
+                    self._next_page_token or None,
+                ),
+                name=f"cm-prefetch-{self._endpoint}",
+                daemon=True,
+            ).start()
+            # the worker holds no reference to the collection, so it stops once the collection is garbage collected
+            weakref.finalize(self, stop_event.set)
+
+        api_response = self._prefetch_queue.get()
+        if api_response is _END_OF_PAGES:
+            self._prefetch_finished = True
+            self._prefetch_queue = None
+        elif isinstance(api_response, BaseException):
+            self._prefetch_finished = True
+            self._prefetch_queue = None
+            raise api_response
+        return api_response
+
     def _fetch_data_with_retries(
         self, url_params: Dict[str, UrlParamTypes]
     ) -> DataReturnType:
-        for i in range(1, NUMBER_OF_RETRIES + 1):
-            try:
-                return self._data_retrieval_function(self._endpoint, url_params)
-            except requests.exceptions.ProxyError as e:
-                if i == NUMBER_OF_RETRIES:
-                    raise
-                logger.warning(
-                    "failed to fetch data with error: %s, retrying in 1 second, try (%s/%s)",
-                    e,
-                    i,
-                    NUMBER_OF_RETRIES,
-                )
-                sleep(1)
-
-        raise DataFetchError("Failed to fetch data")
+        return _fetch_data_with_retries(self._data_retrieval_function, self._endpoint, url_params)
 
     def export_to_csv(
         self,
         path_or_bufstr: FilePathOrBuffer = None,
         columns_to_store: Optional[List[str]] = None,
         compress: bool = False,
+        *,
+        passthrough: bool = False,
     ) -> Optional[str]:
+        """
+        Exports the data to a CSV file, or returns it as str if no path or buffer is given.
+
+        :param path_or_bufstr: Path or file object to write to.
+        :type path_or_bufstr: str, Path, IO
+        :param columns_to_store: Columns to write, inferred from the Coin Metrics API schema or the first row if not specified.
+        :type columns_to_store: List[str]
+        :param compress: Whether to gzip the output.
+        :type compress: bool
+        :param passthrough: Request the data with `format=csv` and write the CSV of the API as it is received, without parsing rows on the client, following the `x-next-page-url` header and keeping only the header of the first page. Unlike the client side conversion, values are not quoted and nulls are empty. Only for the endpoints in `CSV_FORMAT_ENDPOINTS` and when columns_to_store is not set; other exports fall back to the client side conversion.
+        :type passthrough: bool
+        """
         if not self._csv_export_supported:
             raise CsvExportError(
                 "Sorry, csv export is not supported for this data type."
             )
 
+        if passthrough:
+            if self._supports_csv_passthrough(columns_to_store):
+                return self._export_to_file(self._get_csv_passthrough_lines(), path_or_bufstr, compress)
+            logger.info("format=csv is not supported for %s, converting JSON to CSV on the client", self._endpoint)
         return self._export_to_file(
             self._get_csv_data_lines(columns_to_store), path_or_bufstr, compress
         )
 
+    def _supports_csv_passthrough(self, columns_to_store: Optional[List[str]]) -> bool:
+        return (
+            self._client is not None
+            and self._endpoint in CSV_FORMAT_ENDPOINTS
+            and self.API_RETURN_MODEL is None
+            and columns_to_store is None
+            and not self._columns_to_store
+            # only from a page boundary: the iteration has not started, or continues from a checkpoint
+            and self._current_data_iterator is None
+            and self._prefetch_queue is None
+            and not (self._is_stream and self._page_rows_emitted)
+        )
+
+    def _get_csv_passthrough_lines(self) -> Iterable[bytes]:
+        """
+        Yields the lines of `format=csv` responses page by page, as blocks of complete lines so that the rows written
+        are known to checkpoint(). A page interrupted by a transient error is requested again and its rows that were
+        already written are skipped.
+        """
+        url_params = dict(self._url_params)
+        url_params["format"] = "csv"
+        header_written = self._resumed
+        while self._next_page_token or self._last_page_token is None:
+            page_url_params = dict(url_params)
+            if self._next_page_token:
+                page_url_params["next_page_token"] = self._next_page_token
+            self._last_page_token = self._next_page_token or ""
+            self._rows_emitted_before_page += self._page_rows_emitted
+            self._page_rows_emitted, self._page_rows_to_skip = self._page_rows_to_skip, 0
+            # the number of rows of a CSV page is known once it is read, until then checkpoint() points into the page
+            self._page_length = sys.maxsize
+            for attempt in range(1, NUMBER_OF_RETRIES + 1):
+                rows_to_skip = self._page_rows_emitted
+                chunks, next_page_token = _fetch_data_with_retries(self._client._get_raw_data, self._endpoint, page_url_params)  # type: ignore
+                try:
+                    header = None
+                    for block in _iter_line_blocks(chunks):
+                        if header is None:
+                            # every page starts with the header
+                            header, _, block = block.partition(b"\n")
+                            if not header_written:
+                                yield header + b"\n"
+                                header_written = True
+                        while rows_to_skip and block:
+                            block = block.partition(b"\n")[2]
+                            rows_to_skip -= 1
+                        if block:
+                            yield block
+                            self._page_rows_emitted += block.count(b"\n")
+                    break
+                except Exception as e:
+                    if attempt == NUMBER_OF_RETRIES or not _is_transient_error(e):
+                        raise
+                    logger.warning("csv page interrupted with error: %s, requesting it again after %s rows", e, self._page_rows_emitted)
+            self._next_page_token = next_page_token
+            self._page_length = self._page_rows_emitted
+
     def _get_csv_data_lines(
         self, columns_to_store: Optional[List[str]]
     ) -> Iterable[bytes]:
@@ -243,79 +743,161 @@ class DataCollection:
             except StopIteration:
                 logger.info("no data to export")
                 return
-            if self.API_RETURN_MODEL:
-                columns_to_store = self.API_RETURN_MODEL.get_dataframe_cols()
-            elif (
-                # for timeseries/{*-metrics}
-                self._endpoint.split("/")[0] == "timeseries"
-                and self._endpoint.split("/")[1].split("-")[-1] == "metrics"
-                and self._url_params.get("metrics") is not None
-            ):
-                entity = ["_".join(self._endpoint.split("/")[1].split("-")[:-1])]
-                metrics = self._url_params.get("metrics")
-                if isinstance(metrics, str):
-                    metrics = metrics.split(",")
-                else:
-                    metrics = list(metrics)  # type: ignore
-                if (
-                    any(m.startswith(("Sply", "Flow")) for m in metrics)
-                ):
-                    metrics_copy = metrics[:]
-                    for metric in metrics_copy:
-                        if (
-                            metric.startswith("Sply")
-                            or metric.startswith("Flow")
-                            or metric.startswith("TxEx")
-                        ):
-                            metrics.append(f"{metric}-status-time")
-                            metrics.append(f"{metric}-status")
-                if self._url_params.get("frequency") == "1b":
-                    time = ["time", "block_hash", "parent_block_hash", "height"]
-                else:
-                    time = ["time"]
-                columns_to_store = time + entity + metrics
-            elif self._columns_to_store:
-                columns_to_store = self._columns_to_store
-            else:
-                columns_to_store = list(first_data_el.keys())
+            columns_to_store = self._infer_columns_to_store(first_data_el)
 
-        yield (",".join(columns_to_store) + "\n").encode()
+        if not self._resumed:
+            # a resumed export appends to a file that already has the header
+            yield (",".join(columns_to_store) + "\n").encode()
 
         if first_data_el is not None:
-            yield (
-                ",".join(
-                    f'"{first_data_el.get(column)}"' or ""
-                    for column in columns_to_store
-                )
-                + "\n"
-            ).encode()
-        for data_el in self:
-            yield (
-                ",".join(
-                    f'"{data_el.get(column)}"' or "" for column in columns_to_store
-                )
-                + "\n"
-            ).encode()
+            yield _format_csv_rows([first_data_el], columns_to_store)
+        for data in self.iter_pages():
+            yield _format_csv_rows(data, columns_to_store)
+
+    def _infer_columns_to_store(self, first_data_el: Dict[str, Any]) -> List[str]:
+        """
+        Columns of CSV exports and dataframes: the columns of the API return model, the requested metrics of
+        timeseries/*-metrics endpoints, the columns_to_store of the DataCollection or the keys of the first row.
+        """
+        if self.API_RETURN_MODEL:
+            return self.API_RETURN_MODEL.get_dataframe_cols()
+        elif (
+            # for timeseries/{*-metrics}
+            self._endpoint.split("/")[0] == "timeseries"
+            and self._endpoint.split("/")[1].split("-")[-1] == "metrics"
+            and self._url_params.get("metrics") is not None
+        ):
+            entity = ["_".join(self._endpoint.split("/")[1].split("-")[:-1])]
+            metrics = self._url_params.get("metrics")
+            if isinstance(metrics, str):
+                metrics = metrics.split(",")
+            else:
+                metrics = list(metrics)  # type: ignore
+            if (
+                any(m.startswith(("Sply", "Flow")) for m in metrics)
+            ):
+                metrics_copy = metrics[:]
+                for metric in metrics_copy:
+                    if (
+                        metric.startswith("Sply")
+                        or metric.startswith("Flow")
+                        or metric.startswith("TxEx")
+                    ):
+                        metrics.append(f"{metric}-status-time")
+                        metrics.append(f"{metric}-status")
+            if self._url_params.get("frequency") == "1b":
+                time = ["time", "block_hash", "parent_block_hash", "height"]
+            else:
+                time = ["time"]
+            return time + entity + metrics
+        elif self._columns_to_store:
+            return self._columns_to_store
+        else:
+            return list(first_data_el.keys())
 
     def export_to_json(
         self,
         path_or_bufstr: FilePathOrBuffer = None,
-        compress: bool = False
+        compress: Union[bool, str] = False,
+        *,
+        passthrough: bool = False,
     ) -> Optional[str]:
-        def _gen_json_lines() -> Iterable[bytes]:
-            for data_row in self:
-                yield json_dumps(data_row) + b"\n"
+        """
+        Exports the data to a JSON lines file, or returns it as str if no path or buffer is given.
+
+        :param path_or_bufstr: Path or file object to write to.
+        :type path_or_bufstr: str, Path, IO
+        :param compress: Whether to compress the output: True or "gzip" for gzip, "zstd" for zstd (requires zstandard). Needs a path or buffer.
+        :type compress: bool, str
+        :param passthrough: Write the lines of a `format="json_stream"` response as they are received, without parsing and serializing every row on the client. Lines are only checked to be JSON objects. Collections of other formats fall back to the client side serialization.
+        :type passthrough: bool
+        """
+        return self._export_to_file(self._get_json_lines(passthrough), path_or_bufstr, compress)
 
-        return self._export_to_file(_gen_json_lines(), path_or_bufstr, compress)
+    def _get_json_lines(self, passthrough: bool = False) -> Iterable[bytes]:
+        """
+        Yields the JSON lines of the data in blocks, one per page or per chunk of a passthrough json_stream.
+        """
+        if passthrough:
+            if self._supports_json_passthrough():
+                yield from self._get_json_passthrough_lines()
+                return
+            logger.info("%s is not a json_stream, serializing rows on the client", self._endpoint)
+        for data in self.iter_pages():
+            yield b"".join([json_dumps(data_row) + b"\n" for data_row in data])
+
+    def export_to_parquet(
+        self,
+        path_or_buf: Union[str, "os.PathLike[str]", IO[bytes]],
+        compression: str = "snappy",
+        row_group_size: int = DEFAULT_ROW_GROUP_ROWS,
+    ) -> None:
+        """
+        Exports the data to a Parquet file with the schema of `iter_record_batches()`. Pages are written as they
+        arrive, in row groups of up to `row_group_size` rows, so memory stays bounded for any size of result. No file
+        is written if there is no data. Requires pyarrow.
+
+        :param path_or_buf: Path or binary file object to write to.
+        :type path_or_buf: str, Path, IO[bytes]
+        :param compression: Parquet compression codec, e.g. "snappy", "zstd", "gzip" or "none".
+        :type compression: str
+        :param row_group_size: Maximum number of rows per row group.
+        :type row_group_size: int
+        """
+        require_pyarrow()
+        if isinstance(path_or_buf, (str, os.PathLike)):
+            dirname = os.path.dirname(path_or_buf)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+        if write_parquet(self.iter_record_batches(), path_or_buf, compression, row_group_size) == 0:
+            logger.info("no data to export")
+
+    def _supports_json_passthrough(self) -> bool:
+        return (
+            self._client is not None
+            and self._is_stream
+            # the stream was not opened yet; a collection resumed from a checkpoint skips the rows it emitted
+            and self._current_data_iterator is None
+            and self._page_length is None
+        )
+
+    def _get_json_passthrough_lines(self) -> Iterable[bytes]:
+        """
+        Yields the raw lines of a json_stream response in blocks, one per chunk read. A stream interrupted by a
+        transient error is requested again and skips the lines that were already written.
+        """
+        while True:
+            rows_to_skip = self._page_rows_emitted
+            chunks, _ = _fetch_data_with_retries(self._client._get_raw_data, self._endpoint, dict(self._url_params))  # type: ignore
+            try:
+                for lines in iter_ndjson_line_batches(chunks):
+                    if rows_to_skip:
+                        skipped = min(rows_to_skip, len(lines))
+                        lines = lines[skipped:]
+                        rows_to_skip -= skipped
+                        if not lines:
+                            continue
+                    validate_ndjson_lines(lines)
+                    yield b"\n".join(lines) + b"\n"
+                    self._page_rows_emitted += len(lines)
+                # The stream is consumed.
+                self._page_length = self._page_rows_emitted
+                return
+            except Exception as e:
+                if not _is_transient_error(e):
+                    raise
+                logger.warning("json_stream interrupted with error: %s, resuming after %s rows", e, self._page_rows_emitted)
 
     def _export_to_file(
         self,
         data_generator: Iterable[bytes],
         path_or_bufstr: FilePathOrBuffer = None,
-        compress: bool = False,
+        compress: Union[bool, str] = False,
     ) -> Optional[str]:
 
         if path_or_bufstr is None:
+            if compress:
+                raise ValueError("Compressed exports need a path or buffer to write to")
             path_or_bufstr_obj: FilePathOrBuffer = BytesIO()
         else:
             path_or_bufstr_obj = path_or_bufstr
@@ -331,18 +913,16 @@ class DataCollection:
                     os.makedirs(dirname, exist_ok=True)
                 elif not os.path.isdir(dirname):
                     return None
-            f = open(path_or_bufstr_obj, "wb")  # type: ignore
+            f = open(path_or_bufstr_obj, "ab" if self._resumed else "wb")  # type: ignore
             close = True
-        if compress:
-            output_file = GzipFile(fileobj=f)  # type: ignore
-        else:
-            output_file = f  # type: ignore
+        compressed_file = get_compressed_writer(f, compress)  # type: ignore
+        output_file = compressed_file if compressed_file is not None else f
         try:
             for line in data_generator:
-                output_file.write(line)
+                output_file.write(line)  # type: ignore
         finally:
-            if compress:
-                output_file.close()
+            if compressed_file is not None:
+                compressed_file.close()
             if close:
                 f.close()  # type: ignore
 
@@ -382,53 +962,17 @@ class DataCollection:
             return None
         else:
             if optimize_dtypes:
-                f = BytesIO()
-                self.export_to_csv(f)
-                if f.getbuffer().nbytes == 0:
-                    return pd.DataFrame()
-                else:
-                    f.seek(0)
-                    # if self.API_RETURN_MODEL:
-                    #     columns = self.API_RETURN_MODEL.get_dataframe_cols()
-                    # else:
-                    columns = (
-                        BytesIO(f.getvalue())
-                        .readlines(1)[0]
-                        .decode()
-                        .strip()
-                        .split(",")
-                    )
-                    datetime_cols = [
-                        c for c in columns if c.endswith("_time") or c == "time"
-                    ]
-                    buffer: BytesIO = f
-                    cols: List[str] = datetime_cols
-                    dtype_map: Optional[Dict[str, Any]] = dtype_mapper
-                    if dataframe_type == 'pandas':
-                        df = pd.read_csv(
-                            buffer,
-                            parse_dates=cols,
-                            dtype=dtype_map,
-                        )
-                        if dtype_mapper is None:
-                            df = df.convert_dtypes()
-                        if df.dtypes.get("coin_metrics_id") == np.dtype("object"):
-                            df["coin_metrics_id"] = df["coin_metrics_id"].astype(np.float128)
-                        if header is not None:
-                            assert len(df.columns) == len(
-                                header
-                            ), "header length does not match output values"
-                            df.columns = pd.Index(header)
-                        return df
-                    elif dataframe_type == 'polars':
-                        df = pl.read_csv(
-                            buffer,
-                            try_parse_dates=True,
-                            null_values=["None"]
-                        )
-                        return df
-                    else:
-                        raise ValueError("Invalid dataframe_type. Choose one of 'polars' or 'pandas'")
+                if dataframe_type not in ("pandas", "polars"):
+                    raise ValueError("Invalid dataframe_type. Choose one of 'polars' or 'pandas'")
+                pages = self.iter_pages()
+                first_page = next(pages, None)
+                if first_page is None:
+                    return pd.DataFrame() if dataframe_type == "pandas" else pl.DataFrame()
+                builder = self._new_frame_builder(first_page[0], dtype_mapper, dataframe_type)
+                builder.append_page(first_page)
+                for data in pages:
+                    builder.append_page(data)
+                return self._build_dataframe(builder, header, dtype_mapper)
             else:
                 if dataframe_type == 'pandas':
                     if dtype_mapper is None:
@@ -457,8 +1001,160 @@ class DataCollection:
                 else:
                     raise ValueError("Invalid dataframe_type. Choose one of 'polars' or 'pandas'")
 
-    def to_lazyframe(self, **kwargs: Any) -> pl.LazyFrame:
-        return pl.LazyFrame(self, **kwargs)
+    def _new_frame_builder(
+        self, first_data_el: Dict[str, Any], dtype_mapper: Optional[Dict[str, Any]], dataframe_type: str
+    ) -> Union[ColumnarFrameBuilder, PolarsFrameBuilder]:
+        """
+        Returns the builder that to_dataframe(optimize_dtypes=True) appends the pages to, see `_build_dataframe`.
+        """
+        columns = self._infer_columns_to_store(first_data_el)
+        if dataframe_type == "polars":
+            return PolarsFrameBuilder(columns, polars_schema(self._endpoint, columns, dtype_mapper))
+        return ColumnarFrameBuilder(columns)
+
+    def _build_dataframe(
+        self,
+        builder: Union[ColumnarFrameBuilder, PolarsFrameBuilder],
+        header: Optional[List[str]],
+        dtype_mapper: Optional[Dict[str, Any]],
+    ) -> DataFrameType:
+        if isinstance(builder, PolarsFrameBuilder):
+            return builder.to_polars()
+        df = builder.to_pandas(dtype_mapper)
+        if df.dtypes.get("coin_metrics_id") == np.dtype("object"):
+            df["coin_metrics_id"] = df["coin_metrics_id"].astype(np.float128)
+        if header is not None:
+            assert len(df.columns) == len(
+                header
+            ), "header length does not match output values"
+            df.columns = pd.Index(header)
+        return df
+
+    def iter_record_batches(self) -> Iterator["pa.RecordBatch"]:
+        """
+        Streams the data as Apache Arrow record batches, one per page (or per chunk of a `json_stream` response), so
+        that large results can be handed to Arrow consumers like DuckDB or polars with bounded memory. All batches have
+        the schema derived from the OpenAPI field types of the endpoint; timestamps are timestamp[ns, UTC] and numbers
+        are decimal strings. Requires pyarrow.
+        :return: iterator of pyarrow.RecordBatch
+        """
+        require_pyarrow()
+        pages = self.iter_pages()
+        first_page = next(pages, None)
+        if first_page is None:
+            return
+        builder = RecordBatchBuilder(self._endpoint, self._infer_columns_to_store(first_page[0]), first_page)
+        yield builder.to_record_batch(first_page)
+        for data in pages:
+            yield builder.to_record_batch(data)
+
+    def to_arrow(self) -> "pa.Table":
+        """
+        Outputs the data as a pyarrow Table built from `iter_record_batches()`. Requires pyarrow.
+        :return: Data in a pyarrow Table, without columns if there is no data
+        :rtype: pyarrow.Table
+        """
+        require_pyarrow()
+        batches = list(self.iter_record_batches())
+        if not batches:
+            return pa.table({})
+        return pa.Table.from_batches(batches)
+
+    def to_lazyframe(self, schema_overrides: Optional[Dict[str, Any]] = None, **kwargs: Any) -> pl.LazyFrame:
+        """
+        Outputs a polars LazyFrame that requests the data only when it is collected, one DataFrame per page. The
+        query is pushed down into the request where the API can evaluate it:
+        `select()` of metric columns is sent as the `metrics` parameter,
+        `filter()` on `time` as `start_time`/`end_time` and on `asset`, `market` and other entity columns as the
+        matching parameter (e.g. `assets`), and `head(n)` as `page_size` and `limit_per_*` if the pages start at
+        the beginning of the interval (`paging_from="start"` or `format="json_stream"`). Pages after the first n
+        rows are not requested. The filter is still applied to the returned rows, so it may contain any expression.
+
+        The schema is read from a request of one row when the plan is resolved: timestamps are Datetime, fields
+        typed in the OpenAPI schema or the `dtype_mapper` have their dtype and other columns are strings.
+        Columns that are missing from the first row, other than the requested metrics, are not part of the frame.
+
+        :param schema_overrides: dtypes of columns that replace those of the schema, e.g. {"price": pl.Float64}
+        :type schema_overrides: Dict[str, pl.DataType]
+        :param kwargs: arguments of the pl.LazyFrame constructor, e.g. `schema`. With these the data is read
+        when the frame is created, as before.
+        :return: polars LazyFrame
+        :rtype: pl.LazyFrame
+        """
+        if kwargs:
+            return pl.LazyFrame(self, schema_overrides=schema_overrides, **kwargs)
+        schema: Optional[pl.Schema] = None
+
+        def get_schema() -> pl.Schema:
+            nonlocal schema
+            if schema is None:
+                schema = self._get_lazy_schema(schema_overrides or {})
+            return schema
+
+        def source(
+            with_columns: Optional[List[str]], predicate: Optional[pl.Expr], n_rows: Optional[int], batch_size: Optional[int]
+        ) -> Iterator[pl.DataFrame]:
+            url_params = pushdown_url_params(self._url_params, with_columns, predicate, n_rows)
+            if url_params is None:
+                return
+            columns = with_columns if with_columns is not None else get_schema().names()
+            dtypes = {column: get_schema()[column] for column in columns}
+            rows_left = n_rows
+            for data in self._copy_with_url_params(url_params).iter_pages():
+                if rows_left is not None:
+                    data = data[:rows_left]
+                    rows_left -= len(data)
+                # timestamps are parsed by cast_series unless the builder recognises the column
+                builder = PolarsFrameBuilder(
+                    columns, {column: pl.String() if isinstance(dtype, pl.Datetime) else dtype for column, dtype in dtypes.items()}
+                )
+                builder.append_page(data)
+                df = builder.to_polars()
+                df = df.select([cast_series(df.get_column(column), dtype) for column, dtype in dtypes.items()])
+                yield df.filter(predicate) if predicate is not None else df
+                if rows_left == 0:
+                    return
+
+        return register_io_source(source, schema=get_schema)
+
+    def _get_lazy_schema(self, schema_overrides: Dict[str, Any]) -> pl.Schema:
+        url_params = dict(self._url_params)
+        if "page_size" in url_params:
+            url_params["page_size"] = 1
+        pages = cast(Generator[List[Dict[str, Any]], None, None], self._copy_with_url_params(url_params).iter_pages())
+        try:
+            first_page = next(pages, None)
+        finally:
+            pages.close()
+        first_row = first_page[0] if first_page else {}
+        columns = self._infer_columns_to_store(first_row)
+        dtypes: Dict[str, Any] = polars_schema(self._endpoint, columns, self._dtype_mapper)
+        for column in columns:
+            value = first_row.get(column)
+            if column in dtypes:
+                continue
+            elif is_datetime_column(column) and (
+                value is None or pl.Series([value]).str.to_datetime(time_zone="UTC", strict=False).null_count() == 0
+            ):
+                dtypes[column] = pl.Datetime("us", "UTC")
+            elif isinstance(value, bool):
+                dtypes[column] = pl.Boolean()
+            else:
+                dtypes[column] = pl.String()
+        dtypes.update(schema_overrides)
+        return pl.Schema([(column, dtypes[column]) for column in columns])
+
+    def _copy_with_url_params(self, url_params: Dict[str, UrlParamTypes]) -> DataCollection:
+        return DataCollection(
+            self._data_retrieval_function,
+            self._endpoint,
+            url_params,
+            self._csv_export_supported,
+            self._columns_to_store,
+            client=self._client,
+            prefetch_pages=self._prefetch_pages,
+            bidirectional=self._bidirectional,
+        )
 
     def parallel(
             self,
@@ -467,7 +1163,9 @@ class DataCollection:
             max_workers: Optional[int] = None,
             progress_bar: Optional[bool] = None,
             time_increment: Optional[Union[relativedelta, timedelta, DateOffset]] = None,
-            height_increment: Optional[int] = None
+            height_increment: Optional[int] = None,
+            chunking: Optional[str] = None,
+            chunk_pages: int = DEFAULT_CHUNK_PAGES,
     ) -> "ParallelDataCollection":
         """
         This method will convert the DataCollection into a ParallelDataCollection - enabling the ability to split
@@ -476,9 +1174,13 @@ class DataCollection:
         based on the assets.
         :param parallelize_on: parameter(s) to parallelize on. Can be any list type parameters
         :type parallelize_on: List[str], str
-        :param executor: By defualt the ParallelDataCollection will use a ProcessPoolExecutor, but this can be changed
+        :param executor: By default the ParallelDataCollection will use a ThreadPoolExecutor. A ProcessPoolExecutor
+        runs `to_dataframe()`, `to_arrow()` and the `export_to_*_files()`/`export_to_parquet_dataset()` exports on
+        all cores: every worker process rebuilds the client from its settings and converts its data collections
+        itself. Iterating and the single file exports require threads
         :type executor: Executor
-        :param max_workers: Specify the number of parallel threads. By default this is 10 and cannot be increased beyond 10
+        :param max_workers: Specify the number of parallel threads. By default this is 10. Requests of all workers are
+        paced by the client's rate limiter, so workers beyond the rate limit budget wait instead of triggering 429 errors
         :type: int
         :param progress_bar: flag to show a progress bar for data export or not, by default is true
         :type progress_bar: bool
@@ -487,6 +1189,13 @@ class DataCollection:
         :param height_increment: Optionally, can split the data collections by height_increment. This feature splits
         data collections further by block height increment. If there is no "start_height" in the request it will raise a ValueError
         :type height_increment: int
+        :param chunking: "auto" splits the time range of every request into chunks of about `chunk_pages` pages, from
+        the density of its data in a sample of its first rows. Chunks that need more pages than estimated are split
+        again while they run, so that all workers stay busy until the end, when iterating and in `export_to_csv()` and
+        `export_to_json()`. Requires "start_time".
+        :type chunking: str
+        :param chunk_pages: The number of pages of a chunk with chunking="auto".
+        :type chunk_pages: int
         :return: ParallelDataCollection that matches the existing one
         """
         return ParallelDataCollection(self,
@@ -495,10 +1204,552 @@ class DataCollection:
                                       max_workers=max_workers,
                                       progress_bar=progress_bar,
                                       time_increment=time_increment,
-                                      height_increment=height_increment
+                                      height_increment=height_increment,
+                                      chunking=chunking,
+                                      chunk_pages=chunk_pages,
                                       )
 
 
+def _group_and_merge(dfs: List[pd.DataFrame], on: List[str]) -> pd.DataFrame:
+    """
+    This function is a helper to merge the dataframes of parallel data collections split on a parameter other than
+    the primary one. All the dataframes with common columns are concatenated first, then the columns of every group
+    are aligned to the sorted union of the `on` keys in one pass, which gives the rows of an outer merge of all groups
+    without the intermediate results of merging them pairwise.
+    :param dfs: List of dataframes
+    :param on: Columns that identify a row, e.g. time and asset
+    :return: DataFrame that combines the full list into one
+    """
+    grouped_dfs: Dict[Tuple[str, ...], List[pd.DataFrame]] = defaultdict(list)
+    for df in dfs:
+        if len(df.columns) > 0:
+            grouped_dfs[tuple(df.columns)].append(df)
+    if not grouped_dfs:
+        return pd.DataFrame()
+
+    columns = list(dict.fromkeys(column for key in grouped_dfs for column in key))
+    group_indexes = []
+    group_values = []
+    for key, group in grouped_dfs.items():
+        concatenated_df = pd.concat(group, axis=0)
+        group_indexes.append(pd.MultiIndex.from_frame(concatenated_df[on]))
+        group_values.append({column: concatenated_df[column].array for column in key if column not in on})
+    # usually every group has the same keys in the same order, e.g. when split on metrics
+    first_index = group_indexes[0]
+    other_indexes = [group_index for group_index in group_indexes[1:] if not group_index.equals(first_index)]
+    if len(columns) != sum(len(values) for values in group_values) + len(on) or not all(
+        index.is_unique for index in [first_index, *other_indexes]
+    ):
+        # rows repeat a key or groups share columns besides the key, which an outer merge pairs up or suffixes
+        concatenated_dfs = [pd.concat(group, axis=0) for group in grouped_dfs.values()]
+        result = concatenated_dfs[0]
+        for df in concatenated_dfs[1:]:
+            result = pd.merge(result, df, on=on, how='outer')
+        return result
+
+    index = first_index
+    for group_index in other_indexes:
+        index = index.union(group_index, sort=False)
+    index, order = index.sort_values(return_indexer=True)
+    data = {}
+    for group_index, values in zip(group_indexes, group_values):
+        for column, array in values.items():
+            if not other_indexes:
+                data[column] = pd.Series(array.take(order), index=index, name=column)
+            else:
+                data[column] = pd.Series(array, index=group_index, name=column).reindex(index)
+    return pd.DataFrame(data, index=index).reset_index()[columns]
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    if isinstance(error, requests.HTTPError):
+        status_code = error.response.status_code if error.response is not None else None
+        return status_code is not None and (status_code == 429 or status_code >= 500)
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+def _iter_line_blocks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Regroups chunks of bytes into blocks of complete lines, each ending with a newline.
+    """
+    remainder = b""
+    for chunk in chunks:
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            remainder += chunk
+            continue
+        yield remainder + chunk[:end + 1]
+        remainder = chunk[end + 1:]
+    if remainder.strip():
+        yield remainder + b"\n"
+
+
+def _retries_requests(data_retrieval_function: Callable[..., Any]) -> bool:
+    from coinmetrics.api_client import CoinMetricsClient
+
+    return isinstance(getattr(data_retrieval_function, "__self__", None), CoinMetricsClient)
+
+
+def _fetch_data_with_retries(
+    data_retrieval_function: Callable[[str, Dict[str, Any]], T],
+    endpoint: str,
+    url_params: Dict[str, UrlParamTypes],
+) -> T:
+    """
+    Requests a page, retrying the same params (and so the same next_page_token) on proxy and other transient errors.
+    Methods of a CoinMetricsClient are called once, the client retries its requests itself with one budget of
+    attempts, see `CoinMetricsClient._request`.
+    """
+    retries = 1 if _retries_requests(data_retrieval_function) else NUMBER_OF_RETRIES
+    for i in range(1, retries + 1):
+        try:
+            return data_retrieval_function(endpoint, url_params)
+        except Exception as e:
+            if i == retries or not _is_transient_error(e):
+                raise
+            wait_time = 2 ** (i - 1)
+            logger.warning(
+                "failed to fetch data with error: %s, retrying in %s second(s), try (%s/%s)",
+                e,
+                wait_time,
+                i,
+                NUMBER_OF_RETRIES,
+            )
+            sleep(wait_time)
+
+    raise DataFetchError("Failed to fetch data")
+
+
+def _prefetch_pages_worker(
+    data_retrieval_function: DataRetrievalFuncType,
+    endpoint: str,
+    url_params: Dict[str, UrlParamTypes],
+    page_queue: "queue.Queue[Any]",
+    stop_event: threading.Event,
+    next_page_token: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> None:
+    """
+    Follows next_page_token and puts every API response into a bounded queue. Blocks while the queue is full.
+    Exceptions are passed to the consumer through the queue, followed by the end of pages marker. With a `tag`, the
+    items are put as (tag, item), so that several workers can share the queue.
+    """
+    def _put(item: Any) -> bool:
+        return _put_until_stopped(page_queue, item if tag is None else (tag, item), stop_event)
+
+    try:
+        while not stop_event.is_set():
+            params = dict(url_params)
+            if next_page_token:
+                params["next_page_token"] = next_page_token
+            api_response = _fetch_data_with_retries(data_retrieval_function, endpoint, params)
+            if not _put(api_response):
+                return
+            if not isinstance(api_response, dict) or "data" not in api_response:
+                break
+            next_page_token = cast(Optional[str], api_response.get("next_page_token"))
+            if not next_page_token:
+                break
+    except Exception as e:
+        if not _put(e):
+            return
+    _put(_END_OF_PAGES)
+
+
+def _response_rows(api_response: Any) -> List[Dict[str, Any]]:
+    if isinstance(api_response, dict) and "data" in api_response:
+        return api_response.get("data") or []
+    return api_response if isinstance(api_response, list) else [api_response]
+
+
+def _row_key(row: Dict[str, Any]) -> Any:
+    """
+    Identifies a row among the rows of the same time: by its coin_metrics_id, or by all its values if it has none.
+    """
+    if "coin_metrics_id" in row:
+        return row["coin_metrics_id"]
+    return tuple((column, str(value)) for column, value in row.items())
+
+
+def _put_until_stopped(page_queue: "queue.Queue[Any]", item: Any, stop_event: threading.Event) -> bool:
+    """
+    Puts an item into a bounded queue, waiting while the queue is full.
+    :return: False if the consumer stopped before the item could be put
+    """
+    while not stop_event.is_set():
+        try:
+            page_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _AdaptiveChunk(DataCollection):
+    """
+    A time range of a ParallelDataCollection with chunking="auto". While the workers of the ParallelDataCollection
+    run it (`can_split`), it checks after `chunk_pages` pages whether the rest of its range is estimated to take more
+    than another `chunk_pages` pages. If so, it stops at the page and leaves the rest of the range as `remainder`,
+    split into pieces of about `chunk_pages` pages that idle workers run next. Rows at the time where it stopped are
+    skipped by the piece that continues from there.
+    """
+
+    def __init__(
+        self,
+        data_retrieval_function: DataRetrievalFuncType,
+        endpoint: str,
+        url_params: Dict[str, UrlParamTypes],
+        client: Optional[CoinMetricsClient] = None,
+        chunk_pages: int = DEFAULT_CHUNK_PAGES,
+        max_pieces: int = 10,
+        boundary_rows: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        super().__init__(data_retrieval_function, endpoint, url_params, csv_export_supported=True, client=client)
+        self.can_split = False
+        self.remainder: List[DataCollection] = []
+        self._chunk_pages = chunk_pages
+        self._max_pieces = max_pieces
+        self._boundary_rows = boundary_rows or []
+        self._paging_from_start = url_params.get("paging_from") == "start"
+
+    def _supports_csv_passthrough(self, columns_to_store: Optional[List[str]]) -> bool:
+        # the range is only split between parsed pages
+        return False
+
+    def _supports_json_passthrough(self) -> bool:
+        return False
+
+    def iter_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        pages = 0
+        # the time of the rows closest to the part of the range that is not requested yet, and these rows
+        edge_time: Optional[str] = None
+        edge_rows: List[Dict[str, Any]] = []
+        for data in super().iter_pages():
+            if self._boundary_rows:
+                boundary_time = self._boundary_rows[0].get("time")
+                data = [row for row in data if row.get("time") != boundary_time or row not in self._boundary_rows]
+            if not data:
+                continue
+            times = [row["time"] for row in data if row.get("time")]
+            if times:
+                page_edge = max(times) if self._paging_from_start else min(times)
+                if edge_time is None or page_edge != edge_time and (page_edge > edge_time) == self._paging_from_start:
+                    edge_time, edge_rows = page_edge, []
+                edge_rows.extend(row for row in data if row.get("time") == edge_time)
+            yield data
+            pages += 1
+            if self.can_split and pages >= self._chunk_pages and self._next_page_token and edge_time is not None:
+                self.remainder = self._split_remainder(pages, edge_time, edge_rows)
+                if self.remainder:
+                    return
+
+    def _split_remainder(self, pages: int, edge_time: str, edge_rows: List[Dict[str, Any]]) -> List[DataCollection]:
+        # the bounds of a piece may be the nanosecond timestamps of rows
+        start, end = (
+            parse_row_time(value) if isinstance(value, str) else ParallelDataCollection.parse_date(cast(datetime, value))
+            for value in (self._url_params["start_time"], self._url_params["end_time"])
+        )
+        edge = parse_row_time(edge_time)
+        if self._paging_from_start:
+            covered, remaining = edge - start, end - edge
+        else:
+            covered, remaining = end - edge, edge - start
+        pieces = min(self._max_pieces, estimate_pieces(pages, covered, remaining, self._chunk_pages))
+        if pieces < 2:
+            # the rest fits about one more chunk
+            return []
+        bounds = split_time_range(*((edge, end) if self._paging_from_start else (start, edge)), pieces)
+        remainder: List[DataCollection] = []
+        for index, (piece_start, piece_end) in enumerate(zip(bounds, bounds[1:])):
+            url_params = dict(self._url_params)
+            url_params.update({"start_time": piece_start, "end_time": piece_end, "start_inclusive": True, "end_inclusive": False})
+            boundary_rows = None
+            if self._paging_from_start and index == 0:
+                # the rows at the edge may continue on the next page, from the exact time of the row
+                url_params["start_time"] = edge_time
+                boundary_rows = edge_rows
+            elif not self._paging_from_start and index == len(bounds) - 2:
+                url_params.update({"end_time": edge_time, "end_inclusive": True})
+                boundary_rows = edge_rows
+            if index == 0 and not self._paging_from_start:
+                url_params["start_inclusive"] = self._url_params.get("start_inclusive", True)
+            if index == len(bounds) - 2 and self._paging_from_start:
+                url_params["end_inclusive"] = self._url_params.get("end_inclusive", True)
+            remainder.append(_AdaptiveChunk(
+                self._data_retrieval_function, self._endpoint, url_params, self._client,
+                self._chunk_pages, self._max_pieces, boundary_rows,
+            ))
+        return remainder
+
+
+TaskKey = Tuple[int, ...]
+
+
+def _parallel_pages_worker(
+    produce: Callable[[DataCollection, TaskKey, threading.Event], Iterable[Any]],
+    data_collection: DataCollection,
+    key: TaskKey,
+    page_queue: "queue.Queue[Any]",
+    stop_event: threading.Event,
+) -> bool:
+    """
+    Puts what `produce` makes of one data collection of a ParallelDataCollection (e.g. its pages) into a bounded
+    queue as (key, item) tuples. Blocks while the queue is full, so a slow consumer holds back the requests. An
+    exception is passed to the consumer through the queue.
+    :return: True if all items were put
+    """
+    try:
+        for item in produce(data_collection, key, stop_event):
+            if not _put_until_stopped(page_queue, (key, item), stop_event):
+                return False
+    except Exception as e:
+        _put_until_stopped(page_queue, (key, e), stop_event)
+        return False
+    return True
+
+
+def _run_worker_tasks(
+    produce: Callable[[DataCollection, TaskKey, threading.Event], Iterable[Any]],
+    tasks: "_WorkerTasks",
+    stop_event: threading.Event,
+) -> None:
+    """
+    One worker of a ParallelDataCollection: runs the pending data collections of `tasks`, smallest key first, until
+    there are none left. The pieces an `_AdaptiveChunk` leaves are added to the tasks before its end of pages marker
+    is put, so that the consumer knows about them when the chunk is finished.
+    """
+    while True:
+        task = tasks.take(stop_event)
+        if task is None:
+            return
+        key, data_collection = task
+        if isinstance(data_collection, _AdaptiveChunk):
+            data_collection.can_split = True
+        page_queue = tasks.queues[key]
+        finished = _parallel_pages_worker(produce, data_collection, key, page_queue, stop_event)
+        remainder = data_collection.remainder if finished and isinstance(data_collection, _AdaptiveChunk) else []
+        tasks.finish(key, remainder)
+        if finished and not _put_until_stopped(page_queue, (key, _END_OF_PAGES), stop_event):
+            return
+
+
+class _WorkerTasks:
+    """
+    The data collections the workers of a ParallelDataCollection run, and the queues their items are put into: one
+    queue per data collection if the consumer takes them in order, otherwise one for all. Data collections are keyed
+    by their position: (index,) for the planned ones, and the key of the chunk plus the index of the piece for the
+    pieces of an `_AdaptiveChunk`, so that they sort right after the chunk. Workers take the pending data collection
+    with the smallest key, so the one the ordered consumer waits for is never stuck behind later ones.
+    """
+
+    def __init__(self, data_collections: List[DataCollection], ordered: bool, buffer_pages: int, max_workers: int) -> None:
+        self.ordered = ordered
+        self.queues: Dict[TaskKey, "queue.Queue[Any]"] = {}
+        self.error: Optional[BaseException] = None
+        self._buffer_pages = buffer_pages
+        self._shared_queue: "queue.Queue[Any]" = queue.Queue(maxsize=buffer_pages * max_workers)
+        self._pending: List[Tuple[TaskKey, DataCollection]] = []
+        self._not_consumed: List[TaskKey] = []
+        self._running = 0
+        self._condition = threading.Condition()
+        for index, data_collection in enumerate(data_collections):
+            self._add((index,), data_collection)
+
+    def __len__(self) -> int:
+        return len(self.queues)
+
+    def _add(self, key: TaskKey, data_collection: DataCollection) -> None:
+        self.queues[key] = queue.Queue(maxsize=self._buffer_pages) if self.ordered else self._shared_queue
+        heapq.heappush(self._pending, (key, data_collection))
+        heapq.heappush(self._not_consumed, key)
+
+    def take(self, stop_event: threading.Event) -> Optional[Tuple[TaskKey, DataCollection]]:
+        """
+        :return: the pending data collection with the smallest key, or None once all are done or the consumer stopped.
+        Waits while there is none pending but a running one may still leave pieces.
+        """
+        with self._condition:
+            while not self._pending and self._running and not stop_event.is_set():
+                self._condition.wait(timeout=0.1)
+            if not self._pending or stop_event.is_set():
+                return None
+            self._running += 1
+            return heapq.heappop(self._pending)
+
+    def finish(self, key: TaskKey, remainder: List[DataCollection]) -> None:
+        with self._condition:
+            for index, data_collection in enumerate(remainder):
+                self._add(key + (index,), data_collection)
+            self._running -= 1
+            self._condition.notify_all()
+
+    def fail(self, future: "Future[None]") -> None:
+        # errors of the executor itself would otherwise leave the consumer waiting
+        if not future.cancelled() and future.exception() is not None:
+            self.error = future.exception()
+
+    def next_queue(self) -> Optional["queue.Queue[Any]"]:
+        """
+        :return: the queue the consumer takes the next items from: in order, the queue of the data collection with the
+        smallest key that is not consumed yet, or None once all are consumed
+        """
+        with self._condition:
+            if not self._not_consumed:
+                return None
+            key = heapq.heappop(self._not_consumed) if self.ordered else self._not_consumed[0]
+            return self.queues[key]
+
+    def consumed(self, key: TaskKey) -> None:
+        if not self.ordered:
+            with self._condition:
+                self._not_consumed.remove(key)
+                heapq.heapify(self._not_consumed)
+
+    def get(self, page_queue: "queue.Queue[Any]") -> Tuple[TaskKey, Any]:
+        while True:
+            try:
+                item: Tuple[TaskKey, Any] = page_queue.get(timeout=0.1)
+                return item
+            except queue.Empty:
+                if self.error is not None:
+                    raise self.error
+
+
+def _iter_data_collection_pages(data_collection: DataCollection, key: TaskKey, stop_event: threading.Event) -> Iterable[Any]:
+    return data_collection.iter_pages()
+
+
+def _iter_json_blocks(
+    data_collection: DataCollection, key: TaskKey, stop_event: threading.Event, passthrough: bool = False
+) -> Iterable[Any]:
+    return data_collection._get_json_lines(passthrough)
+
+
+def _iter_csv_passthrough_blocks(data_collection: DataCollection, key: TaskKey, stop_event: threading.Event) -> Iterable[Any]:
+    return data_collection._get_csv_passthrough_lines()
+
+
+class _SharedCsvColumns:
+    """
+    The columns of a CSV export of a ParallelDataCollection: the columns to store if they are given, otherwise those
+    inferred from the first row of the first data collection that has data, like the columns of an export of one
+    data collection. Workers report their first row and wait until the columns are known.
+    """
+
+    def __init__(self, number_of_data_collections: int, columns: Optional[List[str]] = None) -> None:
+        self.columns = columns
+        self._number_of_data_collections = number_of_data_collections
+        self._first_rows: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._condition = threading.Condition()
+
+    def resolve(
+        self, data_collection: DataCollection, key: TaskKey, first_row: Optional[Dict[str, Any]], stop_event: threading.Event
+    ) -> Optional[List[str]]:
+        """
+        :return: the columns, or None if no data collection has data or the export was stopped
+        """
+        with self._condition:
+            # the pieces of a chunk only exist if the chunk had data, which it reported first
+            self._first_rows.setdefault(key[0], first_row)
+            self._condition.notify_all()
+            while self.columns is None and not stop_event.is_set():
+                for i in range(self._number_of_data_collections):
+                    if i not in self._first_rows:
+                        # an earlier data collection has not reported its first row yet
+                        self._condition.wait(timeout=0.1)
+                        break
+                    row = self._first_rows[i]
+                    if row is not None:
+                        self.columns = data_collection._infer_columns_to_store(row)
+                        self._condition.notify_all()
+                        break
+                else:
+                    return None
+            return self.columns
+
+
+def _iter_csv_blocks(
+    data_collection: DataCollection, key: TaskKey, stop_event: threading.Event, columns: _SharedCsvColumns
+) -> Iterable[Any]:
+    pages = data_collection.iter_pages()
+    first_page = next(pages, None)
+    columns_to_store = columns.resolve(data_collection, key, first_page[0] if first_page else None, stop_event)
+    if first_page is None or columns_to_store is None:
+        return
+    yield _format_csv_rows(first_page, columns_to_store)
+    for page in pages:
+        yield _format_csv_rows(page, columns_to_store)
+
+
+def _iter_dataframe_csv_blocks(df: DataFrameType, rows: int) -> Iterator[bytes]:
+    """
+    Converts a pandas or polars dataframe to CSV in slices of `rows` rows, with the header in the first one.
+    """
+    for start in range(0, max(len(df), 1), rows):
+        if isinstance(df, pl.DataFrame):
+            yield df.slice(start, rows).write_csv(include_header=start == 0).encode()
+        else:
+            yield df.iloc[start:start + rows].to_csv(index=False, header=start == 0).encode()
+
+
+def _format_csv_rows(rows: List[Dict[str, Any]], columns_to_store: List[str]) -> bytes:
+    return "".join(
+        ",".join(f'"{data_el.get(column)}"' or "" for column in columns_to_store) + "\n" for data_el in rows
+    ).encode()
+
+
+class _ChunkRunner:
+    """
+    Builds the data collections of a ParallelDataCollection from their query specs. Unlike a data collection it
+    holds no queues or iterators, so it is sent to the workers of a ProcessPoolExecutor together with the specs. The
+    client is sent as its constructor arguments, including the API key, instead of its session and statistics, and
+    is rebuilt once per worker process. A custom `session` or `rate_limiter` and `debug_mode` are not carried over.
+    """
+
+    def __init__(
+        self,
+        data_retrieval_function: DataRetrievalFuncType,
+        client: Optional["CoinMetricsClient"],
+        prefetch_pages: int,
+        bidirectional: bool,
+    ) -> None:
+        self.data_retrieval_function = data_retrieval_function
+        self.client = client
+        self.prefetch_pages = prefetch_pages
+        self.bidirectional = bidirectional
+
+    def data_collection(self, query_spec: QuerySpec) -> DataCollection:
+        return DataCollection(
+            data_retrieval_function=self.data_retrieval_function,
+            endpoint=query_spec.endpoint,
+            url_params=query_spec.to_url_params(),
+            csv_export_supported=True,
+            client=self.client,
+            prefetch_pages=self.prefetch_pages,
+            bidirectional=self.bidirectional,
+        )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        function = self.data_retrieval_function
+        if self.client is not None and getattr(function, "__self__", None) is self.client:
+            settings = cast("CoinMetricsClient", self.client)._settings
+            return _chunk_runner_in_worker, (settings, function.__name__, self.prefetch_pages, self.bidirectional)
+        return _ChunkRunner, (function, self.client, self.prefetch_pages, self.bidirectional)
+
+
+def _chunk_runner_in_worker(settings: Dict[str, Any], function_name: str, prefetch_pages: int, bidirectional: bool) -> _ChunkRunner:
+    # unpickles a _ChunkRunner in a worker process, with the client of the process for these settings
+    from coinmetrics.api_client import _client_from_settings
+
+    client = _client_from_settings(settings)
+    return _ChunkRunner(getattr(client, function_name), client, prefetch_pages, bidirectional)
+
+
+def _run_on_chunk(function: Callable[..., T], runner: _ChunkRunner, query_spec: QuerySpec, *args: Any) -> T:
+    # runs in a worker process, so that parsing and converting the pages of the chunk is not serialized by the GIL
+    return function(runner.data_collection(query_spec), *args)
+
+
 class AssetChainsDataCollection(DataCollection):
 
     API_RETURN_MODEL = AssetChainsData
@@ -626,17 +1877,20 @@ class ParallelDataCollection(DataCollection):
         max_workers: Optional[int] = None,
         progress_bar: Optional[bool] = None,
         time_increment: Optional[Union[relativedelta, timedelta, DateOffset]] = None,
-        height_increment: Optional[int] = None
+        height_increment: Optional[int] = None,
+        chunking: Optional[str] = None,
+        chunk_pages: int = DEFAULT_CHUNK_PAGES,
     ):
         """
         :param parallelize_on: What parameter to parallelize on. By default will use the primary query parameter in the
         endpoint the user is calling. For example - if the user is calling `.get_market_candles(assets="...") it will
         split their request into many separate requests, one for each asset
-        :param executor: by default this class uses ProcessPoolExecutor for concurrency, this could be swapped out for
-        ThreadPoolExecutor or something else custom, based on User needs
+        :param executor: by default this class uses ThreadPoolExecutor for concurrency, this could be swapped out for
+        ProcessPoolExecutor, to convert the data of `to_dataframe()`, `to_arrow()` and the exports to multiple files
+        in worker processes, or something else custom, based on User needs
         :param max_workers: The default max_workers number is 10 - so up to 10 processes or threads will be running at
-        once. Increasing this can make the code run faster, but users may run into issues with resources, or start to hit
-        rate limits.
+        once. Increasing this can make the code run faster, but users may run into issues with resources. Requests are
+        paced by the client's shared rate limiter, so extra workers wait for the rate limit budget instead of hitting 429s.
         :param progress_bar: By default this class uses a tqdm progress bar to show the progress of the threads finishing
         so it is clear what is happening during long running intervals. Can be set to false to disable
         :param time_increment: Optionally, can split the data collections by time_increment. This feature splits
@@ -644,21 +1898,47 @@ class ParallelDataCollection(DataCollection):
         12 smaller requests. If there is no "start_time" in the request it will raise a ValueError
         :param height_increment: Optionally, can split the data collections by height_increment. This feature splits
         data collections further by block height increment. If there is no "start_height" in the request it will raise a ValueError
+        :param chunking: "auto" to split the time range of every request into chunks of about `chunk_pages` pages,
+        estimated from a sample of the first rows of the request. Chunks that turn out to need more pages are split
+        again while they run. Mutually exclusive with time_increment and height_increment
+        :param chunk_pages: The number of pages of a chunk with chunking="auto"
         """
         super().__init__(parent_data_collection._data_retrieval_function, parent_data_collection._endpoint,
                          parent_data_collection._url_params, parent_data_collection._csv_export_supported,
-                         client=parent_data_collection._client)
+                         client=parent_data_collection._client,
+                         prefetch_pages=parent_data_collection._prefetch_pages,
+                         bidirectional=parent_data_collection._bidirectional)
         self._parallelize_on = self._get_parallelize_on(parallelize_on)
         self._executor: Callable[..., Executor] = executor or ThreadPoolExecutor
         self._max_workers = max_workers if max_workers else 10
-        if self._max_workers > 10:
+        if self._max_workers > 10 and self._client is None:
+            # without a client there is no shared rate limiter to pace the workers
             warnings.warn("Max workers greater than 10 are not permitted due to rate limits restrictions")
             self._max_workers = 10
+        if self._client is not None:
+            self._client._size_connection_pool(self._max_workers)
         self._progress_bar = progress_bar if progress_bar is not None else True
+        self._parallel_rows: Optional[Iterator[Dict[str, Any]]] = None
         self._time_increment = time_increment
         self._height_increment = height_increment
+        self._chunking = chunking
+        self._chunk_pages = chunk_pages
+        # the plan of get_parallel_query_specs(), which requests samples with chunking="auto"
+        self._query_specs: Optional[List[QuerySpec]] = None
         if self._time_increment is not None and self._height_increment is not None:
             raise ValueError("time_increment and height_increment are mutually exclusive")
+        if chunking not in (None, "auto"):
+            raise ValueError(f"chunking must be None or 'auto', instead: {chunking}")
+        if chunking == "auto":
+            if self._time_increment is not None or self._height_increment is not None:
+                raise ValueError("chunking='auto' and time_increment or height_increment are mutually exclusive")
+            if not self._url_params.get("start_time"):
+                raise ValueError("No start_time specified, cannot use chunking='auto'")
+            if self._url_params.get("timezone") not in (None, "UTC"):
+                # the chunks are cut at the UTC times of the rows
+                raise ValueError("chunking='auto' requires UTC timestamps")
+            if chunk_pages < 1:
+                raise ValueError(f"chunk_pages must be a positive integer, instead: {chunk_pages}")
 
         elif (self._time_increment is not None) or (self._height_increment is not None):
             self._url_params.update({"end_inclusive": False})
@@ -676,6 +1956,21 @@ class ParallelDataCollection(DataCollection):
         :return: List[DataCollection] all combinations of DataCollections based on the parallelized parameters and
         time increment.
         """
+        return [self._data_collection_from_spec(query_spec) for query_spec in self.get_parallel_query_specs()]
+
+    def get_parallel_query_specs(self) -> List[QuerySpec]:
+        """
+        The requests of `get_parallel_datacollections()` as immutable QuerySpecs (endpoint and URL params), which hold no
+        client, e.g. to plan or inspect a large export. With chunking="auto" planning requests a sample page for every
+        combination of the parallelized parameters; otherwise no request is made. The plan is computed once and reused
+        by later calls and by the iterations and exports of this ParallelDataCollection.
+        :return: List[QuerySpec] all combinations of the parallelized parameters and time or height increments.
+        """
+        if self._query_specs is None:
+            self._query_specs = self._plan_query_specs()
+        return list(self._query_specs)
+
+    def _plan_query_specs(self) -> List[QuerySpec]:
         query_items = {}
         for param in self._parallelize_on:
             val = self._url_params.get(param)
@@ -684,22 +1979,101 @@ class ParallelDataCollection(DataCollection):
             assert isinstance(val, Iterable)
             query_items[param] = val
 
-        combinations = [dict(zip(query_items, vals)) for vals in itertools.product(*query_items.values())]
-
-        data_collections = []
-        for combo in combinations:
-            new_params = self._url_params.copy()
-            new_params.update(combo)
-            new_data_collection = DataCollection(
-                data_retrieval_function=self._data_retrieval_function,
-                endpoint=self._endpoint,
-                url_params=new_params,
-                csv_export_supported=True
+        base_spec = QuerySpec.from_url_params(self._endpoint, self._url_params)
+        query_specs = [
+            base_spec.with_params(**dict(zip(query_items, vals))) for vals in itertools.product(*query_items.values())
+        ]
+        if self._chunking == "auto":
+            return self._add_adaptive_chunks_to_query_specs(query_specs)
+        return self._add_time_dimension_to_query_specs(query_specs=query_specs)
+
+    def _add_adaptive_chunks_to_query_specs(self, query_specs: List[QuerySpec]) -> List[QuerySpec]:
+        """
+        Splits the time range of every query spec into chunks of about `chunk_pages` pages, estimated from a page of
+        SAMPLE_ROWS rows of the spec. The samples are requested in parallel. A spec is split into at most
+        `max_workers` chunks: a sample from a dense end of the range would otherwise make many requests for the
+        sparse rest, and chunks that turn out to be dense are split again while they run.
+        """
+        start_time = self.parse_date(cast(datetime, self._url_params["start_time"]))
+        end_time = self.parse_date(cast(datetime, self._url_params.get("end_time"))) if self._url_params.get(
+            "end_time") else datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as processor:
+            numbers_of_chunks = list(processor.map(
+                functools.partial(self._estimate_chunks, start_time=start_time, end_time=end_time), query_specs
+            ))
+        chunked_query_specs = []
+        for query_spec, number_of_chunks in zip(query_specs, numbers_of_chunks):
+            bounds = split_time_range(start_time, end_time, min(number_of_chunks, self._max_workers))
+            for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+                chunk_spec = query_spec.with_params(start_time=start, end_time=end)
+                if index > 0:
+                    chunk_spec = chunk_spec.with_params(start_inclusive=True)
+                if index < len(bounds) - 2:
+                    chunk_spec = chunk_spec.with_params(end_inclusive=False)
+                chunked_query_specs.append(chunk_spec)
+        return chunked_query_specs
+
+    def _estimate_chunks(self, query_spec: QuerySpec, start_time: datetime, end_time: datetime) -> int:
+        url_params = query_spec.to_url_params()
+        url_params.update({"start_time": start_time, "end_time": end_time, "page_size": SAMPLE_ROWS})
+        if self._is_stream:
+            url_params["format"] = "json"
+        sample = self._fetch_data_with_retries(url_params)
+        page_size = int(cast(int, self._url_params.get("page_size") or DEFAULT_PAGE_SIZE))
+        return estimate_chunks(
+            start_time,
+            end_time,
+            cast(List[Dict[str, Any]], sample.get("data") or []),
+            bool(sample.get("next_page_token")),
+            self._url_params.get("paging_from") == "start",
+            self._chunk_pages * page_size,
+        )
+
+    def _data_collection_from_spec(self, query_spec: QuerySpec) -> DataCollection:
+        # every data collection requests through the client of this collection and shares its session
+        if self._chunking == "auto" and not self._is_stream:
+            return _AdaptiveChunk(
+                self._data_retrieval_function,
+                query_spec.endpoint,
+                query_spec.to_url_params(),
+                client=self._client,
+                chunk_pages=self._chunk_pages,
+                max_pieces=self._max_workers,
             )
-            data_collections.append(new_data_collection)
+        return self._chunk_runner().data_collection(query_spec)
 
-        data_collections = self._add_time_dimension_to_data_collections(data_collections=data_collections)
-        return data_collections
+    def _chunk_runner(self) -> _ChunkRunner:
+        return _ChunkRunner(self._data_retrieval_function, self._client, self._prefetch_pages, self._bidirectional)
+
+    def _submit(
+        self, processor: Executor, function: Callable[..., T], data_collection: DataCollection, *args: Any
+    ) -> Future[T]:
+        """
+        Runs `function(data_collection, *args)` in the executor. Worker processes of a ProcessPoolExecutor get the
+        query spec of the data collection and rebuild it, so `function` and `args` must be picklable and the data
+        retrieval function a method of a client.
+        """
+        if isinstance(processor, ProcessPoolExecutor):
+            query_spec = QuerySpec.from_url_params(data_collection._endpoint, data_collection._url_params)
+            return processor.submit(_run_on_chunk, function, self._chunk_runner(), query_spec, *args)
+        return processor.submit(function, data_collection, *args)
+
+    def _map_data_collections(
+        self, function: Callable[..., T], data_collections: List[DataCollection], desc: str, *iterables: Iterable[Any]
+    ) -> List[T]:
+        """
+        Runs `function(data_collection, *args)` for every data collection in the executor, see `_submit`, and
+        returns the results in the order of the data collections.
+        """
+        with self._executor(max_workers=self._max_workers) as processor:
+            futures = [
+                self._submit(processor, function, data_collection, *args)
+                for data_collection, *args in zip(data_collections, *iterables)
+            ]
+            results: Iterable[T] = (future.result() for future in futures)
+            if self._progress_bar:
+                results = tqdm(results, total=len(futures), desc=desc)
+            return list(results)
 
     def _get_asset_end_height(self, asset: str) -> int:
         block_data = None
@@ -711,15 +2085,15 @@ class ParallelDataCollection(DataCollection):
             raise Exception(f"End height for asset {asset} not found.")
         return end_height
 
-    def _add_time_dimension_to_data_collections(
+    def _add_time_dimension_to_query_specs(
             self,
-            data_collections: List[DataCollection]
-    ) -> List[DataCollection]:
+            query_specs: List[QuerySpec]
+    ) -> List[QuerySpec]:
         """
         Helper function to help create all possible combinations of time or height + parallelized parameters. Takes a list of
-        of data collections and returns a larger a list of dataframe over the time or height range.
-        :param data_collections: List[DataCollection] list of data collections to be expanded
-        :return: List[DataCollections] All combinations of the original data collections, over the specified time_increment
+        of query specs and returns a larger a list of query specs over the time or height range.
+        :param query_specs: List[QuerySpec] list of query specs to be expanded
+        :return: List[QuerySpec] All combinations of the original query specs, over the specified time_increment
         """
         def generate_ranges(
             start: Union[datetime, int],
@@ -753,9 +2127,9 @@ class ParallelDataCollection(DataCollection):
                 raise ValueError("Unsupported combination of types for start, end, or increment")
 
         if not self._time_increment and not self._height_increment:
-            return data_collections
+            return query_specs
 
-        full_data_collections = []
+        full_query_specs = []
         if self._height_increment and isinstance(self._height_increment, int):
             if self._url_params.get("start_height") and isinstance(self._url_params.get("start_height"), (int, str)):
                 start_height = int(self._url_params.get("start_height"))  # type: ignore
@@ -784,12 +2158,8 @@ class ParallelDataCollection(DataCollection):
                 end_height,
                 increment=self._height_increment
             ):
-                for data_collection in data_collections:
-                    new_data_collection = deepcopy(data_collection)
-                    new_data_collection._url_params.update(
-                        {"start_height": start, "end_height": end}
-                    )
-                    full_data_collections.append(new_data_collection)
+                for query_spec in query_specs:
+                    full_query_specs.append(query_spec.with_params(start_height=start, end_height=end))
         elif self._time_increment and isinstance(self._time_increment, (timedelta, relativedelta, DateOffset)):
             if not self._url_params.get("start_time"):
                 raise ValueError("No start_time specified, cannot use time_increment feature")
@@ -806,21 +2176,85 @@ class ParallelDataCollection(DataCollection):
                     end_time,
                     increment=self._time_increment
                 ):
-                    for data_collection in data_collections:
-                        new_data_collection = deepcopy(data_collection)
-                        new_data_collection._url_params.update({"start_time": start, "end_time": end})
-                        full_data_collections.append(new_data_collection)
-        return full_data_collections
+                    for query_spec in query_specs:
+                        full_query_specs.append(query_spec.with_params(start_time=start, end_time=end))
+        return full_query_specs
 
     def to_list(self) -> List[Dict[str, Any]]:
-        data_collections = self.get_parallel_datacollections()
-        total_tasks = len(data_collections)
-        with self._executor(max_workers=self._max_workers) as processor:
-            combined_data = processor.map(self._helper_to_list, data_collections)
-            if self._progress_bar:
-                combined_data = tqdm(combined_data, total=total_tasks, desc="Converting to List")
-        combined_list = list(itertools.chain.from_iterable(combined_data))
-        return combined_list
+        return list(itertools.chain.from_iterable(self.iter_pages()))
+
+    def __next__(self) -> Any:
+        if self._parallel_rows is None:
+            self._parallel_rows = itertools.chain.from_iterable(self.iter_pages())
+        return next(self._parallel_rows)
+
+    def iter_pages(self, ordered: bool = True, buffer_pages: int = 2) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterates over the pages of all parallel data collections while they are requested by the workers. Each worker
+        holds at most `buffer_pages` pages that the consumer has not taken yet and waits before requesting more, so
+        memory stays bounded by `max_workers * buffer_pages` pages however much data is requested. Iterating over
+        the ParallelDataCollection itself (`for row in data_collection.parallel()`) yields the rows of these pages.
+        Stopping the iteration early stops the workers.
+        :param ordered: If True, pages are yielded in the order of the data collections and the pages of later data
+        collections wait until the earlier ones are consumed. If False, pages are yielded as soon as any worker has
+        one, which is faster when the data collections differ in size.
+        :type ordered: bool
+        :param buffer_pages: Maximum number of pages each worker keeps ahead of the consumer.
+        :type buffer_pages: int
+        :return: iterator of lists of rows
+        """
+        for _, page in self._iter_worker_output(_iter_data_collection_pages, ordered, buffer_pages, "Iterating"):
+            yield page
+
+    def _iter_worker_output(
+        self,
+        produce: Callable[[DataCollection, TaskKey, threading.Event], Iterable[Any]],
+        ordered: bool = True,
+        buffer_pages: int = 2,
+        desc: str = "Iterating",
+        data_collections: Optional[List[DataCollection]] = None,
+    ) -> Iterator[Tuple[TaskKey, Any]]:
+        """
+        Runs `produce` for every parallel data collection in the workers and yields the items it produces as
+        (key of the data collection, item) while they are produced, through bounded queues, see `iter_pages`. Keys are
+        (index,) for the data collections of `get_parallel_datacollections()`; the pieces a chunk of chunking="auto"
+        is split into while it runs follow it with longer keys.
+        """
+        if buffer_pages < 1:
+            raise ValueError(f"buffer_pages must be a positive integer, instead: {buffer_pages}")
+        if data_collections is None:
+            data_collections = self.get_parallel_datacollections()
+        tasks = _WorkerTasks(data_collections, ordered, buffer_pages, self._max_workers)
+        stop_event = threading.Event()
+        progress_bar = tqdm(total=len(tasks), desc=desc) if self._progress_bar else None
+        processor = self._executor(max_workers=self._max_workers)
+        try:
+            if isinstance(processor, ProcessPoolExecutor):
+                raise ValueError(
+                    "Iterating over a ParallelDataCollection requires a thread based executor, a ProcessPoolExecutor "
+                    "is supported by to_dataframe(), to_arrow(), the export_to_*_files() methods and "
+                    "export_to_parquet_dataset()"
+                )
+            for _ in range(self._max_workers):
+                processor.submit(_run_worker_tasks, produce, tasks, stop_event).add_done_callback(tasks.fail)
+            page_queue = tasks.next_queue()
+            while page_queue is not None:
+                key, item = tasks.get(page_queue)
+                if item is _END_OF_PAGES:
+                    tasks.consumed(key)
+                    page_queue = tasks.next_queue()
+                    if progress_bar is not None:
+                        progress_bar.total = len(tasks)
+                        progress_bar.update(1)
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield key, item
+        finally:
+            stop_event.set()
+            processor.shutdown(wait=True, cancel_futures=True)
+            if progress_bar is not None:
+                progress_bar.close()
 
     @deprecated_optimize_pandas_types
     def to_dataframe(
@@ -832,47 +2266,99 @@ class ParallelDataCollection(DataCollection):
     ) -> DataFrameType:
 
         if dataframe_type == "pandas":
-            def group_and_merge(dfs: List[pd.DataFrame]) -> pd.DataFrame:
-                """
-                This function is a helper to merge the kind of dataframes we are dealing with. All the dataframes with
-                common columns are merged first, then they are all merged
-                :param dfs: List of dataframes
-                :return: DataFrame that combines the full list into one
-                """
-                grouped_dfs = defaultdict(list)
-
-                for df in dfs:
-                    key = tuple(df.columns)
-                    grouped_dfs[key].append(df)
-
-                concatenated_dfs = [pd.concat(group, axis=0) for group in grouped_dfs.values()]
-
-                result = concatenated_dfs[0]
-                for df in concatenated_dfs[1:]:
-                    result = pd.merge(result, df, on=['time', self._get_first_param_from_endpoint().rstrip("s")], how='outer')
-                return result
-
-            data_collections = self.get_parallel_datacollections()
-            with self._executor(max_workers=self._max_workers) as processor:
-                if self._progress_bar:
-                    combined_dataframes = list(tqdm(processor.map(ParallelDataCollection._helper_to_dataframe, data_collections), total=len(data_collections), desc="Exporting to dataframe type"))
-                else:
-                    combined_dataframes = list(processor.map(ParallelDataCollection._helper_to_dataframe, data_collections))
+            combined_dataframes = self._map_data_collections(
+                ParallelDataCollection._helper_to_dataframe, self.get_parallel_datacollections(), "Exporting to dataframe type"
+            )
 
             if len(self._parallelize_on) > 1 or (len(self._parallelize_on) == 1 and self._get_first_param_from_endpoint() != self._parallelize_on[0]):
-                combined_df = group_and_merge(combined_dataframes)
+                combined_df = _group_and_merge(combined_dataframes, ['time', self._get_first_param_from_endpoint().rstrip("s")])
             else:
                 combined_df = pd.concat(combined_dataframes, axis=0)
             combined_df.reset_index(drop=True, inplace=True)
             return combined_df
+        elif dataframe_type == "polars":
+            return self._to_polars_dataframe(dtype_mapper)
         else:
             raise ValueError(f"dataframe_type '{dataframe_type}' not supported for parallelization.")
 
+    def _to_polars_dataframe(self, dtype_mapper: Optional[Dict[str, Any]] = None) -> pl.DataFrame:
+        """
+        Builds a polars DataFrame of every parallel data collection in the workers and concatenates the frames in
+        the order of the data collections as soon as they are complete, without copying them into one chunk.
+        Frames of data collections split on a parameter other than the primary one (e.g. metrics) have different
+        columns for the same rows and are joined on time and the primary entity instead.
+        """
+        data_collections = self.get_parallel_datacollections()
+        merge = len(self._parallelize_on) > 1 or self._get_first_param_from_endpoint() != self._parallelize_on[0]
+        frames_by_columns: Dict[Tuple[str, ...], pl.DataFrame] = {}
+        completed_frames: Dict[int, pl.DataFrame] = {}
+        next_index = 0
+        with self._executor(max_workers=self._max_workers) as processor:
+            futures = {
+                self._submit(processor, ParallelDataCollection._helper_to_polars, data_collection, dtype_mapper): index
+                for index, data_collection in enumerate(data_collections)
+            }
+            completed: Iterable[Future[pl.DataFrame]] = as_completed(futures)
+            if self._progress_bar:
+                completed = tqdm(completed, total=len(futures), desc="Exporting to dataframe type")
+            for future in completed:
+                completed_frames[futures[future]] = future.result()
+                while next_index in completed_frames:
+                    df = completed_frames.pop(next_index)
+                    next_index += 1
+                    if df.width == 0:
+                        continue
+                    key = tuple(df.columns) if merge else ()
+                    if key in frames_by_columns:
+                        df = pl.concat([frames_by_columns[key], df], how="diagonal_relaxed", rechunk=False)
+                    frames_by_columns[key] = df
+
+        frames = list(frames_by_columns.values())
+        if not frames:
+            return pl.DataFrame()
+        combined_df = frames[0]
+        for df in frames[1:]:
+            combined_df = combined_df.join(
+                df, on=['time', self._get_first_param_from_endpoint().rstrip("s")], how="full", coalesce=True
+            )
+        # columns without a value in any data collection
+        return combined_df.with_columns(pl.col(pl.Null).cast(pl.String))
+
+    def to_arrow(self) -> "pa.Table":
+        """
+        Outputs the data as a pyarrow Table. The table of every parallel data collection is built by the worker that
+        requests it, so with a ProcessPoolExecutor parsing and conversion run on all cores. Tables are concatenated
+        in the order of the data collections; tables of data collections split on a parameter other than the
+        primary one (e.g. metrics) are joined on time and the primary entity instead, sorted by both. Requires pyarrow.
+        :return: Data in a pyarrow Table, without columns if there is no data
+        :rtype: pyarrow.Table
+        """
+        require_pyarrow()
+        tables = self._map_data_collections(
+            ParallelDataCollection._helper_to_arrow, self.get_parallel_datacollections(), "Exporting to Arrow"
+        )
+        merge = len(self._parallelize_on) > 1 or self._get_first_param_from_endpoint() != self._parallelize_on[0]
+        tables_by_columns: Dict[Tuple[str, ...], List[pa.Table]] = {}
+        for table in tables:
+            if table.num_columns:
+                tables_by_columns.setdefault(tuple(table.column_names) if merge else (), []).append(table)
+        if not tables_by_columns:
+            return pa.table({})
+        combined_tables = [pa.concat_tables(group, promote_options="default") for group in tables_by_columns.values()]
+        combined_table = combined_tables[0]
+        if len(combined_tables) == 1:
+            return combined_table
+        keys = [self._get_first_param_from_endpoint().rstrip("s"), 'time']
+        for table in combined_tables[1:]:
+            combined_table = combined_table.join(table, keys=keys, join_type="full outer")
+        return combined_table.sort_by([(key, "ascending") for key in keys])
+
     def export_to_csv_files(
         self,
         data_directory: Optional[str] = None,
         columns_to_store: Optional[List[str]] = None,
         compress: bool = False,
+        passthrough: bool = False,
     ) -> None:
         """
         This function will export the data requested to several csvs, based on the `parallize_on` attribute of the
@@ -886,36 +2372,24 @@ class ParallelDataCollection(DataCollection):
         :param data_directory: str path to directory where files should be dropped
         :param columns_to_store: List[str] columns to store
         :param compress: bool whether or not to compress to tar files
+        :param passthrough: bool whether to write the CSV of `format=csv` responses as it is received, see `DataCollection.export_to_csv`
         """
         if data_directory is None:
             data_directory = "."
         data_collections = self.get_parallel_datacollections()
-        data_directorys = [data_directory] * len(data_collections)
-        columns_to_store_args = [columns_to_store] * len(data_collections)
-        compress_args = [compress] * len(data_collections)
-        total_tasks = len(data_collections)
-        with self._executor(max_workers=self._max_workers) as processor:
-            if self._progress_bar:
-                list(
-                    tqdm(
-                        processor.map(
-                            self._helper_to_csv,
-                            data_collections,
-                            data_directorys,
-                            columns_to_store_args,
-                            compress_args
-                        ), total=total_tasks,
-                        desc="Exporting to CSV"
-                    )
-                )
-            else:
-                processor.map(
-                    self._helper_to_csv,
-                    data_collections,
-                    data_directorys,
-                    columns_to_store_args,
-                    compress_args
-                )
+        file_paths = [
+            os.path.join(data_directory, self._get_export_file_name(data_collection, "csv"))
+            for data_collection in data_collections
+        ]
+        self._map_data_collections(
+            ParallelDataCollection._helper_to_csv,
+            data_collections,
+            "Exporting to CSV",
+            file_paths,
+            itertools.repeat(columns_to_store),
+            itertools.repeat(compress),
+            itertools.repeat(passthrough),
+        )
         file_directories = '\n'.join(
             sorted(
                 list(
@@ -933,51 +2407,104 @@ class ParallelDataCollection(DataCollection):
         path_or_bufstr: FilePathOrBuffer = None,
         columns_to_store: Optional[List[str]] = None,
         compress: bool = False,
-        dataframe_type: str = "pandas"
-    ) -> None:
-        if dataframe_type == "pandas":
-            self.to_dataframe(dataframe_type="pandas").to_csv(path_or_bufstr)
-        elif dataframe_type == "polars":
-            self.to_dataframe(dataframe_type="polars").write_csv(path_or_bufstr)
+        dataframe_type: str = "pandas",
+        *,
+        passthrough: bool = False,
+    ) -> Optional[str]:
+        """
+        Exports the data of all parallel data collections to one CSV file, or returns it as str if no path or buffer
+        is given. The workers convert their pages to CSV and a single writer appends them in the order of the data
+        collections with one header, so memory stays bounded by a few pages per worker.
+        Data collections split on a parameter other than the primary one (e.g. metrics) have different columns for
+        the same rows, they are merged in a dataframe of type `dataframe_type` first. That dataframe holds the whole
+        result in memory; it is written in slices of `MERGED_CSV_SLICE_ROWS` rows, so the CSV text of only one slice
+        is held at a time.
+
+        :param path_or_bufstr: Path or file object to write to.
+        :type path_or_bufstr: str, Path, IO
+        :param columns_to_store: Columns to write, inferred from the Coin Metrics API schema or the first row if not specified.
+        :type columns_to_store: List[str]
+        :param compress: Whether to gzip the output.
+        :type compress: bool
+        :param dataframe_type: Type of the dataframe that merges data collections split on a non-primary parameter, "pandas" or "polars".
+        :type dataframe_type: str
+        :param passthrough: Write the CSV of `format=csv` responses, see `DataCollection.export_to_csv`.
+        :type passthrough: bool
+        """
+        if len(self._parallelize_on) > 1 or self._get_first_param_from_endpoint() != self._parallelize_on[0]:
+            return self._export_merged_dataframe_to_csv(path_or_bufstr, columns_to_store, compress, dataframe_type)
+        data_collections = self.get_parallel_datacollections()
+        if passthrough and data_collections and data_collections[0]._supports_csv_passthrough(columns_to_store):
+            return self._export_to_file(self._get_csv_passthrough_blocks(data_collections), path_or_bufstr, compress)
+        return self._export_to_file(self._get_csv_blocks(data_collections, columns_to_store), path_or_bufstr, compress)
+
+    def _get_csv_blocks(self, data_collections: List[DataCollection], columns_to_store: Optional[List[str]]) -> Iterable[bytes]:
+        columns = _SharedCsvColumns(len(data_collections), columns_to_store)
+        produce = functools.partial(_iter_csv_blocks, columns=columns)
+        header_written = False
+        for _, block in self._iter_worker_output(produce, desc="Exporting to CSV", data_collections=data_collections):
+            if not header_written:
+                # the columns are known once a worker has converted its first page
+                yield (",".join(cast(List[str], columns.columns)) + "\n").encode()
+                header_written = True
+            yield block
+        if not header_written:
+            logger.info("no data to export")
+
+    def _get_csv_passthrough_blocks(self, data_collections: List[DataCollection]) -> Iterable[bytes]:
+        header_written = False
+        last_index = None
+        for index, block in self._iter_worker_output(
+            _iter_csv_passthrough_blocks, desc="Exporting to CSV", data_collections=data_collections
+        ):
+            if index != last_index:
+                # the first block of every data collection is its header
+                last_index = index
+                if header_written:
+                    continue
+                header_written = True
+            yield block
+
+    def _export_merged_dataframe_to_csv(
+        self,
+        path_or_bufstr: FilePathOrBuffer,
+        columns_to_store: Optional[List[str]],
+        compress: bool,
+        dataframe_type: str,
+    ) -> Optional[str]:
+        df = self.to_dataframe(dataframe_type=dataframe_type)
+        if columns_to_store is not None:
+            df = df[columns_to_store]
+        return self._export_to_file(_iter_dataframe_csv_blocks(df, MERGED_CSV_SLICE_ROWS), path_or_bufstr, compress)
 
     def export_to_json(
         self,
         path_or_bufstr: FilePathOrBuffer = None,
-        compress: bool = False,
+        compress: Union[bool, str] = False,
+        *,
+        passthrough: bool = False,
     ) -> Optional[str]:
-        data_collections = self.get_parallel_datacollections()
-        compress_args = [compress] * len(data_collections)
-        with self._executor(max_workers=self._max_workers) as processor:
-            if self._progress_bar:
-                json_data = list(
-                    tqdm(
-                        processor.map(
-                            ParallelDataCollection._helper_to_json,
-                            data_collections,
-                            compress_args
-                        ), total=len(data_collections),
-                        desc="Exporting to Json"
-                    )
-                )
-            else:
-                json_data = list(
-                    processor.map(
-                        ParallelDataCollection._helper_to_json,
-                        data_collections,
-                        compress_args
-                    )
-                )
-        if path_or_bufstr:
-            with open(path_or_bufstr, 'w') as file:  # type: ignore
-                file.writelines(json_data)
-                return None
-        else:
-            return "".join(json_data)
+        """
+        Exports the data of all parallel data collections to one JSON lines file, or returns it as str if no path or
+        buffer is given. The workers serialize their pages and a single writer appends them in the order of the data
+        collections to one (optionally compressed) stream, so memory stays bounded by a few pages per worker.
+
+        :param path_or_bufstr: Path or file object to write to.
+        :type path_or_bufstr: str, Path, IO
+        :param compress: Whether to compress the output: True or "gzip" for gzip, "zstd" for zstd (requires zstandard). Needs a path or buffer.
+        :type compress: bool, str
+        :param passthrough: Write the lines of `format="json_stream"` responses as they are received, see `DataCollection.export_to_json`.
+        :type passthrough: bool
+        """
+        produce = functools.partial(_iter_json_blocks, passthrough=passthrough)
+        blocks = (block for _, block in self._iter_worker_output(produce, desc="Exporting to Json"))
+        return self._export_to_file(blocks, path_or_bufstr, compress)
 
     def export_to_json_files(
             self,
             data_directory: Optional[str] = None,
             compress: bool = False,
+            passthrough: bool = False,
     ) -> None:
         """
         This function will export the data requested to several json, based on the `parallelize_on` attribute of the
@@ -991,33 +2518,23 @@ class ParallelDataCollection(DataCollection):
         :param data_directory: str path to directory where files should be dropped
         :param columns_to_store: List[str] columns to store
         :param compress: bool whether or not to compress to tar files
+        :param passthrough: bool whether to write the lines of json_stream responses as they are received, see `DataCollection.export_to_json`
         """
         if data_directory is None:
             data_directory = "."
         data_collections = self.get_parallel_datacollections()
-        data_directorys = [data_directory] * len(data_collections)
-        compress_args = [compress] * len(data_collections)
-        with self._executor(max_workers=self._max_workers) as processor:
-            if self._progress_bar:
-                list(
-                    tqdm(
-                        processor.map(
-                            self._helper_to_json_file,
-                            data_collections,
-                            data_directorys,
-                            compress_args
-                        ),
-                        total=len(data_collections),
-                        desc="Exporting to Json Files"
-                    )
-                )
-            else:
-                processor.map(
-                    self._helper_to_json_file,
-                    data_collections,
-                    data_directorys,
-                    compress_args
-                )
+        file_paths = [
+            os.path.join(data_directory, self._get_export_file_name(data_collection, "json"))
+            for data_collection in data_collections
+        ]
+        self._map_data_collections(
+            ParallelDataCollection._helper_to_json_file,
+            data_collections,
+            "Exporting to Json Files",
+            file_paths,
+            itertools.repeat(compress),
+            itertools.repeat(passthrough),
+        )
         file_directories = '\n'.join(
             sorted(
                 list(
@@ -1030,6 +2547,42 @@ class ParallelDataCollection(DataCollection):
         )
         logger.info(f"Files saved in {file_directories}")
 
+    def export_to_parquet_dataset(
+            self,
+            data_directory: Optional[str] = None,
+            compression: str = "snappy",
+            row_group_size: int = DEFAULT_ROW_GROUP_ROWS,
+    ) -> None:
+        """
+        This function will export the data requested to a hive partitioned Parquet dataset with a file per parallel
+        request, keyed by the parallelized parameters and the time or height increment, for example:
+        client.get_asset_metrics('btc,eth', 'ReferenceRateUSD', start_time='2024-01-01', limit_per_asset=1).parallel(
+        "assets,metrics", time_increment=timedelta(days=1))
+        will create files like ./asset-metrics/assets=btc/metrics=ReferenceRateUSD/start_time=2024-01-01T00-00-00Z/part-0.parquet
+        which can be read with partition pruning, e.g. pl.scan_parquet("./asset-metrics/**/*.parquet", hive_partitioning=True).
+        Every file is written as its pages arrive, see `DataCollection.export_to_parquet`. Requires pyarrow.
+        :param data_directory: str path to the directory of the dataset
+        :param compression: str Parquet compression codec
+        :param row_group_size: int maximum number of rows per row group
+        """
+        require_pyarrow()
+        if data_directory is None:
+            data_directory = "."
+        data_collections = self.get_parallel_datacollections()
+        file_paths = [
+            os.path.join(data_directory, self._get_partition_path(data_collection))
+            for data_collection in data_collections
+        ]
+        self._map_data_collections(
+            ParallelDataCollection._helper_to_parquet,
+            data_collections,
+            "Exporting to Parquet",
+            file_paths,
+            itertools.repeat(compression),
+            itertools.repeat(row_group_size),
+        )
+        logger.info(f"Dataset saved in {data_directory}/{self._endpoint.split('/')[-1]}")
+
     def _get_parallelize_on(self, parallelize_on: Optional[Union[List[str], str]]) -> List[str]:
         if parallelize_on is None:
             return [self._get_first_param_from_endpoint()]
@@ -1081,25 +2634,46 @@ class ParallelDataCollection(DataCollection):
             file_name = f"{friendly_endpoint_name}/{arg_value}.{file_type}"
         return file_name
 
+    @staticmethod
     def _helper_to_csv(
-            self,
             data_collection: DataCollection,
-            data_directory: str,
-            *args: Any
+            full_file_path: str,
+            columns_to_store: Optional[List[str]] = None,
+            compress: bool = False,
+            passthrough: bool = False,
     ) -> None:
-        file_name = self._get_export_file_name(data_collection, file_type="csv")
-        full_file_path = os.path.join(data_directory, file_name)
-        data_collection.export_to_csv(full_file_path, *args)
+        data_collection.export_to_csv(full_file_path, columns_to_store, compress, passthrough=passthrough)
+
+    def _get_partition_path(self, data_collection: DataCollection) -> str:
+        partitions = []
+        for param in self._parallelize_on:
+            values = data_collection._url_params.get(param)
+            if values:
+                partitions.append(f"{param}={values}")
+        if self._time_increment and data_collection._url_params.get("start_time"):
+            start_time = cast(datetime, data_collection._url_params.get("start_time")).strftime("%Y-%m-%dT%H-%M-%SZ")
+            partitions.append(f"start_time={start_time}")
+        elif self._height_increment and data_collection._url_params.get("start_height"):
+            partitions.append(f"start_height={data_collection._url_params.get('start_height')}")
+        return "/".join([data_collection._endpoint.split("/")[-1]] + partitions + ["part-0.parquet"])
 
+    @staticmethod
+    def _helper_to_parquet(
+            data_collection: DataCollection,
+            full_file_path: str,
+            compression: str = "snappy",
+            row_group_size: int = DEFAULT_ROW_GROUP_ROWS,
+    ) -> None:
+        data_collection.export_to_parquet(full_file_path, compression, row_group_size)
+
+    @staticmethod
     def _helper_to_json_file(
-        self,
         data_collection: DataCollection,
-        data_directory: str,
-        compress: bool = False
+        full_file_path: str,
+        compress: bool = False,
+        passthrough: bool = False,
     ) -> Optional[str]:
-        file_name = self._get_export_file_name(data_collection, file_type="json")
-        full_file_path = os.path.join(data_directory, file_name)
-        return data_collection.export_to_json(full_file_path, compress)
+        return data_collection.export_to_json(full_file_path, compress, passthrough=passthrough)
 
     def _get_first_param_from_endpoint(self) -> str:
         try:
@@ -1116,18 +2690,23 @@ class ParallelDataCollection(DataCollection):
         except KeyError:
             raise ValueError(f"Endpoint: {self._endpoint} not supported for parallel requests")
 
-    @staticmethod
-    def _helper_to_json(data_collection: DataCollection, compress: bool = False) -> Optional[str]:
-        data = data_collection.export_to_json(compress=compress)
-        return data
-
     @staticmethod
     def _helper_to_dataframe(data_collection: DataCollection) -> pd.DataFrame:
         return data_collection.to_dataframe()
 
     @staticmethod
-    def _helper_to_list(data_collection: DataCollection) -> List[Dict[str, Any]]:
-        return data_collection.to_list()
+    def _helper_to_arrow(data_collection: DataCollection) -> "pa.Table":
+        return data_collection.to_arrow()
+
+    @staticmethod
+    def _helper_to_polars(data_collection: DataCollection, dtype_mapper: Optional[Dict[str, Any]] = None) -> pl.DataFrame:
+        df = cast(pl.DataFrame, data_collection.to_dataframe(dtype_mapper=dtype_mapper, dataframe_type="polars"))
+        # columns without values have no type yet, so that concatenating them with typed values does not make strings
+        return df.with_columns([
+            pl.col(column).cast(pl.Null)
+            for column, dtype in df.schema.items()
+            if dtype == pl.String and df.get_column(column).null_count() == df.height
+        ])
 
     @staticmethod
     def parse_date(date_input: Union[datetime, date, str, pd.Timestamp]) -> datetime:
@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from coinmetrics._utils import convert_pandas_dtype_to_polars
+from coinmetrics.schema_resolver import find_schema_for_endpoint, get_schema_fields
+
+_BOOLEAN_STRINGS = {"True": True, "False": False, "true": True, "false": False, "TRUE": True, "FALSE": False}
+
+
+def is_datetime_column(column: str) -> bool:
+    return column == "time" or column.endswith("_time")
+
+
+class ColumnarFrameBuilder:
+    """
+    Collects rows page by page into one list per column and builds a pandas DataFrame from the columns once, inferring
+    the column types the way pandas.read_csv did for the CSV export of the same rows.
+    """
+
+    def __init__(self, columns: List[str]) -> None:
+        self.columns = columns
+        self._buffers: Dict[str, List[Any]] = {column: [] for column in columns}
+
+    def append_page(self, rows: List[Dict[str, Any]]) -> None:
+        for column, buffer in self._buffers.items():
+            buffer.extend([row.get(column) for row in rows])
+
+    def to_pandas(self, dtype_mapper: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        :param dtype_mapper: pandas dtypes of columns, applied instead of type inference. Without a dtype_mapper the
+        inferred types are converted to nullable pandas dtypes with `convert_dtypes()`.
+        """
+        data = {}
+        for column, values in self._buffers.items():
+            if is_datetime_column(column):
+                series = _to_pandas_datetime(values)
+                if series is not None:
+                    data[column] = series
+                    continue
+            if dtype_mapper is not None and column in dtype_mapper:
+                data[column] = _to_pandas_dtype(values, dtype_mapper[column])
+            else:
+                data[column] = _infer_pandas_series(values)
+        df = pd.DataFrame(data, columns=self.columns)
+        if dtype_mapper is None:
+            df = df.convert_dtypes()
+        return df
+
+
+def _is_boolean(value: Any) -> bool:
+    return isinstance(value, bool) or (isinstance(value, str) and value in _BOOLEAN_STRINGS)
+
+
+def _to_pandas_datetime(values: List[Any]) -> Optional[pd.Series]:
+    try:
+        return pd.Series(pd.to_datetime(values, utc=True, format="ISO8601"))
+    except (ValueError, TypeError):
+        # not a timestamp column after all, e.g. a status value
+        return None
+
+
+def _to_pandas_dtype(values: List[Any], dtype: Any) -> pd.Series:
+    series = pd.Series(values, dtype=object)
+    if pd.api.types.is_bool_dtype(dtype):
+        series = series.map(lambda value: _BOOLEAN_STRINGS.get(value, value) if isinstance(value, str) else value)
+    try:
+        return series.astype(dtype)
+    except (TypeError, ValueError):
+        return pd.to_numeric(series).astype(dtype)
+
+
+def _infer_pandas_series(values: List[Any]) -> pd.Series:
+    non_null = [value for value in values if value is not None]
+    if non_null and isinstance(non_null[0], (dict, list)):
+        # nested values (e.g. index constituents) end up as their string representation, as in CSV exports
+        values = [str(value) if isinstance(value, (dict, list)) else value for value in values]
+    series = pd.Series(values, dtype=object)
+    if non_null and all(_is_boolean(value) for value in non_null):
+        booleans = series.map(lambda value: _BOOLEAN_STRINGS.get(value, value) if isinstance(value, str) else value)
+        # like read_csv, missing values keep the column as object
+        return booleans.astype(bool) if len(non_null) == len(values) else booleans.where(series.notna(), np.nan)
+    try:
+        numeric = pd.to_numeric(series)
+        if numeric.dtype != np.dtype("object"):
+            return numeric
+    except (ValueError, TypeError):
+        pass
+    return series.where(series.notna(), np.nan)
+
+
+# OpenAPI field types that translate to a polars dtype; "string" fields hold numbers and timestamps as well and are
+# inferred from the values instead
+_SCHEMA_POLARS_DTYPES: Dict[str, pl.DataType] = {
+    "boolean": pl.Boolean(),
+    "integer": pl.Int64(),
+    "number": pl.Float64(),
+    "object": pl.String(),
+}
+
+
+def polars_schema(
+    endpoint: str, columns: List[str], dtype_mapper: Optional[Dict[str, Any]] = None
+) -> Dict[str, pl.DataType]:
+    """
+    Polars dtypes of the columns that are known before any data is read: the `dtype_mapper` of the DataCollection,
+    then the field types of the endpoint's OpenAPI schema (see `schema_resolver.get_schema_fields`). Columns that are
+    not in the result are inferred from their values.
+    """
+    schema_name = find_schema_for_endpoint(endpoint)
+    schema_fields: Dict[str, Any] = get_schema_fields(schema_name) if schema_name is not None else {}
+    dtypes: Dict[str, pl.DataType] = {}
+    for column in columns:
+        if dtype_mapper is not None and column in dtype_mapper:
+            try:
+                dtypes[column] = convert_pandas_dtype_to_polars(dtype_mapper[column])
+            except ValueError:
+                pass
+        elif isinstance(schema_fields.get(column), str) and schema_fields[column] in _SCHEMA_POLARS_DTYPES:
+            dtypes[column] = _SCHEMA_POLARS_DTYPES[schema_fields[column]]
+    return dtypes
+
+
+class PolarsFrameBuilder:
+    """
+    Converts every page to a polars DataFrame of string columns as it arrives, so that the rows of a page can be
+    released, and casts the concatenated columns once: timestamps to Datetime, columns of the schema to their dtype
+    and the other columns to the narrowest of Boolean, Int64, Int128 and Float64 that holds all values.
+    """
+
+    def __init__(self, columns: List[str], dtypes: Optional[Dict[str, pl.DataType]] = None) -> None:
+        self.columns = columns
+        self.dtypes = dtypes or {}
+        self._string_schema = {column: pl.String for column in columns}
+        self._frames: List[pl.DataFrame] = []
+
+    def append_page(self, rows: List[Dict[str, Any]]) -> None:
+        self._frames.append(
+            pl.DataFrame({column: _to_strings([row.get(column) for row in rows]) for column in self.columns}, schema=self._string_schema)
+        )
+
+    def to_polars(self) -> pl.DataFrame:
+        df = pl.concat(self._frames, rechunk=True) if self._frames else pl.DataFrame(schema=self._string_schema)
+        self._frames = []
+        return df.select([_to_polars_dtype(df.get_column(column), self.dtypes.get(column)) for column in self.columns])
+
+
+def _to_strings(values: List[Any]) -> List[Any]:
+    first = next((value for value in values if value is not None), None)
+    if first is None or isinstance(first, str):
+        return values
+    # booleans and nested values (e.g. index constituents) end up as their string representation, as in CSV exports
+    return [value if value is None or isinstance(value, str) else str(value) for value in values]
+
+
+def _to_polars_dtype(strings: pl.Series, dtype: Optional[pl.DataType]) -> pl.Series:
+    if is_datetime_column(strings.name):
+        try:
+            return strings.str.to_datetime(time_unit="us", time_zone="UTC", strict=True, cache=False)
+        except (pl.exceptions.InvalidOperationError, pl.exceptions.ComputeError):
+            # not a timestamp column after all, e.g. a status value
+            pass
+    if dtype is not None:
+        if dtype == pl.Boolean:
+            return strings.str.to_lowercase() == "true"
+        return strings.cast(dtype, strict=False)
+    non_null = strings.drop_nulls()
+    if non_null.is_empty():
+        return strings
+    if non_null.str.to_lowercase().is_in(["true", "false"]).all():
+        return strings.str.to_lowercase() == "true"
+    for numeric_dtype in (pl.Int64, pl.Int128, pl.Float64):
+        try:
+            return strings.cast(numeric_dtype, strict=True)
+        except pl.exceptions.InvalidOperationError:
+            continue
+    if non_null[0][:4].isdigit():
+        try:
+            return strings.str.to_datetime(time_unit="us", time_zone="UTC", strict=True, cache=False)
+        except (pl.exceptions.InvalidOperationError, pl.exceptions.ComputeError):
+            pass
+    return strings
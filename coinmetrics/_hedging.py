@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from logging import getLogger
+from time import monotonic
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+logger = getLogger("cm_client")
+
+T = TypeVar("T")
+
+DEFAULT_HEDGE_QUANTILE = 0.95
+# hedging starts once enough latencies were observed for the quantile to mean something
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+MAX_HEDGE_THREADS = 128
+
+
+class LatencyTracker:
+    """
+    Thread safe window of the most recent time to first byte latencies, in seconds.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_LATENCY_SAMPLES) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """
+        :return: latency quantile of the window or None if there are not enough samples yet
+        """
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+
+
+class RequestHedger:
+    """
+    Sends a duplicate of a request that has not returned its first byte within the given quantile (p95 by default) of
+    recent latencies; the first successful response wins and the other one is closed when it arrives.
+    """
+
+    def __init__(self, quantile: float = DEFAULT_HEDGE_QUANTILE, latency_tracker: Optional[LatencyTracker] = None) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be between 0 and 1")
+        self._quantile = quantile
+        self.latency_tracker = latency_tracker if latency_tracker is not None else LatencyTracker()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._counters: Dict[str, int] = {"hedged_requests": 0, "hedges_won": 0}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RequestHedger":
+        # a deepcopy of a client shares latencies and threads with the original client
+        return self
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_executor"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def _increment(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MAX_HEDGE_THREADS, thread_name_prefix="cm-hedge")
+            return self._executor
+
+    def _timed(self, send: Callable[[], T]) -> T:
+        start = monotonic()
+        response = send()
+        self.latency_tracker.record(monotonic() - start)
+        return response
+
+    def send(self, send: Callable[[], T], close: Callable[[T], None]) -> T:
+        """
+        :param send: sends the request and returns the response once its headers arrived
+        :param close: releases a response that lost the race
+        """
+        hedge_after = self.latency_tracker.quantile(self._quantile)
+        if hedge_after is None:
+            return self._timed(send)
+
+        executor = self._get_executor()
+        primary = executor.submit(self._timed, send)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        logger.debug("No response after %.3f sec, sending a hedged request", hedge_after)
+        self._increment("hedged_requests")
+        hedge = executor.submit(self._timed, send)
+        pending: Set["Future[T]"] = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._increment("hedges_won")
+                    for loser in pending:
+                        loser.add_done_callback(_close_when_done(close))
+                    return future.result()
+        # both requests failed, surface the error of the original one
+        return primary.result()
+
+    async def send_async(self, send: Callable[[], Awaitable[T]], close: Callable[[T], None]) -> T:
+        """
+        asyncio version of `send`.
+        """
+        async def _timed() -> T:
+            start = monotonic()
+            response = await send()
+            self.latency_tracker.record(monotonic() - start)
+            return response
+
+        hedge_after = self.latency_tracker.quantile(self._quantile)
+        if hedge_after is None:
+            return await _timed()
+
+        primary: "asyncio.Future[T]" = asyncio.ensure_future(_timed())
+        done, _ = await asyncio.wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        logger.debug("No response after %.3f sec, sending a hedged request", hedge_after)
+        self._increment("hedged_requests")
+        hedge: "asyncio.Future[T]" = asyncio.ensure_future(_timed())
+        pending: Set["asyncio.Future[T]"] = {primary, hedge}
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._increment("hedges_won")
+                    for loser in pending:
+                        loser.add_done_callback(_close_when_done(close))
+                    return future.result()
+        return primary.result()
+
+
+def _close_when_done(close: Callable[[T], None]) -> Callable[[Any], None]:
+    def _close(future: Any) -> None:
+        if not future.cancelled() and future.exception() is None:
+            close(future.result())
+    return _close
@@ -0,0 +1,229 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from fnmatch import fnmatchcase
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional
+
+import polars as pl
+from dateutil.parser import isoparse
+
+from coinmetrics._typing import UrlParamTypes
+
+# largest page_size the API accepts
+MAX_PAGE_SIZE = 10000
+
+# columns whose values are requested with a parameter of the same meaning
+ENTITY_PARAMS = {
+    "asset": "assets",
+    "market": "markets",
+    "exchange": "exchanges",
+    "exchange_asset": "exchange_assets",
+    "pair": "pairs",
+    "index": "indexes",
+    "institution": "institutions",
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECONDS = {"Nanoseconds": 0.001, "Microseconds": 1, "Milliseconds": 1000}
+_FLIPPED_OPERATORS = {"Eq": "Eq", "Gt": "Lt", "GtEq": "LtEq", "Lt": "Gt", "LtEq": "GtEq"}
+
+
+class PredicateBounds:
+    """
+    The conditions of a polars predicate that can be sent to the API: bounds of the `time` column and the values of
+    other columns, from comparisons with literals that are joined by `&`. Other conditions are ignored, so the
+    predicate must still be applied to the returned rows.
+    """
+
+    def __init__(self) -> None:
+        self.start_time: Optional[datetime] = None
+        self.start_inclusive = True
+        self.end_time: Optional[datetime] = None
+        self.end_inclusive = True
+        self.values: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_predicate(cls, predicate: Optional[pl.Expr]) -> "PredicateBounds":
+        bounds = cls()
+        if predicate is None:
+            return bounds
+        try:
+            tree = json.loads(predicate.meta.serialize(format="json"))
+        except (pl.exceptions.PolarsError, ValueError, TypeError):
+            return bounds
+        for condition in _iter_conjunction(tree):
+            try:
+                bounds._add_condition(condition)
+            except (KeyError, IndexError, TypeError, ValueError, pl.exceptions.PolarsError):
+                # not a condition on a literal, e.g. a comparison of two columns
+                continue
+        return bounds
+
+    def _add_condition(self, condition: Dict[str, Any]) -> None:
+        if "BinaryExpr" in condition:
+            binary = condition["BinaryExpr"]
+            left, operator, right = binary["left"], binary["op"], binary["right"]
+            if "Column" in right and "Column" not in left:
+                left, operator, right = right, _FLIPPED_OPERATORS.get(operator), left
+            if "Column" in left and operator in _FLIPPED_OPERATORS:
+                self._add_comparison(left["Column"], operator, _literal_value(right))
+        elif "Function" in condition:
+            function = condition["Function"]
+            column, *arguments = function["input"]
+            boolean = function["function"]["Boolean"]
+            if "IsIn" in boolean:
+                values = _literal_value(arguments[0])
+                if all(isinstance(value, str) for value in values):
+                    self._restrict(column["Column"], values)
+            elif "IsBetween" in boolean:
+                closed = boolean["IsBetween"]["closed"]
+                self._add_comparison(column["Column"], "GtEq" if closed in ("Both", "Left") else "Gt", _literal_value(arguments[0]))
+                self._add_comparison(column["Column"], "LtEq" if closed in ("Both", "Right") else "Lt", _literal_value(arguments[1]))
+
+    def _add_comparison(self, column: str, operator: str, value: Any) -> None:
+        if column == "time":
+            if isinstance(value, date) and not isinstance(value, datetime):
+                value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+            if not isinstance(value, datetime):
+                return
+            if operator in ("Gt", "GtEq", "Eq") and (
+                self.start_time is None or value > self.start_time or (value == self.start_time and operator == "Gt")
+            ):
+                self.start_time, self.start_inclusive = value, operator != "Gt"
+            if operator in ("Lt", "LtEq", "Eq") and (
+                self.end_time is None or value < self.end_time or (value == self.end_time and operator == "Lt")
+            ):
+                self.end_time, self.end_inclusive = value, operator != "Lt"
+        elif operator == "Eq" and isinstance(value, str):
+            self._restrict(column, [value])
+
+    def _restrict(self, column: str, values: List[str]) -> None:
+        if column in self.values:
+            values = [value for value in values if value in self.values[column]]
+        self.values[column] = list(dict.fromkeys(values))
+
+
+def _iter_conjunction(tree: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    binary = tree.get("BinaryExpr")
+    if binary is not None and binary["op"] in ("And", "LogicalAnd"):
+        yield from _iter_conjunction(binary["left"])
+        yield from _iter_conjunction(binary["right"])
+    else:
+        yield tree
+
+
+def _literal_value(node: Dict[str, Any]) -> Any:
+    literal = node["Literal"]
+    ((kind, value),) = (literal.get("Scalar") or literal["Dyn"]).items()
+    if kind in ("String", "Str"):
+        return value
+    if kind == "Datetime":
+        timestamp, unit, time_zone = value
+        if time_zone is not None and time_zone.get("inner") != "UTC":
+            raise ValueError(f"Unsupported time zone: {time_zone}")
+        return _EPOCH + timedelta(microseconds=timestamp * _MICROSECONDS[unit])
+    if kind == "Date":
+        return date(1970, 1, 1) + timedelta(days=value)
+    if kind == "List":
+        # list literals are serialized as an Arrow IPC stream
+        return pl.read_ipc_stream(BytesIO(bytes(value))).to_series().to_list()
+    raise ValueError(f"Unsupported literal: {kind}")
+
+
+def pushdown_url_params(
+    url_params: Dict[str, UrlParamTypes],
+    with_columns: Optional[List[str]],
+    predicate: Optional[pl.Expr],
+    n_rows: Optional[int],
+) -> Optional[Dict[str, UrlParamTypes]]:
+    """
+    Narrows the URL params of a request to the part of the data a polars scan needs: the selected columns are sent
+    as `metrics`, bounds of `time` as `start_time`/`end_time`, values of entity columns like `asset` or `market` as
+    their parameter, and the number of rows of a `head()` as `page_size` and `limit_per_*`.
+    :return: URL params of the scan, or None if no rows can match the predicate
+    """
+    params = dict(url_params)
+    if with_columns is not None and params.get("metrics"):
+        metrics = _split(params["metrics"])
+        selected = [
+            metric for metric in metrics
+            if metric in with_columns or f"{metric}-status" in with_columns or f"{metric}-status-time" in with_columns
+        ]
+        # the API needs at least one metric, e.g. to count the rows
+        params["metrics"] = _join(params["metrics"], selected or metrics[:1])
+
+    if n_rows is not None:
+        # polars slices the rows before it filters them, so only the head is pushed down, and only if the first page
+        # holds the first rows of the interval
+        if params.get("paging_from") == "start" or str(params.get("format", "")).lower() == "json_stream":
+            for param in params:
+                if param.startswith("limit_per_"):
+                    params[param] = min(n_rows, int(params[param] or n_rows))  # type: ignore
+            if "page_size" in params and n_rows <= MAX_PAGE_SIZE:
+                params["page_size"] = min(n_rows, int(params["page_size"] or n_rows))  # type: ignore
+        return params
+
+    bounds = PredicateBounds.from_predicate(predicate)
+    for column, values in bounds.values.items():
+        entity_param = ENTITY_PARAMS.get(column)
+        if entity_param is None or not params.get(entity_param):
+            continue
+        patterns = _split(params[entity_param])
+        values = [value for value in values if any(fnmatchcase(value, pattern) for pattern in patterns)]
+        if not values:
+            return None
+        params[entity_param] = _join(params[entity_param], values)
+
+    if params.get("timezone") not in (None, "UTC"):
+        # start_time and end_time would be local times
+        return params
+    for param, bound, inclusive, tighter in (
+        ("start_time", bounds.start_time, bounds.start_inclusive, lambda new, old: new > old),
+        ("end_time", bounds.end_time, bounds.end_inclusive, lambda new, old: new < old),
+    ):
+        if bound is None or param not in params:
+            continue
+        try:
+            current = _to_utc_datetime(params[param])
+        except (ValueError, OverflowError):
+            continue
+        inclusive_param = param.replace("_time", "_inclusive")
+        if current is None or tighter(bound, current) or (bound == current and not inclusive):
+            params[param] = bound
+            if inclusive_param in params:
+                params[inclusive_param] = inclusive
+    try:
+        start_time, end_time = _to_utc_datetime(params.get("start_time")), _to_utc_datetime(params.get("end_time"))
+    except (ValueError, OverflowError):
+        return params
+    if start_time is not None and end_time is not None and start_time > end_time:
+        return None
+    return params
+
+
+def _split(value: UrlParamTypes) -> List[str]:
+    return value.split(",") if isinstance(value, str) else [str(item) for item in value]  # type: ignore
+
+
+def _join(original: UrlParamTypes, values: List[str]) -> UrlParamTypes:
+    return ",".join(values) if isinstance(original, str) else values
+
+
+def _to_utc_datetime(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = isoparse(value)
+    result = value if isinstance(value, datetime) else datetime(value.year, value.month, value.day)
+    return result.replace(tzinfo=timezone.utc) if result.tzinfo is None else result.astimezone(timezone.utc)
+
+
+def cast_series(series: pl.Series, dtype: pl.DataType) -> pl.Series:
+    """
+    Casts a column of a page to its dtype in the schema of a scan, parsing strings as timestamps if needed.
+    """
+    if series.dtype == dtype:
+        return series
+    if series.dtype == pl.String and isinstance(dtype, pl.Datetime):
+        return series.str.to_datetime(time_unit=dtype.time_unit, time_zone=dtype.time_zone, strict=False)
+    return series.cast(dtype, strict=False)
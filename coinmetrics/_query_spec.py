@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from coinmetrics._typing import UrlParamTypes
+
+
+def _freeze(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _thaw(value: Any) -> Any:
+    return list(value) if isinstance(value, tuple) else value
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    One request of a ParallelDataCollection: an endpoint and its URL params, frozen so that the planner can share
+    and derive specs without copying. List params are stored as tuples. A spec holds no client, all specs are
+    executed through the client of the ParallelDataCollection.
+    """
+
+    endpoint: str
+    params: Tuple[Tuple[str, Any], ...]
+
+    @classmethod
+    def from_url_params(cls, endpoint: str, url_params: Dict[str, UrlParamTypes]) -> "QuerySpec":
+        return cls(endpoint, tuple((param, _freeze(value)) for param, value in url_params.items()))
+
+    def with_params(self, **params: Any) -> "QuerySpec":
+        """
+        :return: a spec with the params replaced or added, keeping the order of the existing params
+        """
+        updated = dict(self.params)
+        updated.update((param, _freeze(value)) for param, value in params.items())
+        return QuerySpec(self.endpoint, tuple(updated.items()))
+
+    def to_url_params(self) -> Dict[str, UrlParamTypes]:
+        return {param: _thaw(value) for param, value in self.params}
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from time import monotonic, sleep
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# how long to wait for a response to report the new window when the local budget is exhausted
+_UNKNOWN_WINDOW_WAIT = 0.05
+
+
+class RateLimiter:
+    """
+    Client-wide limiter fed by the `x-ratelimit-limit`, `x-ratelimit-remaining` and `x-ratelimit-reset` headers of
+    every response. Requests of all threads (and coroutines) of a client take their turn from the same budget, which is
+    spread evenly over the rest of the rate limit window, so workers pace themselves instead of running into 429 errors.
+    Until the first response reports the limits, requests are not delayed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._limit: Optional[int] = None
+        self._remaining: Optional[int] = None
+        self._reset_at: Optional[float] = None
+        self._next_slot = 0.0
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RateLimiter":
+        # a deepcopy of a client keeps pacing against the same budget as the original client
+        return self
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may be sent.
+        :return: seconds waited
+        """
+        waited = 0.0
+        while True:
+            granted, delay = self._reserve()
+            if delay > 0:
+                sleep(delay)
+                waited += delay
+            if granted:
+                return waited
+
+    async def acquire_async(self) -> float:
+        """
+        Waits on the event loop until a request may be sent.
+        :return: seconds waited
+        """
+        waited = 0.0
+        while True:
+            granted, delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+            if granted:
+                return waited
+
+    def update(self, headers: Mapping[str, str], rate_limited: bool = False) -> None:
+        """
+        Updates the budget from the rate limit headers of a response.
+        :param headers: response headers
+        :param rate_limited: whether the response was rejected with 429 (too many requests)
+        """
+        try:
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        try:
+            remaining = 0 if rate_limited else int(headers["x-ratelimit-remaining"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            now = monotonic()
+            if "x-ratelimit-limit" in headers:
+                try:
+                    self._limit = int(headers["x-ratelimit-limit"])
+                except ValueError:
+                    pass
+            reset_at = now + reset
+            if self._remaining is None or self._reset_at is None or now >= self._reset_at or reset_at > self._reset_at + 1:
+                # first response of a new window
+                self._remaining = remaining
+                self._next_slot = now
+            else:
+                # responses of requests sent earlier in the window may report a higher remaining budget
+                self._remaining = min(self._remaining, remaining)
+            self._reset_at = reset_at
+
+    def _reserve(self) -> Tuple[bool, float]:
+        """
+        Takes a request slot from the budget.
+        :return: whether the slot was granted and the delay before sending (if granted) or before trying again
+        """
+        with self._lock:
+            now = monotonic()
+            if self._reset_at is not None and now >= self._reset_at:
+                self._remaining = self._limit
+                self._reset_at = None
+            if self._remaining is None:
+                return True, 0.0
+            if self._remaining <= 0:
+                if self._reset_at is None:
+                    return False, _UNKNOWN_WINDOW_WAIT
+                return False, self._reset_at - now
+            if self._reset_at is None:
+                self._remaining -= 1
+                return True, 0.0
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + max(self._reset_at - slot, 0.0) / self._remaining
+            self._remaining -= 1
+            return True, slot - now
@@ -1,17 +1,36 @@
 import logging
-import socket
-import time
+import random
+import threading
 from datetime import date, datetime
+from time import sleep
 from logging import getLogger
-from typing import Dict, List, Optional, Union, cast, Callable, Any, Iterator
+from typing import Dict, List, Optional, Tuple, TypeVar, Union, cast, Callable, Any, Iterator
 from types import FrameType
-from urllib.parse import urlencode
+from urllib.parse import parse_qs, urlencode, urlparse
 import signal
 import requests
 from requests import HTTPError, Response
 import websocket
-
-from coinmetrics._utils import retry, transform_url_params_values_to_str, deprecated, alias
+from urllib3 import Retry
+
+from coinmetrics._compression import (
+    NdjsonStream,
+    RequestTransferStatistics,
+    STREAM_CHUNK_SIZE,
+    TransferStatistics,
+    accept_encoding_header,
+    iter_decompressed,
+    iter_ndjson_batches,
+)
+from coinmetrics._connection_pool import (
+    ConnectionPoolStatistics,
+    CoinMetricsHTTPAdapter,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+)
+from coinmetrics._hedging import RequestHedger
+from coinmetrics._rate_limiter import RateLimiter
+from coinmetrics._utils import transform_url_params_values_to_str, deprecated, alias
 from coinmetrics import __version__ as version
 from coinmetrics._exceptions import (
     CoinMetricsClientQueryParamsException,
@@ -22,7 +41,7 @@ from coinmetrics._typing import (
     MessageHandlerType
 )
 from coinmetrics.constants import PagingFrom, Backfill
-from coinmetrics._data_collection import DataCollection, AssetChainsDataCollection, TransactionTrackerDataCollection, CatalogV2DataCollection
+from coinmetrics._data_collection import DataCollection, AssetChainsDataCollection, TransactionTrackerDataCollection, CatalogV2DataCollection, _is_transient_error
 from coinmetrics._catalogs import (
     CatalogAssetsData,
     CatalogAssetAlertsData,
@@ -63,6 +82,28 @@ else:
     import ujson as json
 logger = getLogger("cm_client")
 
+# attempts of a request, including the attempts after connection errors, timeouts, 429 and 5xx responses
+NUMBER_OF_RETRIES = 5
+
+T = TypeVar("T")
+
+# clients rebuilt from their settings in the worker processes of a ProcessPoolExecutor, see _ChunkRunner
+_clients_by_settings: Dict[str, "CoinMetricsClient"] = {}
+_clients_by_settings_lock = threading.Lock()
+
+
+def _client_from_settings(settings: Dict[str, Any]) -> "CoinMetricsClient":
+    """
+    Returns the client of this worker process with the given constructor arguments, creating it on first use, so
+    that all data collections sent to the process share one session and rate limiter there.
+    """
+    key = repr(sorted(settings.items()))
+    with _clients_by_settings_lock:
+        client = _clients_by_settings.get(key)
+        if client is None:
+            client = _clients_by_settings[key] = CoinMetricsClient(**settings)
+        return client
+
 
 class CmStream:
     def __init__(self, ws_url: str):
@@ -135,6 +176,15 @@ class CoinMetricsClient:
         host: Optional[str] = None,
         port: Optional[int] = None,
         schema: str = "https",
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        max_retries: Union[int, Retry] = 0,
+        keep_alive: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        compress_responses: bool = True,
+        connect_timeout: Optional[float] = 30.0,
+        read_timeout: Optional[float] = 300.0,
+        hedge_requests: bool = False,
     ):
         """
         :param api_key: The API key for the CoinMetrics API.
@@ -155,7 +205,43 @@ class CoinMetricsClient:
         :type port: int
         :param schema: The schema for accessing the Coin Metrics API. Default is "https".
         :type schema: str
-        """
+        :param pool_connections: The number of host connection pools to cache in the session. Default is 10. Ignored if `session` is provided.
+        :type pool_connections: int
+        :param pool_maxsize: The maximum number of connections kept alive per host. Default is 10. It is increased automatically to `max_workers` of parallel exports. Ignored if `session` is provided.
+        :type pool_maxsize: int
+        :param max_retries: Number of retries of failed connection attempts at the HTTP adapter level, or a urllib3 Retry object. Default is 0. Ignored if `session` is provided.
+        :type max_retries: int or urllib3.Retry
+        :param keep_alive: Whether to keep connections open between requests. Default is True. Ignored if `session` is provided.
+        :type keep_alive: bool
+        :param rate_limiter: The rate limiter pacing all requests of the client based on the x-ratelimit-* response headers. By default each client creates its own; pass the same instance to clients sharing an API key.
+        :type rate_limiter: RateLimiter
+        :param compress_responses: Whether to ask the server to compress responses. gzip and deflate are always accepted, zstd and br if the `zstandard` and `brotli` packages are installed. Default is True.
+        :type compress_responses: bool
+        :param connect_timeout: Seconds to wait for a connection to the API to be established. Default is 30. None waits forever.
+        :type connect_timeout: float
+        :param read_timeout: Seconds to wait for the server to send data, both for the first byte of a response and between bytes of the body. Default is 300. None waits forever.
+        :type read_timeout: float
+        :param hedge_requests: Whether to send a duplicate of a request that has not returned its first byte within the 95th percentile of recent latencies, using the response that arrives first. Reduces tail latency of large exports at the cost of a few extra requests. Default is False.
+        :type hedge_requests: bool
+        """
+        # constructor arguments the client is rebuilt from in the worker processes of a ProcessPoolExecutor
+        self._settings: Dict[str, Any] = {
+            "api_key": api_key,
+            "verify_ssl_certs": verify_ssl_certs,
+            "proxy_url": proxy_url,
+            "verbose": verbose,
+            "host": host,
+            "port": port,
+            "schema": schema,
+            "pool_connections": pool_connections,
+            "pool_maxsize": pool_maxsize,
+            "max_retries": max_retries,
+            "keep_alive": keep_alive,
+            "compress_responses": compress_responses,
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout,
+            "hedge_requests": hedge_requests,
+        }
         self._api_key_url_str = "api_key={}".format(api_key) if api_key else ""
 
         self._verify_ssl_certs = verify_ssl_certs
@@ -179,11 +265,22 @@ class CoinMetricsClient:
         self._ws_api_base_url = f"{self._ws_schema}://{self._host_port}/v4"
         self._http_header = {"User-Agent": f"Coinmetrics-Python-API-Client/{version}"}
         self._proxies = {"http": proxy_url, "https": proxy_url}
+        self._pool_connections = pool_connections
+        self._max_retries = max_retries
+        self._connection_pool_statistics = ConnectionPoolStatistics()
+        self._rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self._accept_encoding = accept_encoding_header(compress_responses)
+        self._transfer_statistics = TransferStatistics()
+        self._timeout = (connect_timeout, read_timeout)
+        self._request_hedger = RequestHedger() if hedge_requests else None
         if session is None:
             self._session = requests.Session()
             self._session.verify = self._verify_ssl_certs
             self._session.headers.update({"User-Agent": f"Coinmetrics-Python-API-Client/{version}"})
             self._session.proxies.update({"http": proxy_url, "https": proxy_url})  # type: ignore
+            if not keep_alive:
+                self._session.headers.update({"Connection": "close"})
+            self._mount_http_adapter(pool_maxsize)
         else:
             self._session = session
 
@@ -213,6 +310,7 @@ class CoinMetricsClient:
             logger.debug(msg=f"Using coinmetrics version {version}")
             state_of_client = self.__dict__.copy()
             del state_of_client["_api_key_url_str"]
+            del state_of_client["_settings"]
             logger.debug(
                 msg=f"Current state of API Client, excluding API KEY: {state_of_client}"
             )
@@ -8244,6 +8342,61 @@ class CoinMetricsClient:
         }
         return DataCollection(self._get_data, "blockchain-metadata/locations", params, client=self)
 
+    @property
+    def connection_pool_statistics(self) -> Dict[str, int]:
+        """
+        Counters of HTTP connections created, reused and discarded by the client's session. Only sessions created by
+        the client are tracked.
+        :return: Dict with keys connections_created, connections_reused and connections_discarded
+        :rtype: dict(str, int)
+        """
+        return self._connection_pool_statistics.to_dict()
+
+    @property
+    def hedging_statistics(self) -> Dict[str, int]:
+        """
+        Number of hedged (duplicate) requests sent and how many of them responded before the original request. Empty
+        unless the client was created with `hedge_requests=True`.
+        :return: Dict with keys hedged_requests and hedges_won
+        :rtype: dict(str, int)
+        """
+        return self._request_hedger.statistics if self._request_hedger is not None else {}
+
+    @property
+    def transfer_statistics(self) -> TransferStatistics:
+        """
+        Byte counters of the responses read by the client: bytes received over the wire and bytes after decompression,
+        in total and for each of the last 100 requests (`recent_requests`).
+        :return: TransferStatistics with requests, bytes_received, bytes_decoded and compression_ratio
+        :rtype: TransferStatistics
+        """
+        return self._transfer_statistics
+
+    def _mount_http_adapter(self, pool_maxsize: int) -> None:
+        replaced_adapters = {self._session.adapters.get(prefix) for prefix in ("https://", "http://")}
+        adapter = CoinMetricsHTTPAdapter(
+            statistics=self._connection_pool_statistics,
+            pool_connections=self._pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=self._max_retries,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        for replaced_adapter in replaced_adapters:
+            # closes the idle connections of the replaced pools, connections in use are closed when they are released
+            if replaced_adapter is not None:
+                replaced_adapter.close()
+
+    def _size_connection_pool(self, number_of_workers: int) -> None:
+        """
+        Grows the connection pool of a session created by the client so that every worker can keep its connection
+        alive instead of having it discarded and re-established.
+        """
+        adapter = self._session.adapters.get(f"{self._schema}://")
+        if isinstance(adapter, CoinMetricsHTTPAdapter) and adapter.pool_maxsize < number_of_workers:
+            self._log(f"Increasing connection pool size from {adapter.pool_maxsize} to {number_of_workers}")
+            self._mount_http_adapter(number_of_workers)
+
     def _log(self, msg: str) -> None:
         (logger.info if self.verbose else logger.debug)(msg)
 
@@ -8251,6 +8404,61 @@ class CoinMetricsClient:
         """
         For non-stream responses (JSON object/array) OR returns a generator for json_stream.
         """
+        if params.get("format") == "json_stream":
+            # Return a generator: caller can iterate without loading into memory. The data collection reading it
+            # resumes a stream that is interrupted.
+            return cast(DataReturnType, self._iter_json_stream(self._get_response(url, params)))
+        else:
+            # the body is read within the attempt, so that errors reading it are retried like errors sending it
+            data = self._request(url, params, lambda resp: json.loads(b"".join(self._iter_response_content(resp))))
+            return cast(DataReturnType, data)
+
+    def _get_raw_data(self, url: str, params: Dict[str, Any]) -> Tuple[Iterator[bytes], Optional[str]]:
+        """
+        Returns the decompressed body of a response as chunks of bytes, without parsing it, e.g. for `format=csv`
+        responses written to a file as they are.
+        :return: body chunks and the next_page_token of the `x-next-page-url` header, None on the last page
+        """
+        resp = self._get_response(url, params)
+        next_page_url = resp.headers.get("x-next-page-url")
+        next_page_token = parse_qs(urlparse(next_page_url).query).get("next_page_token", [None])[0] if next_page_url else None
+        return self._iter_response_content(resp), next_page_token
+
+    def _get_response(self, url: str, params: Dict[str, Any]) -> Response:
+        """
+        Sends the request and raises on HTTP errors; the body of the returned response is not read yet.
+        """
+        return self._request(url, params, lambda resp: resp)
+
+    def _request(self, url: str, params: Dict[str, Any], read: Callable[[Response], T]) -> T:
+        """
+        Sends the request, raises on HTTP errors and passes the response to `read`. Connection errors, timeouts,
+        429 and 5xx responses and errors in `read` are retried, at most NUMBER_OF_RETRIES attempts in total. This is
+        the only retry layer of requests of the client; data collections do not retry them again, see
+        `_fetch_data_with_retries`.
+        """
+        for attempt in range(1, NUMBER_OF_RETRIES + 1):
+            resp: Optional[Response] = None
+            try:
+                resp = self._send_checked_request(url, params)
+                return read(resp)
+            except Exception as e:
+                if attempt == NUMBER_OF_RETRIES or not _is_transient_error(e):
+                    raise
+                if resp is not None:
+                    resp.close()
+                if isinstance(e, HTTPError) and e.response is not None and e.response.status_code == 429:
+                    # the rate limiter waits for the next window
+                    logger.info("Waiting for a rate limit window because 429 (too many requests) error was returned. Please "
+                                "see Coin Metrics APIV4 documentation for more information: https://docs.coinmetrics.io/api/v4/#tag/Rate-limits")
+                    continue
+                delay = min(2 ** (attempt - 1), 60)
+                wait_time = delay + random.uniform(0, 0.1) * delay
+                logger.info("Request failed with error: %s. Retrying in: %.2f sec. Iteration: %s", e, wait_time, attempt)
+                sleep(wait_time)
+        raise RuntimeError(f"Failed to request {url}")
+
+    def _send_checked_request(self, url: str, params: Dict[str, Any]) -> Response:
         if params:
             params_str = "&{}".format(urlencode(transform_url_params_values_to_str(params)))
         else:
@@ -8262,7 +8470,7 @@ class CoinMetricsClient:
         self._log(f"Attempting to call url: {url.split('api_key')[0]} with params: {params}")
         start_time = datetime.now()
 
-        # Use stream=True iff json_stream is requested
+        # The body is always streamed so that it is decompressed (and counted) by the client rather than by urllib3
         resp = self._send_request(actual_url, is_json_stream=is_json_stream)
 
         elapsed = datetime.now() - start_time
@@ -8286,28 +8494,54 @@ class CoinMetricsClient:
                         logger.error(error_msg)
                         resp.raise_for_status()
                 except ValueError:
-                    raise ValueError(f"Failed to parse error response as JSON. Status code: {resp.status_code}, Content: {resp.content}")
+                    raise ValueError(f"Failed to parse error response as JSON. Status code: {resp.status_code}, Content: {resp.content!r}")
             raise
+        return resp
 
-        if is_json_stream:
-            # Return a generator: caller can iterate without loading into memory
-            return cast(DataReturnType, self._iter_json_stream(resp))
-        else:
-            data = json.loads(resp.content)
-            return cast(DataReturnType, data)
+    def _iter_json_stream(self, resp: Response) -> NdjsonStream:
+        """
+        Iterate over an NDJSON (json_stream) response, yielding parsed dicts. `DataCollection.iter_pages()` reads the
+        returned stream in batches instead.
+        """
+        return NdjsonStream(self._iter_json_stream_batches(resp))
 
-    def _iter_json_stream(self, resp: Response) -> Iterator[Dict[str, Any]]:
+    def _iter_json_stream_batches(self, resp: Response) -> Iterator[List[Dict[str, Any]]]:
         """
-        Iterate over an NDJSON (json_stream) response, yielding parsed dicts.
-        Skips keep-alive newlines; surfaces API error lines early.
+        Iterate over an NDJSON (json_stream) response, yielding the parsed rows of every chunk read as one list.
+        Lines are split from the decompressed chunks as raw bytes and parsed with orjson; keep-alive newlines are
+        skipped.
         """
-        # Make sure response will yield text lines
-        if resp.encoding is None:
-            resp.encoding = "utf-8"  # API uses UTF-8; explicit is better
+        return iter_ndjson_batches(self._iter_response_content(resp))
 
-        for line in resp.iter_lines(decode_unicode=True, chunk_size=1 << 14):
-            obj = json.loads(line)
-            yield obj
+    def _iter_response_content(self, resp: Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Reads the raw (possibly compressed) body of a response in chunks and yields it decompressed. The bytes before
+        and after decompression are added to the client's transfer statistics once the body is read.
+        """
+        if not hasattr(resp.raw, "stream"):
+            # the body was already read, e.g. a response built without a connection
+            yield resp.content
+            return
+        request_statistics = RequestTransferStatistics(resp.url, resp.headers.get("content-encoding"))
+        completed = False
+        try:
+            yield from iter_decompressed(
+                resp.raw.stream(chunk_size, decode_content=False),
+                resp.headers.get("content-encoding"),
+                request_statistics,
+            )
+            completed = True
+        finally:
+            self._transfer_statistics.record(request_statistics)
+            self._log(
+                f"Received {request_statistics.bytes_received} bytes ({request_statistics.content_encoding}), "
+                f"{request_statistics.bytes_decoded} bytes decoded for url: {resp.url}"
+            )
+            if completed:
+                # the body was read to the end, so the connection can go back to the pool
+                resp.raw.release_conn()
+            else:
+                resp.close()
 
     def _get_stream_data(self, url: str, params: Dict[str, Any]) -> CmStream:
         if params:
@@ -8321,21 +8555,28 @@ class CoinMetricsClient:
         )
         return CmStream(ws_url=actual_url)
 
-    @retry((socket.gaierror, HTTPError), retries=5, wait_time_between_retries=5)
     def _send_request(self, actual_url: str, is_json_stream: False) -> Response:  # type: ignore
         """
-        Wrapper for requests.get with retry on certain exceptions.
-        """
-        response = self._session.get(
-            actual_url,
-            headers=self._session.headers,
-            proxies=self._session.proxies,
-            verify=self._session.verify,
-            stream=is_json_stream,
-        )
-        if response.status_code == 429 or response.headers.get("x-ratelimit-remaining", None) == "0":
-            logger.info("Sleeping for a rate limit window because 429 (too many requests) error was returned. Please "
-                        "see Coin Metrics APIV4 documentation for more information: https://docs.coinmetrics.io/api/v4/#tag/Rate-limits")
-            time.sleep(int(response.headers["x-ratelimit-reset"]))
-            response = self._send_request(actual_url=actual_url)
+        Wrapper for requests.get, sending the request once, see `_request` for retries. Requests are paced by the
+        client's rate limiter and hedged if the client was created with `hedge_requests=True`.
+        """
+        def _get() -> Response:
+            waited = self._rate_limiter.acquire()
+            if waited > 1:
+                self._log(f"Waited {waited:.2f} seconds for the rate limit window")
+            response = self._session.get(
+                actual_url,
+                headers={**self._session.headers, "Accept-Encoding": self._accept_encoding},
+                proxies=self._session.proxies,
+                verify=self._session.verify,
+                stream=True,
+                timeout=self._timeout,
+            )
+            self._rate_limiter.update(response.headers, rate_limited=response.status_code == 429)
+            return response
+
+        if self._request_hedger is not None:
+            response = self._request_hedger.send(_get, close=Response.close)
+        else:
+            response = _get()
         return response
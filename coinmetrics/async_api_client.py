@@ -0,0 +1,312 @@
+import asyncio
+import inspect
+import random
+import ssl
+from datetime import datetime
+from functools import partial, wraps
+from logging import getLogger
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Union, cast
+from urllib.parse import urlencode
+
+from coinmetrics import __version__ as version
+from coinmetrics._async_data_collection import AsyncDataCollection
+from coinmetrics._compression import (
+    RequestTransferStatistics,
+    STREAM_CHUNK_SIZE,
+    NdjsonLineSplitter,
+    get_decompressor,
+    parse_ndjson_lines,
+)
+from coinmetrics._data_collection import DataCollection
+from coinmetrics._rate_limiter import RateLimiter
+from coinmetrics._typing import DataReturnType
+from coinmetrics._utils import transform_url_params_values_to_str
+from coinmetrics.api_client import NUMBER_OF_RETRIES, CoinMetricsClient, CoinMetricsClientQueryParamsException, json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # type: ignore
+
+logger = getLogger("cm_client")
+
+
+class AsyncCoinMetricsClient(CoinMetricsClient):
+    """
+    The AsyncCoinMetricsClient class is an asyncio wrapper for calling the Coin Metrics API. It exposes the same methods
+    as CoinMetricsClient, but data methods return an AsyncDataCollection whose pages are requested on the event loop:
+
+    ```
+    async with AsyncCoinMetricsClient(api_key) as client:
+        async for row in client.get_asset_metrics("btc", "ReferenceRateUSD"):
+            ...
+        df = await client.get_market_trades("coinbase-btc-usd-spot", start_time="2024-01-01").to_dataframe()
+    ```
+
+    Deprecated `catalog_*` (v1) methods and `get_stream_*` websocket methods keep their synchronous implementation;
+    the former are awaitable and run in the default executor.
+
+    Requires the `aiohttp` package.
+    """
+    def __init__(
+        self,
+        api_key: str = "",
+        verify_ssl_certs: Union[bool, str] = True,
+        proxy_url: Optional[str] = None,
+        session: Optional["aiohttp.ClientSession"] = None,
+        debug_mode: bool = False,
+        verbose: bool = False,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        schema: str = "https",
+        max_connections: int = 100,
+        rate_limiter: Optional[RateLimiter] = None,
+        compress_responses: bool = True,
+        connect_timeout: Optional[float] = 30.0,
+        read_timeout: Optional[float] = 300.0,
+        hedge_requests: bool = False,
+    ):
+        """
+        :param api_key: The API key for the CoinMetrics API.
+        :type api_key: str
+        :param verify_ssl_certs: Whether to verify SSL certificates. Default is True. You may set this to False or a path to a CA bundle.
+        :type verify_ssl_certs: bool or str
+        :param proxy_url: The URL of the proxy to use.
+        :type proxy_url: str
+        :param session: The aiohttp session to use. If not provided, one is created on first request and closed by `close()`.
+        :type session: aiohttp.ClientSession
+        :param debug_mode: Whether to enable debug mode for logging.
+        :type debug_mode: bool
+        :param verbose: Whether to enable verbose mode for logging.
+        :type verbose: bool
+        :param host: The host for the Coin Metrics API. Default is "api.coinmetrics.io" or "community-api.coinmetrics.io based on user credentials.
+        :type host: str
+        :param port: The port for accessing the Coin Metrics API. Default is None.
+        :type port: int
+        :param schema: The schema for accessing the Coin Metrics API. Default is "https".
+        :type schema: str
+        :param max_connections: Maximum number of simultaneous connections of the session created by the client. Default is 100.
+        :type max_connections: int
+        :param rate_limiter: The rate limiter pacing all requests of the client based on the x-ratelimit-* response headers.
+        :type rate_limiter: RateLimiter
+        :param compress_responses: Whether to ask the server to compress responses. gzip and deflate are always accepted, zstd and br if the `zstandard` and `brotli` packages are installed. Default is True.
+        :type compress_responses: bool
+        :param connect_timeout: Seconds to wait for a connection to the API to be established. Default is 30. None waits forever.
+        :type connect_timeout: float
+        :param read_timeout: Seconds to wait for the server to send data, both for the first byte of a response and between bytes of the body. Default is 300. None waits forever.
+        :type read_timeout: float
+        :param hedge_requests: Whether to send a duplicate of a request that has not returned its first byte within the 95th percentile of recent latencies, using the response that arrives first. Default is False.
+        :type hedge_requests: bool
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncCoinMetricsClient requires aiohttp. Install it with `pip install coinmetrics-api-client[async]`."
+            )
+        super().__init__(
+            api_key=api_key,
+            verify_ssl_certs=verify_ssl_certs,
+            proxy_url=proxy_url,
+            debug_mode=debug_mode,
+            verbose=verbose,
+            host=host,
+            port=port,
+            schema=schema,
+            rate_limiter=rate_limiter,
+            compress_responses=compress_responses,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            hedge_requests=hedge_requests,
+        )
+        self._proxy_url = proxy_url
+        self._max_connections = max_connections
+        self._async_session = session
+        self._owns_async_session = session is None
+        self._ssl: Union[bool, ssl.SSLContext] = True
+        if isinstance(verify_ssl_certs, str):
+            self._ssl = ssl.create_default_context(cafile=verify_ssl_certs)
+        elif not verify_ssl_certs:
+            self._ssl = False
+
+    async def __aenter__(self) -> "AsyncCoinMetricsClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Closes the aiohttp session if it was created by the client.
+        """
+        if self._async_session is not None and self._owns_async_session:
+            await self._async_session.close()
+            self._async_session = None
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        # aiohttp sessions are bound to the running event loop, so it is created lazily on first request
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_connections, ssl=self._ssl),
+                headers={"User-Agent": f"Coinmetrics-Python-API-Client/{version}"},
+                # no limit on the total duration, long json_stream responses are bounded by the read timeout instead
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self._timeout[0], sock_read=self._timeout[1]),
+                # bodies are decompressed by the client so that transfer statistics see the compressed size
+                auto_decompress=False,
+            )
+            self._owns_async_session = True
+        return self._async_session
+
+    async def _get_data_async(
+        self, url: str, params: Dict[str, Any]
+    ) -> Union[DataReturnType, AsyncIterator[Dict[str, Any]]]:
+        """
+        For non-stream responses (JSON object/array) OR returns an async generator for json_stream.
+        """
+        if params:
+            params_str = "&{}".format(urlencode(transform_url_params_values_to_str(params)))
+        else:
+            params_str = ""
+
+        actual_url = "{}/{}?{}{}".format(self._api_base_url, url, self._api_key_url_str, params_str)
+        is_json_stream = params.get("format") == "json_stream"
+
+        self._log(f"Attempting to call url: {url.split('api_key')[0]} with params: {params}")
+        start_time = datetime.now()
+
+        resp = await self._send_request_async(actual_url)
+
+        elapsed = datetime.now() - start_time
+        if is_json_stream:
+            self._log(f"Response status code: {resp.status} for url: {resp.url} took: {elapsed} (streaming)")
+        else:
+            self._log(f"Response status code: {resp.status} for url: {resp.url} took: {elapsed}")
+
+        if resp.status >= 400:
+            if resp.status == 414:
+                # URI is too long
+                resp.release()
+                raise CoinMetricsClientQueryParamsException(response=resp)
+            content = b"".join([chunk async for chunk in self._iter_response_content_async(resp)])
+            if resp.content_type == "application/json":
+                try:
+                    data = json.loads(content)
+                except ValueError:
+                    raise ValueError(f"Failed to parse error response as JSON. Status code: {resp.status}, Content: {content!r}")
+                if isinstance(data, dict) and "error" in data:
+                    logger.error(f"Error found for the query: \n {actual_url}\nError details: {data.get('error')}")
+            resp.raise_for_status()
+
+        if is_json_stream:
+            return self._iter_json_stream_async(resp)
+        content = b"".join([chunk async for chunk in self._iter_response_content_async(resp)])
+        return cast(DataReturnType, json.loads(content))
+
+    async def _iter_json_stream_async(self, resp: "aiohttp.ClientResponse") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over an NDJSON (json_stream) response as chunks arrive, yielding parsed dicts.
+        Skips keep-alive newlines.
+        """
+        splitter = NdjsonLineSplitter()
+        async for chunk in self._iter_response_content_async(resp):
+            for row in parse_ndjson_lines(splitter.feed(chunk)):
+                yield row
+        for row in parse_ndjson_lines(splitter.close()):
+            yield row
+
+    async def _iter_response_content_async(
+        self, resp: "aiohttp.ClientResponse", chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Reads the raw body of a response in chunks and yields it decompressed, adding the bytes before and after
+        decompression to the client's transfer statistics.
+        """
+        # sessions passed by the user may decompress bodies themselves
+        content_encoding = resp.headers.get("Content-Encoding") if self._decompresses_responses() else None
+        request_statistics = RequestTransferStatistics(str(resp.url), content_encoding)
+        decompressor = get_decompressor(content_encoding)
+        try:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                request_statistics.bytes_received += len(chunk)
+                data = decompressor.decompress(chunk)
+                if data:
+                    request_statistics.bytes_decoded += len(data)
+                    yield data
+            data = decompressor.flush()
+            if data:
+                request_statistics.bytes_decoded += len(data)
+                yield data
+        finally:
+            self._transfer_statistics.record(request_statistics)
+            resp.release()
+
+    def _decompresses_responses(self) -> bool:
+        return getattr(self._async_session, "auto_decompress", True) is False
+
+    async def _send_request_async(self, actual_url: str) -> "aiohttp.ClientResponse":
+        """
+        Wrapper for aiohttp's session.get with retry on connection errors and 429 (too many requests) responses, at
+        most NUMBER_OF_RETRIES attempts in total. Requests are paced by the client's rate limiter, which is shared with
+        synchronous calls of the same client, and hedged if the client was created with `hedge_requests=True`. The
+        last 429 response is returned to the caller, which raises it.
+        """
+        session = self._get_async_session()
+
+        async def _get() -> "aiohttp.ClientResponse":
+            waited = await self._rate_limiter.acquire_async()
+            if waited > 1:
+                self._log(f"Waited {waited:.2f} seconds for the rate limit window")
+            headers = {"Accept-Encoding": self._accept_encoding} if self._decompresses_responses() else None
+            response = await session.get(actual_url, proxy=self._proxy_url, headers=headers)
+            self._rate_limiter.update(response.headers, rate_limited=response.status == 429)
+            return response
+
+        for n in range(1, NUMBER_OF_RETRIES + 1):
+            try:
+                if self._request_hedger is not None:
+                    response = await self._request_hedger.send_async(_get, close=aiohttp.ClientResponse.release)
+                else:
+                    response = await _get()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if n == NUMBER_OF_RETRIES:
+                    raise
+                delay = min(2 ** (n - 1), 60)
+                wait_time = delay + random.uniform(0, 0.1) * delay
+                logger.info("Request failed with error: %s. Retrying in: %.2f sec. Iteration: %s", e, wait_time, n)
+                await asyncio.sleep(wait_time)
+                continue
+
+            if response.status == 429 and n < NUMBER_OF_RETRIES:
+                logger.info("Waiting for a rate limit window because 429 (too many requests) error was returned. Please "
+                            "see Coin Metrics APIV4 documentation for more information: https://docs.coinmetrics.io/api/v4/#tag/Rate-limits")
+                response.release()
+                continue
+            return response
+        raise RuntimeError(f"Failed to send request to {actual_url}")
+
+
+def _async_data_collection_method(method: Callable[..., DataCollection]) -> Callable[..., AsyncDataCollection]:
+    @wraps(method)
+    def wrapper(self: AsyncCoinMetricsClient, *args: Any, **kwargs: Any) -> AsyncDataCollection:
+        data_collection = method(self, *args, **kwargs)
+        if isinstance(data_collection, AsyncDataCollection):
+            # aliases call the already wrapped canonical method
+            return data_collection
+        return AsyncDataCollection(data_collection, self._get_data_async)
+    return wrapper
+
+
+def _async_eager_method(method: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(method)
+    async def wrapper(self: AsyncCoinMetricsClient, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(method, self, *args, **kwargs))
+    return wrapper
+
+
+for _name, _method in list(vars(CoinMetricsClient).items()):
+    if _name.startswith("_") or not callable(_method) or _name.startswith("get_stream_"):
+        continue
+    _return_type = inspect.signature(_method).return_annotation
+    if inspect.isclass(_return_type) and issubclass(_return_type, DataCollection):
+        setattr(AsyncCoinMetricsClient, _name, _async_data_collection_method(_method))
+    else:
+        setattr(AsyncCoinMetricsClient, _name, _async_eager_method(_method))
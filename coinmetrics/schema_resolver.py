@@ -1,4 +1,5 @@
-from typing import Any, Dict
+import re
+from typing import Any, Dict, Optional
 from ._schema_constants import OPENAPI_SCHEMA
 
 # Map endpoints to their schema names
@@ -51,6 +52,22 @@ def get_schema_for_endpoint(endpoint: str) -> str:
     return schema_name
 
 
+def find_schema_for_endpoint(endpoint: str) -> Optional[str]:
+    """
+    Find the schema name of a concrete API endpoint, matching path parameters of the mapped endpoints.
+
+    Args:
+        endpoint: The API endpoint path, e.g. blockchain-v2/btc/balance-updates
+
+    Returns:
+        The schema name or None if the endpoint has no schema mapping
+    """
+    for schema_endpoint, schema_name in ENDPOINT_SCHEMA_MAP.items():
+        if re.fullmatch(re.sub(r"\{[^/]+\}", "[^/]+", schema_endpoint), endpoint):
+            return schema_name
+    return None
+
+
 def resolve_schema_field(
     prop: Dict[Any, Any],
     root: Dict[Any, Any] = OPENAPI_SCHEMA,
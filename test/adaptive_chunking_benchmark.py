@@ -0,0 +1,92 @@
+"""
+Wall time of a ParallelDataCollection over markets of very different density, comparing fixed weekly chunks
+(time_increment) with chunking="auto". One market has a burst of trades in its last days, so with fixed chunks one
+worker pages through the burst while the others are idle.
+Runs offline against a simulated API: python test/adaptive_chunking_benchmark.py [--latency 0.05] [--workers 8]
+"""
+import argparse
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from dateutil.parser import isoparse
+
+from coinmetrics._data_collection import DataCollection
+
+START = datetime(2024, 1, 1)
+DAYS = 28
+
+
+class SimulatedApi:
+    """
+    Serves trades within start_time/end_time in pages from the start of the range, waiting `latency` per request.
+    """
+
+    def __init__(self, seconds_by_market: Dict[str, List[int]], latency: float) -> None:
+        self.seconds_by_market = seconds_by_market
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _to_seconds(value: Any) -> float:
+        if isinstance(value, str):
+            value = isoparse(value).replace(tzinfo=None)
+        return (value - START).total_seconds()  # type: ignore
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        seconds = self.seconds_by_market[params["markets"]]
+        start, end = self._to_seconds(params["start_time"]), self._to_seconds(params["end_time"])
+        first = bisect.bisect_left(seconds, start) if params.get("start_inclusive", True) else bisect.bisect_right(seconds, start)
+        last = bisect.bisect_right(seconds, end) if params.get("end_inclusive", True) else bisect.bisect_left(seconds, end)
+        page_size, offset = int(params["page_size"]), int(params.get("next_page_token") or 0)
+        page = [
+            {"market": params["markets"], "time": (START + timedelta(seconds=second)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"), "coin_metrics_id": str(i)}
+            for i, second in zip(range(first + offset, last), seconds[first + offset:min(last, first + offset + page_size)])
+        ]
+        response: Dict[str, Any] = {"data": page}
+        if first + offset + page_size < last:
+            response["next_page_token"] = str(offset + page_size)
+        return response
+
+
+def make_markets(markets: int) -> Dict[str, List[int]]:
+    # a trade per minute, and 2 trades per second in the last two days of the first market
+    quiet = list(range(0, DAYS * 86400, 60))
+    burst = [second for second in range((DAYS - 2) * 86400, DAYS * 86400, 60) for _ in range(120)]
+    seconds_by_market = {f"market{market}": quiet for market in range(1, markets)}
+    seconds_by_market["market0"] = sorted(quiet[:len(quiet) - 2 * 1440] + burst)
+    return seconds_by_market
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark chunking='auto' of ParallelDataCollection")
+    parser.add_argument("--markets", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    seconds_by_market = make_markets(args.markets)
+    for name, options in (
+        ("time_increment=7 days", {"time_increment": timedelta(days=7)}),
+        ("chunking='auto'", {"chunking": "auto"}),
+    ):
+        api = SimulatedApi(seconds_by_market, args.latency)
+        data_collection = DataCollection(api, "timeseries/market-trades", {
+            "markets": ",".join(seconds_by_market), "start_time": START, "end_time": START + timedelta(days=DAYS),
+            "page_size": 1000, "paging_from": "start",
+        })
+        parallel = data_collection.parallel("markets", max_workers=args.workers, progress_bar=False, **options)
+        start = time.perf_counter()
+        rows = sum(len(page) for page in parallel.iter_pages(ordered=False))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<25} {elapsed:6.2f} sec  {api.requests:5} requests  {rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Time and peak memory of DataCollection.to_dataframe() on synthetic market trades, comparing the previous CSV round
+trip (export_to_csv into a BytesIO, then pandas.read_csv / polars.read_csv) with the columnar builders. The peak
+is measured with tracemalloc and so only counts Python allocations, not the Arrow buffers of polars.
+Runs offline: python test/dataframe_benchmark.py [--rows 1000000] [--page-size 10000]
+"""
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from coinmetrics._data_collection import DataCollection
+from coinmetrics._typing import DataFrameType
+
+
+def make_pages(rows: int, page_size: int) -> Dict[str, Dict[str, Any]]:
+    pages: Dict[str, Dict[str, Any]] = {}
+    for page, start in enumerate(range(0, rows, page_size)):
+        data = [
+            {
+                "market": "coinbase-btc-usd-spot",
+                "time": f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}000Z",
+                "coin_metrics_id": str(i),
+                "amount": f"0.{i % 9973:05d}",
+                "price": f"{42000 + i % 1000}.{i % 100:02d}",
+                "database_time": f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}500Z",
+                "side": "buy" if i % 2 else "sell",
+            }
+            for i in range(start, min(start + page_size, rows))
+        ]
+        response: Dict[str, Any] = {"data": data}
+        if start + page_size < rows:
+            response["next_page_token"] = str(page + 1)
+        pages["" if page == 0 else str(page)] = response
+    return pages
+
+
+def to_dataframe_via_csv(
+    data_collection: DataCollection, dtype_mapper: Optional[Dict[str, Any]] = None, dataframe_type: str = "pandas"
+) -> DataFrameType:
+    # the implementation before the columnar builder
+    f = BytesIO()
+    data_collection.export_to_csv(f)
+    f.seek(0)
+    columns = BytesIO(f.getvalue()).readlines(1)[0].decode().strip().split(",")
+    datetime_cols = [c for c in columns if c.endswith("_time") or c == "time"]
+    if dataframe_type == "polars":
+        return pl.read_csv(f, try_parse_dates=True, null_values=["None"])
+    df = pd.read_csv(f, parse_dates=datetime_cols, dtype=dtype_mapper)
+    if dtype_mapper is None:
+        df = df.convert_dtypes()
+    if df.dtypes.get("coin_metrics_id") == np.dtype("object"):
+        df["coin_metrics_id"] = df["coin_metrics_id"].astype(np.float128)
+    return df
+
+
+def benchmark(name: str, build: Callable[[], DataFrameType]) -> None:
+    start = time.perf_counter()
+    df = build()
+    elapsed = time.perf_counter() - start
+    del df
+    # tracemalloc slows allocations down, so the peak is measured in a second run
+    tracemalloc.start()
+    df = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<35} {elapsed:6.2f} sec  peak {peak / 1e6:7.0f} MB  {len(df):,} rows")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark DataCollection.to_dataframe()")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    pages = make_pages(args.rows, args.page_size)
+
+    def data_collection() -> DataCollection:
+        return DataCollection(lambda endpoint, params: pages[str(params.get("next_page_token", ""))], "timeseries/market-trades", {})
+
+    for dataframe_type in ("pandas", "polars"):
+        benchmark(f"{dataframe_type}: CSV round trip", lambda: to_dataframe_via_csv(data_collection(), dataframe_type=dataframe_type))
+        benchmark(f"{dataframe_type}: columnar builder", lambda: data_collection().to_dataframe(dataframe_type=dataframe_type))
+
+
+if __name__ == "__main__":
+    main()
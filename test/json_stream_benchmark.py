@@ -0,0 +1,67 @@
+"""
+Rows per second of parsing a synthetic json_stream (NDJSON) response of 1M market trades, comparing the previous
+line by line text decoding (`iter_lines(decode_unicode=True)` + ujson/json) with the bytes level splitter parsing
+with orjson. Runs offline: python test/json_stream_benchmark.py [--rows 1000000]
+"""
+import argparse
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
+from coinmetrics.api_client import CoinMetricsClient, json
+
+
+def make_ndjson(rows: int) -> bytes:
+    line = (
+        '{{"market":"coinbase-btc-usd-spot","time":"2024-01-01T00:00:{second:02d}.{micros:06d}000Z",'
+        '"coin_metrics_id":"{i}","amount":"0.00123","price":"42123.45","database_time":'
+        '"2024-01-01T00:00:{second:02d}.{micros:06d}500Z","side":"buy"}}\n'
+    )
+    return "".join(line.format(second=i % 60, micros=i % 1000000, i=i) for i in range(rows)).encode()
+
+
+def make_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.raw = HTTPResponse(body=BytesIO(body), preload_content=False, status=200)
+    response.status_code = 200
+    response.url = "http://localhost/v4/timeseries/market-trades?format=json_stream"
+    response.headers = CaseInsensitiveDict()
+    return response
+
+
+def iter_lines_text(response: requests.Response) -> Iterator[Dict[str, Any]]:
+    # the implementation before the bytes level splitter
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True, chunk_size=1 << 14):
+        yield json.loads(line)
+
+
+def benchmark(name: str, body: bytes, parse: Callable[[requests.Response], Iterable[Any]], rows: int) -> None:
+    start = time.perf_counter()
+    count = 0
+    for item in parse(make_response(body)):
+        count += len(item) if isinstance(item, list) else 1
+    elapsed = time.perf_counter() - start
+    assert count == rows, f"{name} parsed {count} rows instead of {rows}"
+    print(f"{name:<45} {elapsed:6.2f} sec {rows / elapsed:12,.0f} rows/sec")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark json_stream parsing")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    body = make_ndjson(args.rows)
+    print(f"{args.rows:,} rows, {len(body) / 1e6:.0f} MB")
+    client = CoinMetricsClient()
+    benchmark(f"iter_lines(decode_unicode=True) + {json.__name__}", body, iter_lines_text, args.rows)
+    benchmark("bytes splitter + orjson, rows", body, client._iter_json_stream, args.rows)
+    benchmark("bytes splitter + orjson, batches", body, client._iter_json_stream_batches, args.rows)
+
+
+if __name__ == "__main__":
+    main()
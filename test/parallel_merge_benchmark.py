@@ -0,0 +1,70 @@
+"""
+Time and peak memory of combining the dataframes of a ParallelDataCollection split on metrics and assets, comparing
+the previous pairwise outer merges with the single alignment of `_group_and_merge`.
+Runs offline: python test/parallel_merge_benchmark.py [--metrics 100] [--assets 20] [--days 1000]
+"""
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from coinmetrics._data_collection import _group_and_merge
+
+ON = ["time", "asset"]
+
+
+def make_dataframes(metrics: int, assets: int, days: int) -> List[pd.DataFrame]:
+    # one dataframe per data collection, as returned by DataCollection.to_dataframe()
+    times = pd.Series(pd.date_range("2020-01-01", periods=days, freq="D", tz="UTC"))
+    rng = np.random.default_rng(0)
+    return [
+        pd.DataFrame({"time": times, "asset": pd.Series([f"asset{asset}"] * days, dtype="string"), f"Metric{metric}": rng.random(days)})
+        for metric in range(metrics)
+        for asset in range(assets)
+    ]
+
+
+def pairwise_merge(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    # the implementation before the single alignment
+    grouped_dfs = defaultdict(list)
+    for df in dfs:
+        grouped_dfs[tuple(df.columns)].append(df)
+    concatenated_dfs = [pd.concat(group, axis=0) for group in grouped_dfs.values()]
+    result = concatenated_dfs[0]
+    for df in concatenated_dfs[1:]:
+        result = pd.merge(result, df, on=ON, how="outer")
+    return result
+
+
+def benchmark(name: str, combine: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    start = time.perf_counter()
+    df = combine()
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows allocations down, so the peak is measured in a second run
+    tracemalloc.start()
+    combine()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<25} {elapsed:6.2f} sec  peak {peak / 1e6:7.0f} MB  {df.shape[0]:,} rows x {df.shape[1]} columns")
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark merging the dataframes of parallel data collections")
+    parser.add_argument("--metrics", type=int, default=100)
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--days", type=int, default=1000)
+    args = parser.parse_args()
+
+    dfs = make_dataframes(args.metrics, args.assets, args.days)
+    previous = benchmark("pairwise outer merges", lambda: pairwise_merge(dfs))
+    current = benchmark("single alignment", lambda: _group_and_merge(dfs, ON))
+    pd.testing.assert_frame_equal(previous.reset_index(drop=True), current)
+
+
+if __name__ == "__main__":
+    main()
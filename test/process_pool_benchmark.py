@@ -0,0 +1,83 @@
+"""
+Wall time of ParallelDataCollection.to_dataframe() and to_arrow() with a ThreadPoolExecutor and a ProcessPoolExecutor.
+Parsing the JSON pages and building the frames is CPU-bound, so threads are serialized by the GIL while worker
+processes scale with the number of cores. Runs offline against a local HTTP server:
+python test/process_pool_benchmark.py [--markets 8] [--pages 10] [--rows 10000] [--workers 4]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlparse
+
+from coinmetrics.api_client import CoinMetricsClient
+
+PAGES: Dict[str, bytes] = {}
+
+
+def make_page(market: str, page: int, rows: int, pages: int) -> bytes:
+    data = [
+        {
+            "market": market, "time": f"2024-01-01T00:{page % 60:02d}:{i % 60:02d}.{i:06d}000Z",
+            "coin_metrics_id": str(page * rows + i), "amount": "0.00123", "price": "42123.45", "side": "buy",
+            "database_time": f"2024-01-01T00:{page % 60:02d}:{i % 60:02d}.{i:06d}500Z",
+        }
+        for i in range(rows)
+    ]
+    response: Dict[str, Any] = {"data": data}
+    if page < pages - 1:
+        response["next_page_token"] = str(page + 1)
+    return json.dumps(response).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        params = parse_qs(urlparse(self.path).query)
+        body = PAGES[f"{params['markets'][0]}/{params.get('next_page_token', ['0'])[0]}"]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark process pools of ParallelDataCollection")
+    parser.add_argument("--markets", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    markets = [f"market{market}" for market in range(args.markets)]
+    PAGES.update(
+        (f"{market}/{page}", make_page(market, page, args.rows, args.pages))
+        for market in markets for page in range(args.pages)
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = CoinMetricsClient(host="127.0.0.1", port=server.server_address[1], schema="http", compress_responses=False)
+    try:
+        for output in ("to_dataframe", "to_arrow"):
+            for executor in (ThreadPoolExecutor, ProcessPoolExecutor):
+                parallel = client.get_market_trades(markets, page_size=args.rows).parallel(
+                    executor=executor, max_workers=args.workers, progress_bar=False
+                )
+                start = time.perf_counter()
+                rows = len(getattr(parallel, output)())
+                elapsed = time.perf_counter() - start
+                print(f"{output:<13} {executor.__name__:<20} {elapsed:6.2f} sec  {rows:,} rows")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
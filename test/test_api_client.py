@@ -1,9 +1,20 @@
+import copy
+import gzip
+import json
 import logging
 import os
-from typing import Any, Type
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Type, cast
 from unittest.mock import Mock
 
-from coinmetrics.api_client import CoinMetricsClient, requests
+import pytest
+
+from coinmetrics.api_client import NUMBER_OF_RETRIES, CoinMetricsClient, _clients_by_settings, requests
+from coinmetrics._connection_pool import CoinMetricsHTTPAdapter
 from coinmetrics._catalogs import (
     CatalogAssetsData,
     CatalogAssetAlertsData,
@@ -17,7 +28,7 @@ from coinmetrics._catalogs import (
     CatalogAssetPairCandlesData,
     CatalogMarketTradesData,
 )
-from coinmetrics._data_collection import DataCollection
+from coinmetrics._data_collection import DataCollection, _ChunkRunner, _is_transient_error
 from coinmetrics._typing import (
     DataRetrievalFuncType,
     UrlParamTypes,
@@ -826,3 +837,184 @@ def test_export_to_csv() -> None:
         assert row1_value[2] == str(test_data["data"][0]["test_nested"])
     else:
         raise
+
+
+class _LocalApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stalled_requests = 0
+
+    def do_GET(self) -> None:
+        if "slow" in self.path:
+            time.sleep(1)
+        if "stall" in self.path:
+            # the headers arrive, the body does not
+            type(self).stalled_requests += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b'{"data": [')
+            time.sleep(0.5)
+            return
+        rows = [{"asset": "btc", "time": "2024-01-01T00:00:00.000000000Z", "ReferenceRateUSD": "42000.1"}] * 1000
+        self.send_response(200)
+        if "format=json_stream" in self.path:
+            body = b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+        elif "format=csv" in self.path:
+            # three pages of two rows, linked by the x-next-page-url header
+            page = int(self.path.split("next_page_token=")[1]) if "next_page_token=" in self.path else 0
+            body = b"time,asset,ReferenceRateUSD\n" + b"".join(
+                f"2024-01-0{page * 2 + day + 1}T00:00:00.000000000Z,btc,4200{page * 2 + day}\n".encode() for day in range(2)
+            )
+            if page < 2:
+                self.send_header("x-next-page-url", f"http://127.0.0.1/v4/timeseries/asset-metrics?format=csv&next_page_token={page + 1}")
+        else:
+            body = json.dumps({"data": rows[:1]}).encode()
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        return
+
+
+@pytest.fixture
+def local_api_port() -> Iterator[int]:
+    _LocalApiHandler.stalled_requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LocalApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+def test_export_to_csv_passthrough_follows_next_page_url(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http")
+    csv = client.get_asset_metrics("btc", "ReferenceRateUSD", format="json_stream").export_to_csv(passthrough=True)
+    assert csv == "time,asset,ReferenceRateUSD\n" + "".join(
+        f"2024-01-0{day + 1}T00:00:00.000000000Z,btc,4200{day}\n" for day in range(6)
+    )
+
+
+def test_export_to_json_passthrough_writes_stream_lines(local_api_port: int, tmp_path: Any) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http")
+    path = tmp_path / "metrics.json.gz"
+    client.get_asset_metrics("btc", "ReferenceRateUSD", format="json_stream").export_to_json(str(path), compress=True, passthrough=True)
+    lines = gzip.decompress(path.read_bytes()).splitlines()
+    assert len(lines) == 1000
+    assert json.loads(lines[0]) == {"asset": "btc", "time": "2024-01-01T00:00:00.000000000Z", "ReferenceRateUSD": "42000.1"}
+
+
+def test_connection_pool_statistics_count_reuse(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http")
+    for _ in range(5):
+        client.get_asset_metrics("btc", "ReferenceRateUSD", format="json").first_page()
+    assert client.connection_pool_statistics == {
+        "connections_created": 1,
+        "connections_reused": 4,
+        "connections_discarded": 0,
+    }
+
+
+def test_connection_pool_sized_to_workers(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http", pool_maxsize=2)
+    client._get_data("timeseries/asset-metrics", {})
+    replaced_adapter = client._session.adapters["http://"]
+    assert isinstance(replaced_adapter, CoinMetricsHTTPAdapter)
+    assert len(replaced_adapter.poolmanager.pools) == 1
+    client._size_connection_pool(8)
+    # the connections of the replaced adapter are closed
+    assert len(replaced_adapter.poolmanager.pools) == 0
+    client._connection_pool_statistics.reset()
+    adapter = client._session.adapters["http://"]
+    assert isinstance(adapter, CoinMetricsHTTPAdapter)
+    assert adapter.pool_maxsize == 8
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: client._get_data("timeseries/asset-metrics", {}), range(80)))
+    statistics = client.connection_pool_statistics
+    assert statistics["connections_discarded"] == 0
+    assert statistics["connections_created"] <= 8
+
+
+def test_json_stream_is_compressed_and_counted(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http")
+    rows = client.get_asset_metrics("btc", "ReferenceRateUSD", format="json_stream").to_list()
+    assert len(rows) == 1000
+    assert rows[0]["ReferenceRateUSD"] == "42000.1"
+    statistics = client.transfer_statistics
+    assert statistics.requests == 1
+    assert statistics.recent_requests[0].content_encoding == "gzip"
+    assert statistics.bytes_decoded > 10 * statistics.bytes_received
+
+    # the connection is returned to the pool after the stream was read
+    client.get_asset_metrics("btc", "ReferenceRateUSD", format="json").first_page()
+    assert client.connection_pool_statistics["connections_reused"] == 1
+
+
+def test_uncompressed_responses_when_compression_disabled(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http", compress_responses=False)
+    assert len(client.get_asset_metrics("btc", "ReferenceRateUSD", format="json").first_page()) == 1
+    statistics = client.transfer_statistics
+    assert statistics.recent_requests[0].content_encoding == "identity"
+    assert statistics.bytes_received == statistics.bytes_decoded > 0
+
+
+def test_read_timeout(local_api_port: int) -> None:
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http", read_timeout=0.1)
+    with pytest.raises(requests.Timeout):
+        client._send_request(f"http://127.0.0.1:{local_api_port}/v4/slow", is_json_stream=False)
+
+
+def test_copied_client_keeps_its_session() -> None:
+    session = requests.Session()
+    session.headers["X-Custom"] = "value"
+    client = CoinMetricsClient(api_key="key", session=session)
+    first, second = copy.copy(client), copy.copy(client)
+    assert first is not client and first is not second
+    assert first._session is second._session is session
+
+
+def test_chunk_runner_sent_to_a_worker_rebuilds_the_client_once() -> None:
+    client = CoinMetricsClient(api_key="key", host="127.0.0.1", port=8080, schema="http", read_timeout=5)
+    runner = _ChunkRunner(client._get_data, client, prefetch_pages=0, bidirectional=False)
+    clients = len(_clients_by_settings)
+    pickled = pickle.dumps(runner)
+    # the parent process does not keep clients for what it sends
+    assert len(_clients_by_settings) == clients
+    unpickled = pickle.loads(pickled)
+    assert unpickled.client is not client and unpickled.client._session is not client._session
+    assert unpickled.client._api_base_url == "http://127.0.0.1:8080/v4"
+    assert unpickled.client._api_key_url_str == "api_key=key"
+    assert unpickled.client._timeout == (30.0, 5)
+    assert cast(Any, unpickled.data_retrieval_function).__self__ is unpickled.client
+    # everything sent to a process later reuses the client rebuilt there
+    assert pickle.loads(pickled).client is unpickled.client
+
+
+def test_parallel_exports_with_process_pool(local_api_port: int, tmp_path: Any) -> None:
+    pytest.importorskip("pyarrow")
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http")
+    parallel = client.get_asset_metrics("btc,eth,sol", "ReferenceRateUSD", format="json").parallel(
+        executor=ProcessPoolExecutor, max_workers=2, progress_bar=False
+    )
+    df = parallel.to_dataframe()
+    assert len(df) == 3 and df["ReferenceRateUSD"].tolist() == [42000.1] * 3
+    assert parallel.to_arrow().num_rows == 3
+    parallel.export_to_csv_files(str(tmp_path))
+    assert sorted(path.name for path in (tmp_path / "asset-metrics").iterdir()) == ["btc.csv", "eth.csv", "sol.csv"]
+    with pytest.raises(ValueError, match="thread based executor"):
+        parallel.to_list()
+
+
+def test_body_read_timeouts_share_one_retry_budget(local_api_port: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("coinmetrics.api_client.sleep", lambda _: None)
+    monkeypatch.setattr("coinmetrics._data_collection.sleep", lambda _: None)
+    client = CoinMetricsClient(host="127.0.0.1", port=local_api_port, schema="http", read_timeout=0.1)
+    with pytest.raises(Exception) as error:
+        DataCollection(client._get_data, "stall", {}, client=client).first_page()
+    assert _is_transient_error(error.value)
+    assert _LocalApiHandler.stalled_requests == NUMBER_OF_RETRIES
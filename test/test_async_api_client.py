@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, Iterator, List, Union
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from coinmetrics._async_data_collection import AsyncDataCollection  # noqa: E402
+from coinmetrics._data_collection import DataCollection  # noqa: E402
+from coinmetrics._dataframe_builder import ColumnarFrameBuilder, PolarsFrameBuilder  # noqa: E402
+from coinmetrics._typing import DataReturnType  # noqa: E402
+from coinmetrics.async_api_client import NUMBER_OF_RETRIES, AsyncCoinMetricsClient, CoinMetricsClientQueryParamsException  # noqa: E402
+
+pages: List[Dict[str, Any]] = [
+    {
+        "data": [
+            {"asset": "btc", "time": "2024-01-01T00:00:00.000000000Z", "ReferenceRateUSD": "42000.1"},
+            {"asset": "btc", "time": "2024-01-02T00:00:00.000000000Z", "ReferenceRateUSD": "44000.2"},
+        ],
+        "next_page_token": "page_2",
+    },
+    {
+        "data": [
+            {"asset": "btc", "time": "2024-01-03T00:00:00.000000000Z", "ReferenceRateUSD": "43000.3"},
+        ],
+    },
+]
+
+
+async def get_paged_data(url: str, params: Dict[str, Any]) -> Union[DataReturnType, AsyncIterator[Dict[str, Any]]]:
+    return pages[1] if params.get("next_page_token") == "page_2" else pages[0]
+
+
+def get_sync_paged_data(url: str, params: Dict[str, Any]) -> DataReturnType:
+    return pages[1] if params.get("next_page_token") == "page_2" else pages[0]
+
+
+async def get_stream_data(url: str, params: Dict[str, Any]) -> Union[DataReturnType, AsyncIterator[Dict[str, Any]]]:
+    async def _stream() -> AsyncIterator[Dict[str, Any]]:
+        for page in pages:
+            for row in page["data"]:
+                yield row
+    return _stream()
+
+
+def _unused_sync_retrieval(url: str, params: Dict[str, Any]) -> DataReturnType:
+    raise AssertionError("async collections must not call the synchronous retrieval function")
+
+
+def test_async_for_follows_next_page_token() -> None:
+    data_collection = DataCollection(_unused_sync_retrieval, "timeseries/asset-metrics", {"assets": "btc"})
+
+    async def _collect() -> List[Dict[str, Any]]:
+        return [row async for row in AsyncDataCollection(data_collection, get_paged_data)]
+
+    rows = asyncio.run(_collect())
+    assert [row["ReferenceRateUSD"] for row in rows] == ["42000.1", "44000.2", "43000.3"]
+
+
+def test_async_json_stream_to_list_and_dataframe() -> None:
+    params: Dict[str, Any] = {"assets": "btc", "format": "json_stream"}
+    data_collection = DataCollection(_unused_sync_retrieval, "timeseries/asset-metrics", params)
+
+    rows = asyncio.run(AsyncDataCollection(data_collection, get_stream_data).to_list())
+    assert len(rows) == 3
+
+    df = asyncio.run(AsyncDataCollection(data_collection, get_stream_data).to_dataframe())
+    assert isinstance(df, pd.DataFrame)
+    assert df.shape == (3, 3)
+    assert isinstance(df["time"].dtype, pd.DatetimeTZDtype)
+
+
+@pytest.mark.parametrize("dataframe_type", ["pandas", "polars"])
+def test_async_to_dataframe_appends_pages_as_they_arrive(dataframe_type: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    events: List[str] = []
+
+    async def get_logged_data(url: str, params: Dict[str, Any]) -> Union[DataReturnType, AsyncIterator[Dict[str, Any]]]:
+        events.append(f"request {params.get('next_page_token', 'page_1')}")
+        return await get_paged_data(url, params)
+
+    builder_class = PolarsFrameBuilder if dataframe_type == "polars" else ColumnarFrameBuilder
+    append_page = builder_class.append_page
+
+    def _logged_append_page(self: Any, data: List[Dict[str, Any]]) -> None:
+        events.append(f"append {len(data)} rows")
+        append_page(self, data)
+
+    monkeypatch.setattr(builder_class, "append_page", _logged_append_page)
+    params: Dict[str, Any] = {"assets": "btc", "metrics": "ReferenceRateUSD"}
+    data_collection = DataCollection(_unused_sync_retrieval, "timeseries/asset-metrics", params)
+    df = asyncio.run(AsyncDataCollection(data_collection, get_logged_data).to_dataframe(dataframe_type=dataframe_type))
+
+    assert events == ["request page_1", "append 2 rows", "request page_2", "append 1 rows"]
+    expected = DataCollection(get_sync_paged_data, "timeseries/asset-metrics", params)
+    if dataframe_type == "polars":
+        assert df.equals(expected.to_dataframe(dataframe_type="polars"))
+    else:
+        pd.testing.assert_frame_equal(df, expected.to_dataframe())
+
+
+def test_async_client_returns_async_data_collections() -> None:
+    async def _run() -> List[Dict[str, Any]]:
+        async with AsyncCoinMetricsClient() as client:
+            client._get_data_async = get_paged_data  # type: ignore
+            data_collection = client.get_asset_metrics(assets="btc", metrics="ReferenceRateUSD", format="json")
+            assert isinstance(data_collection, AsyncDataCollection)
+            return await data_collection.to_list()
+
+    assert len(asyncio.run(_run())) == 3
+
+
+def test_async_json_stream_skips_keep_alive_lines() -> None:
+    class _Content:
+        async def iter_chunked(self, chunk_size: int) -> AsyncIterator[bytes]:
+            # lines split across chunks are joined again
+            for chunk in [b'{"asset": "b', b'tc"}\n\n{"asset": "eth"}', b"\n"]:
+                yield chunk
+
+    class _Response:
+        url = "http://localhost/v4/timeseries/asset-metrics"
+        headers: Dict[str, str] = {}
+        content = _Content()
+        released = False
+
+        def release(self) -> None:
+            self.released = True
+
+    async def _collect(resp: Any) -> List[Dict[str, Any]]:
+        return [row async for row in AsyncCoinMetricsClient()._iter_json_stream_async(resp)]
+
+    resp = _Response()
+    assert asyncio.run(_collect(resp)) == [{"asset": "btc"}, {"asset": "eth"}]
+    assert resp.released
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with the status code in the path, e.g. /v4/429, and counts the requests.
+    """
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def do_GET(self) -> None:
+        type(self).requests += 1
+        self.send_response(int(self.path.split("?")[0].rsplit("/", 1)[1]))
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", "0")
+        self.send_header("x-ratelimit-reset", "0")
+        self.end_headers()
+
+    def log_message(self, *args: Any) -> None:
+        return
+
+
+@pytest.fixture
+def status_server_port() -> Iterator[int]:
+    _StatusHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+def _get_status(port: int, status: int) -> None:
+    async def _run() -> None:
+        async with AsyncCoinMetricsClient(host="127.0.0.1", port=port, schema="http") as client:
+            await client._get_data_async(str(status), {})
+
+    asyncio.run(_run())
+
+
+def test_async_429_is_retried_a_bounded_number_of_times(status_server_port: int) -> None:
+    import aiohttp
+
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        _get_status(status_server_port, 429)
+    assert error.value.status == 429
+    assert _StatusHandler.requests == NUMBER_OF_RETRIES
+
+
+def test_async_414_raises_query_params_exception(status_server_port: int) -> None:
+    with pytest.raises(CoinMetricsClientQueryParamsException):
+        _get_status(status_server_port, 414)
+    assert _StatusHandler.requests == 1
@@ -0,0 +1,85 @@
+import gzip
+import json
+import zlib
+from typing import Callable, Iterator, List
+
+import pytest
+
+from coinmetrics._compression import (
+    RequestTransferStatistics,
+    accept_encoding_header,
+    iter_decompressed,
+    iter_ndjson_batches,
+    iter_ndjson_lines,
+    parse_ndjson_lines,
+    validate_ndjson_lines,
+)
+
+ROWS = [{"market": "coinbase-btc-usd-spot", "coin_metrics_id": str(i), "price": "42000.1"} for i in range(2000)]
+NDJSON = b"".join(json.dumps(row).encode() + b"\n\n" for row in ROWS)
+
+
+def _chunks(data: bytes, chunk_size: int = 977) -> Iterator[bytes]:
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)  # type: ignore
+
+
+def _brotli_compress(data: bytes) -> bytes:
+    brotli = pytest.importorskip("brotli")
+    return brotli.compress(data)  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "content_encoding, compress",
+    [
+        (None, lambda data: data),
+        ("gzip", gzip.compress),
+        ("deflate", zlib.compress),
+        ("zstd", _zstd_compress),
+        ("br", _brotli_compress),
+    ],
+)
+def test_ndjson_lines_split_from_decompressed_chunks(content_encoding: str, compress: Callable[[bytes], bytes]) -> None:
+    compressed = compress(NDJSON)
+    request_statistics = RequestTransferStatistics("timeseries/market-trades", content_encoding)
+    lines: List[bytes] = list(iter_ndjson_lines(iter_decompressed(_chunks(compressed), content_encoding, request_statistics)))
+    assert [json.loads(line) for line in lines] == ROWS
+    assert request_statistics.bytes_received == len(compressed)
+    assert request_statistics.bytes_decoded == len(NDJSON)
+
+
+def test_zstd_stream_of_several_frames() -> None:
+    frames = [_zstd_compress(NDJSON[:len(NDJSON) // 2]), _zstd_compress(NDJSON[len(NDJSON) // 2:])]
+    request_statistics = RequestTransferStatistics("timeseries/market-trades", "zstd")
+    # chunks that end within the frames, and chunks that end at the boundary of the frames
+    for chunks in (_chunks(b"".join(frames)), iter(frames)):
+        assert b"".join(iter_decompressed(chunks, "zstd", request_statistics)) == NDJSON
+
+
+def test_accept_encoding_header() -> None:
+    assert accept_encoding_header(compress_responses=False) == "identity"
+    assert accept_encoding_header().endswith("gzip, deflate")
+
+
+def test_ndjson_batches_hold_complete_lines_of_each_chunk() -> None:
+    batches = list(iter_ndjson_batches(_chunks(NDJSON)))
+    assert len(batches) > 1
+    assert [row for batch in batches for row in batch] == ROWS
+
+
+def test_parse_ndjson_lines_falls_back_for_lines_orjson_rejects() -> None:
+    assert parse_ndjson_lines([b'{"height": 1}', b"  ", b'{"value": 123456789012345678901234567890}']) == [
+        {"height": 1},
+        {"value": 123456789012345678901234567890},
+    ]
+
+
+def test_validate_ndjson_lines_rejects_truncated_lines() -> None:
+    validate_ndjson_lines([b'{"height": 1}', b'{"height": 2}\r'])
+    with pytest.raises(ValueError):
+        validate_ndjson_lines([b'{"height": 1}', b'{"heig'])
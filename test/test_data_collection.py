@@ -0,0 +1,961 @@
+import gzip
+import io
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, cast
+
+import pytest
+from dateutil.parser import isoparse
+import requests
+
+from coinmetrics._chunking import SAMPLE_ROWS
+from coinmetrics._compression import NdjsonStream
+from coinmetrics._data_collection import NUMBER_OF_RETRIES, DataCollection, _group_and_merge
+from coinmetrics._typing import DataReturnType
+
+NUMBER_OF_PAGES = 5
+ROWS_PER_PAGE = 3
+
+
+def make_pages(number_of_pages: int = NUMBER_OF_PAGES, rows_per_page: int = ROWS_PER_PAGE) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns API responses keyed by the next_page_token that requests them, "" being the first page
+    """
+    pages: Dict[str, Dict[str, Any]] = {}
+    for page in range(number_of_pages):
+        response: Dict[str, Any] = {
+            "data": [
+                {
+                    "market": "coinbase-btc-usd-spot",
+                    "time": f"2024-01-01T00:{page:02d}:{row:02d}.000000000Z",
+                    "coin_metrics_id": str(page * rows_per_page + row),
+                    "amount": f"{row}.5",
+                    "price": "42000.1",
+                }
+                for row in range(rows_per_page)
+            ]
+        }
+        if page < number_of_pages - 1:
+            response["next_page_token"] = f"token_{page + 1}"
+        pages["" if page == 0 else f"token_{page}"] = response
+    return pages
+
+
+class PagedRetrieval:
+    def __init__(self, pages: Dict[str, Dict[str, Any]], latency: float = 0.0) -> None:
+        self.pages = pages
+        self.latency = latency
+        self.requested_tokens: List[str] = []
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        token = params.get("next_page_token") or ""
+        self.requested_tokens.append(token)
+        time.sleep(self.latency)
+        return self.pages[token]
+
+
+def test_prefetch_returns_same_rows_in_order() -> None:
+    pages = make_pages()
+    expected = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).to_list()
+    prefetched = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).prefetch(2).to_list()
+    assert prefetched == expected
+    assert len(prefetched) == NUMBER_OF_PAGES * ROWS_PER_PAGE
+
+
+def test_prefetch_requests_pages_ahead_of_consumer() -> None:
+    retrieval = PagedRetrieval(make_pages())
+    data_collection = DataCollection(retrieval, "timeseries/market-trades", {}, prefetch_pages=2)
+    next(data_collection)
+    deadline = time.time() + 5
+    while len(retrieval.requested_tokens) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    # first page being consumed plus two pages waiting in the queue
+    assert retrieval.requested_tokens[:3] == ["", "token_1", "token_2"]
+
+
+def test_prefetch_propagates_errors() -> None:
+    pages = make_pages()
+    del pages["token_2"]
+    data_collection = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).prefetch(1)
+    with pytest.raises(KeyError):
+        data_collection.to_list()
+
+
+def test_prefetch_worker_stops_when_collection_is_dropped() -> None:
+    data_collection = DataCollection(PagedRetrieval(make_pages(50)), "timeseries/market-trades", {}).prefetch(1)
+    next(data_collection)
+    del data_collection
+    deadline = time.time() + 5
+    while any(t.name.startswith("cm-prefetch") for t in threading.enumerate()) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not any(t.name.startswith("cm-prefetch") for t in threading.enumerate())
+
+
+class FlakyPagedRetrieval(PagedRetrieval):
+    def __init__(self, pages: Dict[str, Dict[str, Any]], failing_tokens: List[str]) -> None:
+        super().__init__(pages)
+        self.failing_tokens = failing_tokens
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        token = params.get("next_page_token") or ""
+        if token in self.failing_tokens:
+            self.failing_tokens.remove(token)
+            self.requested_tokens.append(token)
+            raise requests.exceptions.ConnectionError("connection reset by peer")
+        return super().__call__(endpoint, params)
+
+
+class _Client:
+    def __init__(self, retrieval: PagedRetrieval) -> None:
+        self._get_data = retrieval
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+def test_transient_errors_retry_same_page(monkeypatch: pytest.MonkeyPatch, prefetch_pages: int) -> None:
+    monkeypatch.setattr("coinmetrics._data_collection.sleep", lambda _: None)
+    pages = make_pages()
+    retrieval = FlakyPagedRetrieval(pages, failing_tokens=["token_2"])
+    rows = DataCollection(retrieval, "timeseries/market-trades", {}, prefetch_pages=prefetch_pages).to_list()
+    assert len(rows) == NUMBER_OF_PAGES * ROWS_PER_PAGE
+    assert retrieval.requested_tokens.count("token_2") == 2
+
+
+@pytest.mark.parametrize("rows_consumed", [0, 1, ROWS_PER_PAGE, 7, NUMBER_OF_PAGES * ROWS_PER_PAGE])
+def test_resume_from_checkpoint(rows_consumed: int) -> None:
+    pages = make_pages()
+    expected = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).to_list()
+
+    data_collection = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {"markets": ["coinbase-btc-usd-spot"]})
+    consumed = [next(data_collection) for _ in range(rows_consumed)]
+    checkpoint = json.loads(json.dumps(data_collection.checkpoint()))
+    assert checkpoint["rows_emitted"] == rows_consumed
+    assert checkpoint["url_params"] == {"markets": "coinbase-btc-usd-spot"}
+
+    resumed = DataCollection.from_checkpoint(checkpoint, _Client(PagedRetrieval(pages)))  # type: ignore
+    assert consumed + resumed.to_list() == expected
+    assert resumed.checkpoint()["rows_emitted"] == len(expected)
+    assert resumed.checkpoint()["finished"]
+
+
+def test_resumed_csv_export_appends_without_header(tmp_path: Any) -> None:
+    pages = make_pages()
+    expected = (tmp_path / "expected.csv")
+    DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).export_to_csv(str(expected))
+
+    retrieval = FlakyPagedRetrieval(pages, failing_tokens=["token_3"] * NUMBER_OF_RETRIES)
+    data_collection = DataCollection(retrieval, "timeseries/market-trades", {})
+    path = tmp_path / "trades.csv"
+    with pytest.raises(requests.exceptions.ConnectionError):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr("coinmetrics._data_collection.sleep", lambda _: None)
+            data_collection.export_to_csv(str(path))
+
+    DataCollection.from_checkpoint(data_collection.checkpoint(), _Client(retrieval)).export_to_csv(str(path))  # type: ignore
+    assert path.read_text() == expected.read_text()
+
+
+def test_interrupted_json_stream_resumes_after_emitted_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("coinmetrics._data_collection.sleep", lambda _: None)
+    rows = [{"coin_metrics_id": str(i)} for i in range(10)]
+    requests_made: List[int] = []
+
+    def stream_retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        requests_made.append(1)
+        interrupted = len(requests_made) == 1
+
+        def _stream() -> Iterator[Dict[str, Any]]:
+            for i, row in enumerate(rows):
+                if interrupted and i == 4:
+                    raise requests.exceptions.ChunkedEncodingError("connection broken")
+                yield row
+        return _stream()  # type: ignore
+
+    data_collection = DataCollection(stream_retrieval, "timeseries/market-trades", {"format": "json_stream"})
+    assert data_collection.to_list() == rows
+    assert len(requests_made) == 2
+    assert data_collection.checkpoint()["finished"]
+
+
+@pytest.mark.parametrize("prefetch_pages", [0, 2])
+def test_iter_pages_returns_api_pages(prefetch_pages: int) -> None:
+    pages = make_pages()
+    data_collection = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}, prefetch_pages=prefetch_pages)
+    first_row = next(data_collection)
+    rest = list(data_collection.iter_pages())
+    assert [len(page) for page in rest] == [ROWS_PER_PAGE - 1] + [ROWS_PER_PAGE] * (NUMBER_OF_PAGES - 1)
+    assert [first_row] + [row for page in rest for row in page] == [row for page in pages.values() for row in page["data"]]
+    assert data_collection.checkpoint()["finished"]
+
+
+def test_iter_pages_of_json_stream_reads_batches() -> None:
+    rows = [{"coin_metrics_id": str(i)} for i in range(10)]
+
+    def stream_retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        return NdjsonStream(iter([rows[:4], rows[4:]]))  # type: ignore
+
+    data_collection = DataCollection(stream_retrieval, "timeseries/market-trades", {"format": "json_stream"})
+    assert next(data_collection) == rows[0]
+    assert list(data_collection.iter_pages()) == [rows[1:4], rows[4:]]
+    assert data_collection.checkpoint()["rows_emitted"] == 10
+
+
+@pytest.mark.parametrize("batch_rows", [1, 2, ROWS_PER_PAGE, 4, 100])
+def test_iter_batches(batch_rows: int) -> None:
+    pages = make_pages()
+    expected = [row for page in pages.values() for row in page["data"]]
+    batches = list(DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).iter_batches(rows=batch_rows))
+    assert [row for batch in batches for row in batch] == expected
+    assert all(len(batch) == batch_rows for batch in batches[:-1])
+    assert 0 < len(batches[-1]) <= batch_rows
+
+
+def test_to_dataframe_builds_typed_columns_across_pages() -> None:
+    pages = make_pages()
+    df = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).to_dataframe()
+    assert len(df) == NUMBER_OF_PAGES * ROWS_PER_PAGE
+    assert str(df["time"].dtype) == "datetime64[ns, UTC]"
+    assert str(df["market"].dtype) == "string"
+    assert str(df["coin_metrics_id"].dtype) == "Int64"
+    assert str(df["amount"].dtype) == "Float64"
+    assert df["coin_metrics_id"].tolist() == list(range(NUMBER_OF_PAGES * ROWS_PER_PAGE))
+
+
+def test_to_dataframe_applies_dtype_mapper() -> None:
+    df = DataCollection(PagedRetrieval(make_pages()), "timeseries/market-trades", {}).to_dataframe(
+        dtype_mapper={"coin_metrics_id": "string", "price": "float64"}
+    )
+    assert str(df["coin_metrics_id"].dtype) == "string"
+    assert str(df["price"].dtype) == "float64"
+    assert str(df["time"].dtype) == "datetime64[ns, UTC]"
+
+
+def test_to_dataframe_keeps_missing_metric_values_null() -> None:
+    rows: List[Dict[str, Any]] = [
+        {"asset": "btc", "time": "2024-01-01T00:00:00.000000000Z", "PriceUSD": "42000.1", "flag": "true"},
+        {"asset": "eth", "time": "2024-01-02T00:00:00.000000000Z", "PriceUSD": None, "flag": None},
+    ]
+    data_collection = DataCollection(
+        lambda endpoint, params: {"data": rows}, "timeseries/asset-metrics", {"metrics": "PriceUSD,flag"}
+    )
+    df = data_collection.to_dataframe()
+    assert df.columns.tolist() == ["time", "asset", "PriceUSD", "flag"]
+    assert str(df["PriceUSD"].dtype) == "Float64" and df["PriceUSD"].isna().tolist() == [False, True]
+    assert str(df["flag"].dtype) == "boolean"
+
+
+def test_to_dataframe_polars() -> None:
+    pl = pytest.importorskip("polars")
+    df = DataCollection(PagedRetrieval(make_pages()), "timeseries/market-trades", {}).to_dataframe(dataframe_type="polars")
+    assert df.schema == {
+        "market": pl.String,
+        "time": pl.Datetime("us", "UTC"),
+        "coin_metrics_id": pl.Int64,
+        "amount": pl.Float64,
+        "price": pl.Float64,
+    }
+    assert df.height == NUMBER_OF_PAGES * ROWS_PER_PAGE
+
+
+class CsvClient:
+    """
+    Serves format=csv pages of two rows; the body of the page in `interrupted_page` breaks after its first row once.
+    """
+
+    def __init__(self, interrupted_page: int = -1) -> None:
+        self.interrupted_page = interrupted_page
+        self.requests: List[Dict[str, Any]] = []
+
+    def _get_raw_data(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        self.requests.append(params)
+        page = int(params.get("next_page_token", 0))
+        rows = [f"{page * 2 + row},42000.{row}\n".encode() for row in range(2)]
+        next_page_token = str(page + 1) if page < 2 else None
+
+        def chunks() -> Iterator[bytes]:
+            yield b"coin_metrics_id,price\n" + rows[0][:3]
+            if page == self.interrupted_page:
+                self.interrupted_page = -1
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            yield rows[0][3:] + rows[1]
+
+        return chunks(), next_page_token
+
+
+def _csv_data_collection(client: CsvClient) -> DataCollection:
+    return DataCollection(
+        lambda endpoint, params: {"data": []}, "timeseries/market-trades", {"markets": "coinbase-btc-usd-spot"}, client=client  # type: ignore
+    )
+
+
+def test_csv_passthrough_writes_one_header_and_all_pages() -> None:
+    client = CsvClient()
+    data_collection = _csv_data_collection(client)
+    csv = data_collection.export_to_csv(passthrough=True)
+    assert csv == "coin_metrics_id,price\n" + "".join(f"{i},42000.{i % 2}\n" for i in range(6))
+    assert [params.get("next_page_token") for params in client.requests] == [None, "1", "2"]
+    assert all(params["format"] == "csv" for params in client.requests)
+    assert data_collection.checkpoint()["finished"]
+    assert data_collection.checkpoint()["rows_emitted"] == 6
+
+
+def test_interrupted_csv_passthrough_page_skips_written_rows() -> None:
+    client = CsvClient(interrupted_page=1)
+    csv = _csv_data_collection(client).export_to_csv(passthrough=True)
+    assert csv == "coin_metrics_id,price\n" + "".join(f"{i},42000.{i % 2}\n" for i in range(6))
+    assert [params.get("next_page_token") for params in client.requests] == [None, "1", "1", "2"]
+
+
+def test_csv_passthrough_falls_back_without_csv_format() -> None:
+    client = CsvClient()
+    data_collection = DataCollection(
+        lambda endpoint, params: {"data": [{"asset": "btc"}]}, "catalog-v2/asset-metrics", {}, client=client  # type: ignore
+    )
+    assert data_collection.export_to_csv(passthrough=True) == 'asset\n"btc"\n'
+    assert client.requests == []
+
+
+class JsonStreamClient:
+    """
+    Serves a json_stream of six rows with keep-alive lines; the first response breaks after three rows.
+    """
+
+    def __init__(self, interrupted: bool = False) -> None:
+        self.interrupted = interrupted
+        self.requests = 0
+
+    def _get_raw_data(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        self.requests += 1
+
+        def chunks() -> Iterator[bytes]:
+            yield b'{"coin_metrics_id": "0"}\n\n{"coin_metrics_id": "1"}\n{"coin_'
+            yield b'metrics_id": "2"}\n'
+            if self.interrupted:
+                self.interrupted = False
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            yield b"".join(f'{{"coin_metrics_id": "{i}"}}\n'.encode() for i in range(3, 6))
+
+        return chunks(), None
+
+
+@pytest.mark.parametrize("interrupted", [False, True])
+def test_json_passthrough_writes_lines_once(interrupted: bool) -> None:
+    client = JsonStreamClient(interrupted)
+    data_collection = DataCollection(
+        lambda endpoint, params: {"data": []}, "timeseries/market-trades", {"format": "json_stream"}, client=client  # type: ignore
+    )
+    exported = data_collection.export_to_json(passthrough=True)
+    assert [json.loads(line) for line in exported.splitlines()] == [{"coin_metrics_id": str(i)} for i in range(6)]  # type: ignore
+    assert client.requests == (2 if interrupted else 1)
+    assert data_collection.checkpoint()["rows_emitted"] == 6
+
+
+def test_to_dataframe_polars_applies_dtype_mapper_and_schema() -> None:
+    pl = pytest.importorskip("polars")
+    rows = [
+        {"account": "a", "change": "1.5", "credit": None, "consensus_time": "2024-01-01T00:00:00.000000000Z"},
+        {"account": "b", "change": "-2", "credit": None, "consensus_time": "2024-01-01T00:00:01.000000000Z"},
+    ]
+    df = DataCollection(
+        lambda endpoint, params: {"data": rows}, "blockchain-v2/btc/balance-updates", {}, dtype_mapper={"change": "string"}
+    ).to_dataframe(dataframe_type="polars")
+    assert df.schema == {
+        "account": pl.String,
+        "change": pl.String,
+        "credit": pl.Boolean,
+        "consensus_time": pl.Datetime("us", "UTC"),
+    }
+    assert df["credit"].to_list() == [None, None]
+
+
+def test_iter_record_batches_yields_one_batch_per_page() -> None:
+    pa = pytest.importorskip("pyarrow")
+    pages = make_pages()
+    batches = list(DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).iter_record_batches())
+    assert [batch.num_rows for batch in batches] == [ROWS_PER_PAGE] * NUMBER_OF_PAGES
+    assert batches[0].schema == pa.schema(
+        [
+            ("market", pa.string()),
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("coin_metrics_id", pa.string()),
+            ("amount", pa.string()),
+            ("price", pa.string()),
+        ]
+    )
+    assert all(batch.schema == batches[0].schema for batch in batches)
+
+
+def test_to_arrow_types_fields_from_schema() -> None:
+    pa = pytest.importorskip("pyarrow")
+    rows: List[Dict[str, Any]] = [
+        {"account": "a", "change": "1.5", "credit": None, "sub_account": {"sub_account": "x"}},
+        {"account": "b", "change": "-2", "credit": True, "sub_account": None},
+    ]
+    table = DataCollection(lambda endpoint, params: {"data": rows}, "blockchain-v2/btc/balance-updates", {}).to_arrow()
+    assert table.schema.field("credit").type == pa.bool_()
+    assert table.column("credit").to_pylist() == [None, True]
+    assert table.column("sub_account").to_pylist() == ['{"sub_account":"x"}', None]
+    assert DataCollection(lambda endpoint, params: {"data": []}, "timeseries/market-trades", {}).to_arrow().num_rows == 0
+
+
+def test_export_to_parquet_writes_bounded_row_groups(tmp_path: Any) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    pages = make_pages()
+    path = tmp_path / "trades" / "trades.parquet"
+    DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).export_to_parquet(str(path), row_group_size=4)
+    parquet_file = pq.ParquetFile(path)
+    expected = DataCollection(PagedRetrieval(pages), "timeseries/market-trades", {}).to_arrow()
+    assert parquet_file.schema_arrow == expected.schema
+    assert parquet_file.metadata.num_rows == NUMBER_OF_PAGES * ROWS_PER_PAGE
+    assert all(
+        parquet_file.metadata.row_group(i).num_rows <= 4 for i in range(parquet_file.metadata.num_row_groups)
+    )
+    assert parquet_file.read().equals(expected)
+
+
+def test_export_to_parquet_dataset_partitions_by_parallelized_values(tmp_path: Any) -> None:
+    pytest.importorskip("pyarrow")
+    pl = pytest.importorskip("polars")
+
+    def retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        return {"data": [{"market": params["markets"], "time": "2024-01-01T00:00:00.000000000Z", "price": "1.5"}]}
+
+    data_collection = DataCollection(retrieval, "timeseries/market-trades", {"markets": "a,b"})
+    data_collection.parallel("markets", progress_bar=False).export_to_parquet_dataset(str(tmp_path))
+    assert sorted(path.relative_to(tmp_path).as_posix() for path in tmp_path.rglob("*.parquet")) == [
+        "market-trades/markets=a/part-0.parquet",
+        "market-trades/markets=b/part-0.parquet",
+    ]
+    df = pl.scan_parquet(str(tmp_path / "market-trades" / "**" / "*.parquet"), hive_partitioning=True).collect()
+    assert sorted(df["market"].to_list()) == ["a", "b"]
+    assert df.filter(pl.col("markets") == "b")["market"].to_list() == ["b"]
+
+
+class AssetMetricsRetrieval:
+    """
+    Serves daily rows of the requested assets and metrics from 2024-01-01 to 2024-01-05, honouring start_time,
+    page_size and limit_per_asset like the API with paging_from="start".
+    """
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, Any]] = []
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        self.requests.append(dict(params))
+        rows = [
+            {"asset": asset, "time": f"2024-01-0{day}T00:00:00.000000000Z", **{metric: f"{day}.5" for metric in params["metrics"].split(",")}}
+            for asset in params["assets"].split(",")
+            for day in range(1, 6)[:params.get("limit_per_asset") or 5]
+            if params.get("start_time") is None or datetime(2024, 1, day, tzinfo=timezone.utc) >= params["start_time"]
+        ]
+        start = int(params.get("next_page_token") or 0)
+        page_size = params.get("page_size") or 4
+        response: Dict[str, Any] = {"data": rows[start:start + page_size]}
+        if start + page_size < len(rows):
+            response["next_page_token"] = str(start + page_size)
+        return response
+
+
+def _asset_metrics_data_collection(retrieval: AssetMetricsRetrieval) -> DataCollection:
+    return DataCollection(
+        retrieval,
+        "timeseries/asset-metrics",
+        {
+            "assets": "btc,eth,sol",
+            "metrics": "PriceUSD,CapMrktCurUSD",
+            "start_time": None,
+            "end_time": None,
+            "start_inclusive": None,
+            "page_size": None,
+            "paging_from": "start",
+            "limit_per_asset": None,
+        },
+    )
+
+
+def test_to_lazyframe_pushes_filter_and_projection_into_request() -> None:
+    pl = pytest.importorskip("polars")
+    retrieval = AssetMetricsRetrieval()
+    lf = _asset_metrics_data_collection(retrieval).to_lazyframe(schema_overrides={"PriceUSD": pl.Float64})
+    query = lf.filter(
+        (pl.col("asset") == "eth") & (pl.col("time") > datetime(2024, 1, 3, tzinfo=timezone.utc))
+    ).select("time", "PriceUSD")
+    assert retrieval.requests == []
+    df = query.collect()
+    assert df.to_dicts() == [
+        {"time": datetime(2024, 1, 4, tzinfo=timezone.utc), "PriceUSD": 4.5},
+        {"time": datetime(2024, 1, 5, tzinfo=timezone.utc), "PriceUSD": 5.5},
+    ]
+    # the first request reads the schema
+    assert retrieval.requests[0]["page_size"] == 1
+    assert retrieval.requests[1] == {
+        "assets": "eth",
+        "metrics": "PriceUSD",
+        "start_time": datetime(2024, 1, 3, tzinfo=timezone.utc),
+        "end_time": None,
+        "start_inclusive": False,
+        "page_size": None,
+        "paging_from": "start",
+        "limit_per_asset": None,
+    }
+
+
+def test_to_lazyframe_head_limits_request() -> None:
+    retrieval = AssetMetricsRetrieval()
+    df = _asset_metrics_data_collection(retrieval).to_lazyframe().head(2).collect()
+    assert df["asset"].to_list() == ["btc", "btc"]
+    assert df["PriceUSD"].to_list() == ["1.5", "2.5"]
+    assert [(params["page_size"], params["limit_per_asset"]) for params in retrieval.requests[1:]] == [(2, 2)]
+
+
+def test_to_lazyframe_requests_only_needed_pages_without_pushdown() -> None:
+    retrieval = AssetMetricsRetrieval()
+    data_collection = _asset_metrics_data_collection(retrieval)
+    data_collection._url_params["paging_from"] = "end"
+    df = data_collection.to_lazyframe().head(6).collect()
+    assert len(df) == 6
+    # two pages of 4 rows, without the remaining two
+    assert [params.get("next_page_token") for params in retrieval.requests[1:]] == [None, "4"]
+
+
+def test_to_lazyframe_skips_request_when_filter_excludes_requested_values() -> None:
+    pl = pytest.importorskip("polars")
+    retrieval = AssetMetricsRetrieval()
+    df = _asset_metrics_data_collection(retrieval).to_lazyframe().filter(pl.col("asset").is_in(["doge"])).collect()
+    assert df.is_empty()
+    assert df.columns == ["time", "asset", "PriceUSD", "CapMrktCurUSD"]
+    assert len(retrieval.requests) == 1
+
+
+def test_parallel_to_dataframe_polars_types_columns_across_chunks() -> None:
+    pl = pytest.importorskip("polars")
+
+    def retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        time.sleep(0.05 if params["markets"] == "a" else 0)
+        return {
+            "data": [
+                {"market": params["markets"], "time": f"2024-01-01T00:00:0{i}.000000000Z", "size": None if params["markets"] == "a" else str(i)}
+                for i in range(3)
+            ]
+        }
+
+    data_collection = DataCollection(retrieval, "timeseries/market-trades", {"markets": "a,b,c"})
+    df = data_collection.parallel("markets", progress_bar=False).to_dataframe(dataframe_type="polars")
+    assert df["market"].to_list() == ["a"] * 3 + ["b"] * 3 + ["c"] * 3
+    assert df.schema["size"] == pl.Int64
+    assert df.schema["time"] == pl.Datetime("us", "UTC")
+    assert df["size"].to_list() == [None] * 3 + [0, 1, 2] * 2
+
+
+def test_parallel_to_dataframe_polars_joins_metrics() -> None:
+    pl = pytest.importorskip("polars")
+
+    def retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        return {
+            "data": [
+                {"asset": "btc", "time": f"2024-01-0{day}T00:00:00.000000000Z", params["metrics"]: f"{day}.5"}
+                for day in range(1, 4)
+            ]
+        }
+
+    data_collection = DataCollection(retrieval, "timeseries/asset-metrics", {"assets": "btc", "metrics": "PriceUSD,CapMrktCurUSD"})
+    df = data_collection.parallel("metrics", progress_bar=False).to_dataframe(dataframe_type="polars")
+    assert df.columns == ["time", "asset", "PriceUSD", "CapMrktCurUSD"]
+    assert df["PriceUSD"].to_list() == df["CapMrktCurUSD"].to_list() == [1.5, 2.5, 3.5]
+    assert df.schema["PriceUSD"] == pl.Float64
+
+
+@pytest.mark.parametrize("dataframe_type", ["pandas", "polars"])
+def test_parallel_export_to_csv_writes_merged_metrics_in_slices(dataframe_type: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("coinmetrics._data_collection.MERGED_CSV_SLICE_ROWS", 2)
+
+    def retrieval(endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        return {
+            "data": [
+                {"asset": "btc", "time": f"2024-01-0{day}T00:00:00.000000000Z", params["metrics"]: f"{day}.5"}
+                for day in range(1, 6)
+            ]
+        }
+
+    parallel = DataCollection(
+        retrieval, "timeseries/asset-metrics", {"assets": "btc", "metrics": "PriceUSD,CapMrktCurUSD"}
+    ).parallel("metrics", progress_bar=False)
+    df = parallel.to_dataframe(dataframe_type=dataframe_type)
+    expected = df.write_csv() if dataframe_type == "polars" else df.to_csv(index=False)
+    csv = parallel.export_to_csv(dataframe_type=dataframe_type)
+    assert csv == expected
+    assert cast(str, csv).count("PriceUSD") == 1
+
+
+@pytest.mark.parametrize("missing_rows", [False, True])
+def test_group_and_merge_matches_pairwise_outer_merge(missing_rows: bool) -> None:
+    import pandas as pd
+
+    dfs = [
+        pd.DataFrame({
+            "time": pd.date_range("2024-01-01", periods=4, freq="D", tz="UTC")[1:] if missing_rows and metric == "m2" and asset == "eth"
+            else pd.date_range("2024-01-01", periods=4, freq="D", tz="UTC"),
+            "asset": asset,
+            metric: [1.5, 2.5, 3.5] if missing_rows and metric == "m2" and asset == "eth" else [0.5, 1.5, 2.5, 3.5],
+        })
+        for metric in ("m1", "m2", "m3")
+        for asset in ("eth", "btc")
+    ]
+    expected = pd.concat([df for df in dfs if "m1" in df.columns])
+    for metric in ("m2", "m3"):
+        expected = pd.merge(expected, pd.concat([df for df in dfs if metric in df.columns]), on=["time", "asset"], how="outer")
+    pd.testing.assert_frame_equal(_group_and_merge(dfs, ["time", "asset"]), expected.reset_index(drop=True))
+
+
+class MarketPagesRetrieval:
+    """
+    Serves `number_of_pages` pages of one row for every market, waiting `latencies[market]` seconds per page.
+    """
+
+    def __init__(self, number_of_pages: int, latencies: Dict[str, float]) -> None:
+        self.number_of_pages = number_of_pages
+        self.latencies = latencies
+        self.requests: List[str] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        market = params["markets"]
+        with self.lock:
+            self.requests.append(market)
+        time.sleep(self.latencies.get(market, 0))
+        if market == "broken":
+            raise ValueError("broken market")
+        page = int(params.get("next_page_token") or 0)
+        response: Dict[str, Any] = {"data": [{"market": market, "page": page}]}
+        if page < self.number_of_pages - 1:
+            response["next_page_token"] = str(page + 1)
+        return response
+
+
+def _parallel_markets(retrieval: MarketPagesRetrieval, markets: str, max_workers: int = 2) -> Any:
+    return DataCollection(retrieval, "timeseries/market-trades", {"markets": markets}).parallel(
+        "markets", max_workers=max_workers, progress_bar=False
+    )
+
+
+def test_parallel_iteration_yields_rows_in_order() -> None:
+    retrieval = MarketPagesRetrieval(3, {"a": 0.02})
+    rows = list(_parallel_markets(retrieval, "a,b,c"))
+    assert [(row["market"], row["page"]) for row in rows] == [(market, page) for market in "abc" for page in range(3)]
+    assert _parallel_markets(retrieval, "a,b,c").to_list() == rows
+
+
+def test_parallel_unordered_iteration_yields_fastest_first() -> None:
+    retrieval = MarketPagesRetrieval(3, {"a": 0.1})
+    pages = list(_parallel_markets(retrieval, "a,b").iter_pages(ordered=False))
+    assert pages[0] == [{"market": "b", "page": 0}]
+    assert sorted((page[0]["market"], page[0]["page"]) for page in pages) == [(market, page) for market in "ab" for page in range(3)]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_iteration_bounds_pages_ahead_of_consumer(ordered: bool) -> None:
+    retrieval = MarketPagesRetrieval(50, {})
+    pages = _parallel_markets(retrieval, "a,b").iter_pages(ordered=ordered, buffer_pages=1)
+    next(pages)
+    time.sleep(0.3)
+    # each worker holds one page in the queue and one it cannot put yet
+    assert len(retrieval.requests) <= 5
+    pages.close()
+    requests = len(retrieval.requests)
+    time.sleep(0.2)
+    assert len(retrieval.requests) == requests
+
+
+def test_parallel_iteration_raises_worker_errors() -> None:
+    retrieval = MarketPagesRetrieval(3, {})
+    with pytest.raises(ValueError, match="broken market"):
+        list(_parallel_markets(retrieval, "a,broken").iter_pages(ordered=False))
+
+
+def test_parallel_export_to_csv_writes_one_file_in_order() -> None:
+    retrieval = MarketPagesRetrieval(3, {"a": 0.05})
+    csv = _parallel_markets(retrieval, "a,b,c").export_to_csv()
+    expected = DataCollection(
+        MarketPagesRetrieval(3, {}), "timeseries/market-trades", {"markets": "a"}
+    ).export_to_csv()
+    assert expected is not None
+    lines = csv.splitlines()
+    assert lines[0] == expected.splitlines()[0]
+    assert lines.count(lines[0]) == 1
+    assert len(lines) == 1 + 9
+    assert [line.split(",")[0] for line in lines[1:]] == [f'"{market}"' for market in "abc" for _ in range(3)]
+
+
+def test_parallel_export_to_csv_columns_and_compression(tmp_path: Path) -> None:
+    retrieval = MarketPagesRetrieval(2, {})
+    path = tmp_path / "markets.csv.gz"
+    _parallel_markets(retrieval, "a,b").export_to_csv(str(path), columns_to_store=["page", "market"], compress=True)
+    with gzip.open(path, "rt") as f:
+        assert f.read() == 'page,market\n"0","a"\n"1","a"\n"0","b"\n"1","b"\n'
+
+
+def test_parallel_export_to_csv_skips_empty_data_collections() -> None:
+    retrieval = MarketPagesRetrieval(2, {})
+    parallel = DataCollection(
+        lambda endpoint, params: {"data": []} if params["markets"] == "a" else retrieval(endpoint, params),
+        "timeseries/market-trades",
+        {"markets": "a,b"},
+    ).parallel("markets", max_workers=2, progress_bar=False)
+    csv = parallel.export_to_csv()
+    assert csv is not None
+    assert len(csv.splitlines()) == 3
+    assert csv.splitlines()[1].startswith('"b"')
+
+
+def test_parallel_export_to_csv_bounds_pages_ahead_of_writer() -> None:
+    retrieval = MarketPagesRetrieval(50, {})
+    requests_per_write = []
+
+    class SlowBuffer(io.BytesIO):
+        def write(self, data: Any) -> int:
+            requests_per_write.append(len(retrieval.requests))
+            time.sleep(0.002)
+            return super().write(data)
+
+    _parallel_markets(retrieval, "a,b").export_to_csv(SlowBuffer())
+    # the header and one block per page; each worker is at most a few pages ahead of the writer
+    assert len(requests_per_write) == 1 + 100
+    assert all(requests <= written + 6 for written, requests in enumerate(requests_per_write))
+
+
+def test_parallel_export_to_json_writes_lines_in_order() -> None:
+    retrieval = MarketPagesRetrieval(3, {"a": 0.05})
+    exported = _parallel_markets(retrieval, "a,b,c").export_to_json()
+    rows = [json.loads(line) for line in exported.splitlines()]
+    assert rows == [{"market": market, "page": page} for market in "abc" for page in range(3)]
+
+
+def test_parallel_export_to_json_writes_one_gzip_stream(tmp_path: Path) -> None:
+    path = tmp_path / "markets.json.gz"
+    _parallel_markets(MarketPagesRetrieval(2, {}), "a,b,c").export_to_json(str(path), compress=True)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    lines = decompressor.decompress(path.read_bytes()).splitlines()
+    assert decompressor.eof and not decompressor.unused_data
+    assert [json.loads(line)["market"] for line in lines] == ["a", "a", "b", "b", "c", "c"]
+
+
+def test_parallel_export_to_json_zstd() -> None:
+    zstandard = pytest.importorskip("zstandard")
+    buffer = io.BytesIO()
+    _parallel_markets(MarketPagesRetrieval(2, {}), "a,b").export_to_json(buffer, compress="zstd")
+    exported = zstandard.ZstdDecompressor().decompressobj().decompress(buffer.getvalue())
+    assert [json.loads(line)["market"] for line in exported.splitlines()] == ["a", "a", "b", "b"]
+
+
+def test_compressed_export_needs_a_path() -> None:
+    with pytest.raises(ValueError, match="path or buffer"):
+        _parallel_markets(MarketPagesRetrieval(2, {}), "a,b").export_to_json(compress=True)
+
+
+class ParallelCsvClient(CsvClient):
+    def _size_connection_pool(self, max_workers: int) -> None:
+        pass
+
+
+def test_parallel_query_specs_share_the_client() -> None:
+    client = ParallelCsvClient()
+    parallel = DataCollection(
+        client._get_raw_data, "timeseries/market-trades", {"markets": "a,b", "start_time": "2024-01-01", "end_time": "2024-01-04"}, client=client  # type: ignore
+    ).parallel("markets", time_increment=timedelta(days=1), progress_bar=False)
+    query_specs = parallel.get_parallel_query_specs()
+    assert [(dict(spec.params)["markets"], dict(spec.params)["start_time"].day) for spec in query_specs] == [
+        (market, day) for day in (1, 2, 3) for market in "ab"
+    ]
+    assert query_specs[0].with_params(markets="c") != query_specs[0]
+    assert dict(query_specs[0].params)["markets"] == "a"
+    data_collections = parallel.get_parallel_datacollections()
+    assert all(cast(Any, dc._client) is client and dc._data_retrieval_function == client._get_raw_data for dc in data_collections)
+    assert data_collections[0]._url_params == query_specs[0].to_url_params()
+
+
+def test_parallel_csv_passthrough_writes_one_header() -> None:
+    client = ParallelCsvClient()
+    parallel = DataCollection(
+        lambda endpoint, params: {"data": []}, "timeseries/market-trades", {"markets": "a,b"}, client=client  # type: ignore
+    ).parallel("markets", max_workers=2, progress_bar=False)
+    csv = parallel.export_to_csv(passthrough=True)
+    assert csv == "coin_metrics_id,price\n" + "".join(f"{i},42000.{i % 2}\n" for i in range(6)) * 2
+    assert len(client.requests) == 6
+
+
+class TimeRangeRetrieval:
+    """
+    Serves the rows of `rows_by_market` (sorted by time) within start_time/end_time and their *_inclusive flags, in
+    pages of page_size rows from the start or the end of the range. Rows of several markets are ordered by market and
+    then by time, like the API.
+    """
+
+    def __init__(self, rows_by_market: Dict[str, List[Dict[str, Any]]]) -> None:
+        self.rows_by_market = rows_by_market
+        self.times_and_rows = {
+            market: [(self._to_datetime(row["time"]), row) for row in rows] for market, rows in rows_by_market.items()
+        }
+        self.requests: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _to_datetime(value: Any) -> datetime:
+        if isinstance(value, str):
+            return isoparse(value).astimezone(timezone.utc).replace(tzinfo=None)
+        return value  # type: ignore
+
+    def __call__(self, endpoint: str, params: Dict[str, Any]) -> DataReturnType:
+        with self.lock:
+            self.requests.append(dict(params))
+        start, end = self._to_datetime(params["start_time"]), self._to_datetime(params["end_time"])
+        start_inclusive, end_inclusive = params.get("start_inclusive", True), params.get("end_inclusive", True)
+        rows = [
+            row for market in params["markets"].split(",") for row_time, row in self.times_and_rows[market]
+            if (start <= row_time if start_inclusive else start < row_time) and (row_time <= end if end_inclusive else row_time < end)
+        ]
+        page_size, offset = int(params.get("page_size") or 100), int(params.get("next_page_token") or 0)
+        if params.get("paging_from") == "start":
+            page = rows[offset:offset + page_size]
+        else:
+            page = rows[max(0, len(rows) - offset - page_size):len(rows) - offset]
+        response: Dict[str, Any] = {"data": page}
+        if offset + page_size < len(rows):
+            response["next_page_token"] = str(offset + page_size)
+        return response
+
+
+def _market_rows(market: str, seconds: List[int]) -> List[Dict[str, Any]]:
+    start = datetime(2024, 1, 1)
+    return [
+        {"market": market, "time": (start + timedelta(seconds=second)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"), "coin_metrics_id": str(i)}
+        for i, second in enumerate(seconds)
+    ]
+
+
+def _bursty_retrieval() -> TimeRangeRetrieval:
+    # a row per minute for 16 hours, then a row every 4 seconds: the sample from the start underestimates the end
+    busy = list(range(0, 16 * 3600, 60)) + list(range(16 * 3600, 24 * 3600, 4))
+    return TimeRangeRetrieval({
+        "busy": _market_rows("busy", busy),
+        "quiet": _market_rows("quiet", list(range(0, 24 * 3600, 3600))),
+    })
+
+
+def _auto_chunked(retrieval: TimeRangeRetrieval, **url_params: Any) -> Any:
+    url_params = {"markets": "busy,quiet", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100, **url_params}
+    return DataCollection(retrieval, "timeseries/market-trades", url_params).parallel(
+        "markets", max_workers=4, progress_bar=False, chunking="auto", chunk_pages=5
+    )
+
+
+def test_auto_chunking_plans_chunks_by_density() -> None:
+    query_specs = _auto_chunked(_bursty_retrieval(), paging_from="start").get_parallel_query_specs()
+    chunks = [dict(spec.params)["markets"] for spec in query_specs]
+    assert chunks.count("quiet") == 1
+    assert chunks.count("busy") > 1
+    busy = [dict(spec.params) for spec in query_specs if dict(spec.params)["markets"] == "busy"]
+    assert busy[0]["start_time"] == datetime(2024, 1, 1) and busy[-1]["end_time"] == datetime(2024, 1, 2)
+    assert all(a["end_time"] == b["start_time"] and a["end_inclusive"] is False for a, b in zip(busy, busy[1:]))
+
+
+@pytest.mark.parametrize("paging_from", ["start", "end"])
+def test_auto_chunking_splits_dense_chunks_while_running(paging_from: str) -> None:
+    retrieval = _bursty_retrieval()
+    parallel = _auto_chunked(retrieval, paging_from=paging_from)
+    planned = len(parallel.get_parallel_query_specs())
+    retrieval.requests.clear()
+    rows = parallel.to_list()
+    expected = retrieval.rows_by_market["busy"] + retrieval.rows_by_market["quiet"]
+    if paging_from == "start":
+        # the pieces of a chunk follow it in time
+        assert rows == expected
+    else:
+        assert sorted(rows, key=lambda row: (row["market"], int(row["coin_metrics_id"]))) == expected
+    ranges = {(params["markets"], str(params["start_time"]), str(params["end_time"])) for params in retrieval.requests}
+    assert len(ranges) > planned
+
+
+def test_auto_chunking_samples_once() -> None:
+    retrieval = _bursty_retrieval()
+    parallel = _auto_chunked(retrieval, paging_from="start")
+    query_specs = parallel.get_parallel_query_specs()
+    samples = len(retrieval.requests)
+    assert samples == 2
+    assert parallel.get_parallel_query_specs() == query_specs
+    parallel.get_parallel_datacollections()
+    assert len(retrieval.requests) == samples
+    retrieval.requests.clear()
+    parallel.to_list()
+    assert not [params for params in retrieval.requests if params["page_size"] == SAMPLE_ROWS]
+
+
+def test_auto_chunking_requires_start_time() -> None:
+    with pytest.raises(ValueError, match="start_time"):
+        DataCollection(_bursty_retrieval(), "timeseries/market-trades", {"markets": "busy"}).parallel(chunking="auto")
+
+
+@pytest.mark.parametrize("number_of_rows", [0, 1, 99, 100, 101, 250, 1000, 1001])
+def test_bidirectional_paging_returns_rows_once_in_order(number_of_rows: int) -> None:
+    # three rows per second, so that rows of the same time span pages
+    retrieval = TimeRangeRetrieval({"a": _market_rows("a", [i // 3 for i in range(number_of_rows)])})
+    data_collection = DataCollection(
+        retrieval, "timeseries/market-trades", {"markets": "a", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100}
+    ).bidirectional()
+    assert data_collection.to_list() == retrieval.rows_by_market["a"]
+    paging_from = [params["paging_from"] for params in retrieval.requests]
+    assert set(paging_from) == {"start", "end"}
+    # the two ends meet in the middle: at most a page or two each past it
+    assert len(paging_from) <= number_of_rows // 100 + 4
+
+
+def test_bidirectional_paging_is_inherited_by_parallel_data_collections() -> None:
+    retrieval = TimeRangeRetrieval({market: _market_rows(market, list(range(500))) for market in "ab"})
+    parallel = DataCollection(
+        retrieval, "timeseries/market-trades", {"markets": "a,b", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100}
+    ).bidirectional().parallel("markets", max_workers=2, progress_bar=False)
+    assert parallel.to_list() == retrieval.rows_by_market["a"] + retrieval.rows_by_market["b"]
+    assert {params["paging_from"] for params in retrieval.requests} == {"start", "end"}
+
+
+def test_bidirectional_paging_is_used_by_iteration() -> None:
+    retrieval = TimeRangeRetrieval({"a": _market_rows("a", list(range(500)))})
+    data_collection = DataCollection(
+        retrieval, "timeseries/market-trades", {"markets": "a", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100}
+    ).bidirectional()
+    assert list(data_collection) == retrieval.rows_by_market["a"]
+    assert {params["paging_from"] for params in retrieval.requests} == {"start", "end"}
+
+
+def test_bidirectional_paging_is_used_by_csv_exports() -> None:
+    retrieval = TimeRangeRetrieval({"a": _market_rows("a", list(range(500)))})
+    csv = DataCollection(
+        retrieval, "timeseries/market-trades", {"markets": "a", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100}
+    ).bidirectional().export_to_csv()
+    assert csv == "market,time,coin_metrics_id\n" + "".join(
+        ",".join(f'"{row[column]}"' for column in ("market", "time", "coin_metrics_id")) + "\n" for row in retrieval.rows_by_market["a"]
+    )
+    assert {params["paging_from"] for params in retrieval.requests} == {"start", "end"}
+
+
+def test_bidirectional_paging_falls_back_with_several_markets() -> None:
+    retrieval = TimeRangeRetrieval({market: _market_rows(market, list(range(1000))) for market in "ab"})
+    rows = DataCollection(
+        retrieval, "timeseries/market-trades",
+        {"markets": "a,b", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100, "paging_from": "start"},
+    ).bidirectional().to_list()
+    assert rows == retrieval.rows_by_market["a"] + retrieval.rows_by_market["b"]
+    assert {params["paging_from"] for params in retrieval.requests} == {"start"}
+
+
+def test_bidirectional_paging_falls_back_with_limits() -> None:
+    retrieval = TimeRangeRetrieval({"a": _market_rows("a", list(range(300)))})
+    rows = DataCollection(
+        retrieval, "timeseries/market-trades",
+        {"markets": "a", "start_time": "2024-01-01", "end_time": "2024-01-02", "page_size": 100, "limit_per_market": 300},
+    ).bidirectional().to_list()
+    # pages from the end, as without bidirectional()
+    assert rows == retrieval.rows_by_market["a"][200:] + retrieval.rows_by_market["a"][100:200] + retrieval.rows_by_market["a"][:100]
+    assert all("paging_from" not in params for params in retrieval.requests)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+from coinmetrics._hedging import LatencyTracker, RequestHedger
+
+
+def _warmed_up_hedger(latency: float = 0.01) -> RequestHedger:
+    hedger = RequestHedger()
+    for _ in range(50):
+        hedger.latency_tracker.record(latency)
+    return hedger
+
+
+def test_latency_quantile_needs_enough_samples() -> None:
+    tracker = LatencyTracker(min_samples=20)
+    for latency in range(19):
+        tracker.record(latency)
+    assert tracker.quantile(0.95) is None
+    tracker.record(19)
+    assert tracker.quantile(0.95) == 19
+    assert tracker.quantile(0.5) == 10
+
+
+def test_slow_request_is_hedged_and_loser_closed() -> None:
+    hedger = _warmed_up_hedger()
+    calls: List[int] = []
+    closed: List[str] = []
+    lock = threading.Lock()
+
+    def send() -> str:
+        with lock:
+            calls.append(len(calls))
+            attempt = len(calls)
+        # the original request hangs, the hedged one responds right away
+        time.sleep(1.0 if attempt == 1 else 0.0)
+        return f"response {attempt}"
+
+    start = time.monotonic()
+    assert hedger.send(send, close=closed.append) == "response 2"
+    assert time.monotonic() - start < 0.5
+    assert hedger.statistics == {"hedged_requests": 1, "hedges_won": 1}
+
+    deadline = time.monotonic() + 5
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert closed == ["response 1"]
+
+
+def test_fast_request_is_not_hedged() -> None:
+    hedger = _warmed_up_hedger(latency=1.0)
+    assert hedger.send(lambda: "response", close=lambda _: None) == "response"
+    assert hedger.statistics == {"hedged_requests": 0, "hedges_won": 0}
+
+
+def test_async_slow_request_is_hedged() -> None:
+    hedger = _warmed_up_hedger()
+    attempts: List[int] = []
+
+    async def send() -> str:
+        attempts.append(len(attempts) + 1)
+        attempt = len(attempts)
+        await asyncio.sleep(1.0 if attempt == 1 else 0.0)
+        return f"response {attempt}"
+
+    assert asyncio.run(hedger.send_async(send, close=lambda _: None)) == "response 2"
+    assert hedger.statistics == {"hedged_requests": 1, "hedges_won": 1}
@@ -186,6 +186,18 @@ def test_parallel_export_to_single_json() -> None:
         os.remove(expected_file)
 
 
+@pytest.mark.skipif(not cm_api_key_set, reason=REASON_TO_SKIP)
+def test_parallel_market_trades_to_polars_df() -> None:
+    markets = ['coinbase-eth-usdc-spot', 'coinbase-eth-btc-spot']
+    start = datetime.datetime(year=2022, day=1, month=6, hour=0, minute=0, second=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+    end = datetime.datetime(year=2022, day=1, month=6, hour=0, minute=1, second=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+    parallel_trades = client.get_market_trades(markets=markets, start_time=start,
+                                               end_time=end).parallel().to_dataframe(dataframe_type="polars")
+    normal_trades = client.get_market_trades(markets=markets, start_time=start, end_time=end).to_dataframe(dataframe_type="polars")
+    assert parallel_trades.schema == normal_trades.schema
+    assert parallel_trades.sort("market", "time", "coin_metrics_id").equals(normal_trades.sort("market", "time", "coin_metrics_id"))
+
+
 @pytest.mark.skipif(not cm_api_key_set, reason=REASON_TO_SKIP)
 def test_parallelize_on_metrics() -> None:
     metrics = ["volume_reported_spot_usd_1d", "volume_trusted_spot_usd_1d"]
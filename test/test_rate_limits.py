@@ -1,8 +1,10 @@
 import os
 import threading
+import time
 import pytest
 
 from coinmetrics.api_client import CoinMetricsClient
+from coinmetrics._rate_limiter import RateLimiter
 
 client = CoinMetricsClient()
 cm_api_key_set = os.environ.get("CM_API_KEY") is not None
@@ -34,5 +36,39 @@ def test_rate_limiter_works_as_expected() -> None:
         pytest.fail("Function failed to run for 20 seconds without throwing an exception")
 
 
+def test_rate_limiter_does_not_delay_before_limits_are_known() -> None:
+    rate_limiter = RateLimiter()
+    start = time.monotonic()
+    for _ in range(100):
+        rate_limiter.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_rate_limiter_waits_for_window_reset() -> None:
+    rate_limiter = RateLimiter()
+    rate_limiter.update({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "0.3", "x-ratelimit-limit": "10"})
+    assert rate_limiter.acquire() >= 0.25
+
+
+def test_rate_limiter_waits_after_429() -> None:
+    rate_limiter = RateLimiter()
+    rate_limiter.update({"x-ratelimit-reset": "0.3"}, rate_limited=True)
+    assert rate_limiter.acquire() >= 0.25
+
+
+def test_rate_limiter_paces_requests_over_window() -> None:
+    rate_limiter = RateLimiter()
+    rate_limiter.update({"x-ratelimit-remaining": "4", "x-ratelimit-reset": "0.4", "x-ratelimit-limit": "10"})
+    start = time.monotonic()
+    threads = [threading.Thread(target=rate_limiter.acquire) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    # four requests spread over the rest of the window instead of a single burst
+    assert 0.2 <= elapsed < 0.4
+
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file